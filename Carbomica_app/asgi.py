@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Carbomica_app.settings")
+# Serve home and dashboard from appname.async_views (see settings.ASYNC_VIEWS)
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "1")
 
 application = get_asgi_application()
+
+# Pay the per-process start-up costs before this worker takes traffic;
+# /readyz stays 503 until this has finished (see appname/warmup.py)
+from appname.warmup import warm_up  # noqa: E402
+
+warm_up()
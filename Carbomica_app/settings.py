@@ -10,7 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import atexit
+import hashlib
 import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
@@ -30,6 +35,24 @@ SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', '(j=&pjt1#^j(005!8vb!)%=^o2#=!76*r0w
 # Debug is off unless explicitly enabled
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
+
+def _source_fingerprint():
+    """SHA-256 of the app's code and templates: identical in every worker
+    and instance running the same build, different after any change to them."""
+    digest = hashlib.sha256()
+    for path in sorted((BASE_DIR / 'appname').rglob('*')):
+        if path.suffix in ('.py', '.html') and path.is_file():
+            digest.update(str(path.relative_to(BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Identifies the running build. Cloud Run sets K_REVISION per deployment;
+# DJANGO_RELEASE_ID can pin it elsewhere; otherwise it is derived from the
+# code itself, so every worker agrees on it. HTML ETags include it, so a
+# changed template never revalidates a page rendered by the old one.
+RELEASE_ID = os.getenv('K_REVISION') or os.getenv('DJANGO_RELEASE_ID') or _source_fingerprint()
+
 # Localhost + Heroku legacy + Firebase Hosting + Cloud Run
 ALLOWED_HOSTS = [
     'localhost',
@@ -40,8 +63,12 @@ ALLOWED_HOSTS = [
     '.run.app',          # Cloud Run preview URLs (*.run.app)
 ]
 
+# Running the test suite: `manage.py test`, or DJANGO_TESTING=1 for other
+# runners
+TESTING = sys.argv[1:2] == ['test'] or os.getenv('DJANGO_TESTING') == '1'
+
 # Allow Django test client's default HTTP_HOST in development/CI
-if DEBUG or os.getenv('DJANGO_TESTING') == '1':
+if DEBUG or TESTING:
     ALLOWED_HOSTS += ['testserver']
 
 # Trust HTTPS from Firebase Hosting and Cloud Run load balancer
@@ -89,10 +116,14 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # After whitenoise so static files are not timed
+    "appname.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Needs request.user; profiles the view and everything after it
+    "appname.middleware.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
@@ -107,7 +138,9 @@ ROOT_URLCONF = "Carbomica_app.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Django's backend plus render timing for Server-Timing / /metrics
+        "BACKEND": "appname.templating.InstrumentedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [os.path.join(BASE_DIR, 'appname/templates')],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -123,6 +156,66 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "Carbomica_app.wsgi.application"
 
+# ASGI deployment mode (SERVER_MODE=asgi in start.sh): Carbomica_app/asgi.py
+# sets DJANGO_ASYNC_VIEWS=1 so appname/urls.py routes home and dashboard to
+# appname.async_views, which run their independent queries concurrently.
+ASYNC_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS') == '1'
+# Worker threads (so at most this many extra DB connections per process)
+# the async views may use at once. DJANGO_ASYNC_QUERY_CONCURRENCY=0 runs the
+# parts one after another on the request's own thread instead (tests that
+# need to see a TestCase's uncommitted rows switch it off with
+# override_settings, since worker threads have their own connections).
+ASYNC_QUERY_THREADS = int(os.getenv('DJANGO_ASYNC_QUERY_THREADS', '8'))
+ASYNC_QUERY_CONCURRENCY = os.getenv('DJANGO_ASYNC_QUERY_CONCURRENCY', '1') == '1'
+
+# Cache shared by every worker in the container: a SQLite file in WAL mode
+# (appname/sqlite_cache.py), so an invalidation in one gunicorn worker is
+# seen by all of them without running Redis. Keep it on local disk, never a
+# network filesystem. On Cloud Run /tmp is in memory, so MAX_BYTES also
+# bounds the memory it takes. Test runs get a fresh file per process, so
+# slots, locks and cached pages never leak between runs or into a dev server.
+if TESTING:
+    _cache_dir = tempfile.mkdtemp(prefix='carbomica-cache-')
+    atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+    CACHE_PATH = os.path.join(_cache_dir, 'cache.sqlite3')
+else:
+    CACHE_PATH = os.getenv(
+        'DJANGO_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'carbomica-cache.sqlite3'),
+    )
+CACHES = {
+    'default': {
+        'BACKEND': 'appname.sqlite_cache.SQLiteCache',
+        'LOCATION': CACHE_PATH,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('DJANGO_CACHE_MAX_ENTRIES', '100000')),
+            'MAX_BYTES': int(os.getenv('DJANGO_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        },
+    },
+}
+
+# Admission control for expensive views (appname/admission.py). With two
+# gunicorn workers, one expensive execution at a time across the container
+# always leaves a worker free for everything else. A request that finds no
+# slot, or whose identical twin is still running, waits QUEUE_SECONDS, then
+# gets a 503 with Retry-After. COALESCE_SECONDS is how long a finished
+# flight's response stays readable by the requests that waited for it. A
+# slot's lease outlives gunicorn's 120 s timeout, so a killed worker's slot
+# frees itself.
+ADMISSION_PER_WORKER = int(os.getenv('DJANGO_ADMISSION_PER_WORKER', '1'))
+ADMISSION_GLOBAL = int(os.getenv('DJANGO_ADMISSION_GLOBAL', '1'))
+ADMISSION_QUEUE_SECONDS = float(os.getenv('DJANGO_ADMISSION_QUEUE_SECONDS', '3'))
+ADMISSION_COALESCE_SECONDS = float(os.getenv('DJANGO_ADMISSION_COALESCE_SECONDS', '60'))
+ADMISSION_LEASE_SECONDS = 150
+ADMISSION_RETRY_AFTER = 5
+
+# Idempotent submissions (appname/idempotency.py): how long a form's key
+# replays its first result, how long a POST is matched on content alone
+# (keyless ones, and uploads under any key), and how often expired records
+# are swept. A duplicate waits ADMISSION_QUEUE_SECONDS for the first.
+IDEMPOTENCY_KEY_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_CONTENT_SECONDS = 10 * 60
+IDEMPOTENCY_PRUNE_SECONDS = 5 * 60
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Carbomica_app.settings")
 
 application = get_wsgi_application()
+
+# Pay the per-process start-up costs before this worker takes traffic;
+# /readyz stays 503 until this has finished (see appname/warmup.py)
+from appname.warmup import warm_up  # noqa: E402
+
+warm_up()
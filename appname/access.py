@@ -0,0 +1,174 @@
+"""
+Facility access resolution.
+
+A user can access a facility they created or one owned by an organisation
+they belong to. Those grants are materialised in FacilityAccess, kept in
+step by sync_facility_access() (called from appname.signals whenever a
+facility is created or reassigned, or organisation membership changes), so
+an access check is one indexed semi-join rather than an OR across two joins
+plus DISTINCT.
+
+The resolved ID list is additionally:
+
+  * memoised on the request's user object for the rest of the request, and
+  * cached across requests, under a per-user token that is rotated whenever
+    sync_facility_access() adds or removes one of that user's grants.
+
+Rotating a token rather than deleting the cached list means a request that
+read the old access set just before the change cannot write it back after.
+
+The assembled dashboard context is cached per user as well (see
+views.dashboard). It is dropped whenever the user's access set rotates and,
+via appname.signals.facility_data_changed(), whenever data on one of their
+facilities changes. Its key also carries the intervention library's
+version (appname.signals.library_version()), so a library edit or sync
+moves every dashboard on, as it does every facility ETag.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Facility, FacilityAccess
+
+ACCESS_CACHE_TIMEOUT = 60 * 60 * 24
+# Upper bound on how long a dashboard built from data read just before a
+# concurrent write can survive; normal invalidation is immediate.
+DASHBOARD_CACHE_TIMEOUT = 60 * 10
+
+
+def _token_key(user_id):
+    return f'carbomica:facility-access-token:{user_id}'
+
+
+def _library_version():
+    from .signals import library_version  # appname.signals imports this module
+    return library_version()
+
+
+def dashboard_cache_key(user_id, library=None):
+    """A user's dashboard context key under `library` (default: the current version)."""
+    if library is None:
+        library = _library_version()
+    return f'carbomica:dashboard:{user_id}:{library}'
+
+
+def access_token(user_id):
+    """Current cache token for a user's access set (created on first use)."""
+    key = _token_key(user_id)
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        token = cache.get(key)
+    return token
+
+
+def accessible_facility_ids(user):
+    """Sorted list of facility IDs the user can access."""
+    if not user.is_authenticated:
+        return []
+    memo = getattr(user, '_carbomica_facility_ids', None)
+    if memo is not None:
+        return memo
+    key = f'carbomica:facility-access:{user.pk}:{access_token(user.pk)}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = sorted(set(
+            FacilityAccess.objects.filter(user=user).values_list('facility_id', flat=True)
+        ))
+        cache.set(key, ids, ACCESS_CACHE_TIMEOUT)
+    user._carbomica_facility_ids = ids
+    return ids
+
+
+def accessible_facilities(user):
+    """Facility queryset restricted to the user's grants (indexed semi-join)."""
+    return Facility.objects.filter(
+        id__in=FacilityAccess.objects.filter(user=user).values('facility_id')
+    )
+
+
+def invalidate_facility_access(user_ids):
+    """Rotate the access token of every given user."""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    if user_ids:
+        cache.set_many({_token_key(uid): uuid.uuid4().hex for uid in user_ids}, None)
+        invalidate_dashboards(user_ids)
+
+
+def invalidate_dashboards(user_ids):
+    """Drop the cached dashboard context of every given user."""
+    library = _library_version()
+    cache.delete_many([dashboard_cache_key(uid, library) for uid in user_ids if uid is not None])
+
+
+def invalidate_facility_dashboards(facility_ids):
+    """Drop the cached dashboards of everyone who can see these facilities."""
+    invalidate_dashboards(set(
+        FacilityAccess.objects
+        .filter(facility_id__in=facility_ids)
+        .values_list('user_id', flat=True)
+    ))
+
+
+def _expected_grants(facility_ids):
+    """(user_id, facility_id, via_org) grants implied by the source tables."""
+    grants = set()
+    facilities = Facility.objects.filter(id__in=facility_ids)
+    for facility_id, owner_id in facilities.filter(created_by__isnull=False).values_list(
+        'id', 'created_by_id',
+    ):
+        grants.add((owner_id, facility_id, False))
+    for facility_id, user_id in facilities.filter(organisation__members__isnull=False).values_list(
+        'id', 'organisation__members',
+    ):
+        grants.add((user_id, facility_id, True))
+    return grants
+
+
+def sync_facility_access(facility_ids):
+    """
+    Make FacilityAccess rows for the given facilities match the source
+    tables, rotating the cached access set of every user whose grants
+    changed. Returns (added, removed) row counts.
+    """
+    facility_ids = list(facility_ids)
+    if not facility_ids:
+        return 0, 0
+    with transaction.atomic():
+        expected = _expected_grants(facility_ids)
+        existing = {
+            (user_id, facility_id, via_org): pk
+            for pk, user_id, facility_id, via_org in
+            FacilityAccess.objects
+            .filter(facility_id__in=facility_ids)
+            .values_list('id', 'user_id', 'facility_id', 'via_org')
+        }
+        stale = [grant for grant in existing if grant not in expected]
+        missing = [grant for grant in expected if grant not in existing]
+        if stale:
+            FacilityAccess.objects.filter(id__in=[existing[g] for g in stale]).delete()
+        if missing:
+            FacilityAccess.objects.bulk_create(
+                [FacilityAccess(user_id=u, facility_id=f, via_org=v) for u, f, v in missing],
+                ignore_conflicts=True,
+            )
+    changed = {user_id for user_id, _, _ in stale + missing}
+    invalidate_facility_access(changed)
+    # Rotate again once the outermost transaction commits, so a concurrent
+    # request that read the pre-commit grants cannot leave them cached.
+    transaction.on_commit(lambda: invalidate_facility_access(changed))
+    return len(missing), len(stale)
+
+
+def rebuild_facility_access(dry_run=False):
+    """
+    Resync FacilityAccess for every facility from the source tables.
+    Returns (added, removed);
+    with dry_run the counts are computed and the transaction rolled back.
+    """
+    with transaction.atomic():
+        added, removed = sync_facility_access(Facility.objects.values_list('id', flat=True))
+        if dry_run:
+            transaction.set_rollback(True)
+    return added, removed
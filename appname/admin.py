@@ -1,4 +1,7 @@
 from django.contrib import admin
+from django.http import HttpResponse
+from django.utils.html import format_html
+
 from .models import (
     Facility,
     EmissionSource,
@@ -8,6 +11,8 @@ from .models import (
     OptimizationScenario,
     OptimizationResult,
     Policy,
+    ProfileCapture,
+    SubmissionRecord,
 )
 
 
@@ -41,7 +46,8 @@ class InterventionAdmin(admin.ModelAdmin):
 
 @admin.register(FacilityIntervention)
 class FacilityInterventionAdmin(admin.ModelAdmin):
-    list_display = ('facility', 'intervention', 'implementation_cost', 'annual_savings', 'roi')
+    list_display = ('facility', 'intervention', 'implementation_cost', 'annual_savings', 'roi_pct', 'npv')
+    readonly_fields = FacilityIntervention.FINANCIAL_FIELDS
     list_filter = ('facility', 'intervention__status')
     search_fields = ('facility__display_name', 'intervention__display_name')
 
@@ -64,3 +70,57 @@ class OptimizationResultAdmin(admin.ModelAdmin):
 class PolicyAdmin(admin.ModelAdmin):
     list_display = ('name', 'status', 'implementation_date', 'compliance_score')
     list_filter = ('status',)
+
+
+@admin.register(SubmissionRecord)
+class SubmissionRecordAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'scope', 'user', 'completed', 'location', 'expires_at')
+    list_filter = ('scope', 'completed')
+    ordering = ('-created_at',)
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code',
+                    'duration_ms', 'query_count', 'sql_ms', 'peak_memory_kb', 'user')
+    list_filter = ('view_name',)
+    search_fields = ('path',)
+    ordering = ('-created_at',)
+    actions = ['download_stats']
+    exclude = ('stats_data', 'stats_report', 'allocations', 'sql_log', 'explain')
+    readonly_fields = ('created_at', 'user', 'method', 'path', 'view_name', 'status_code',
+                       'duration_ms', 'query_count', 'sql_ms', 'peak_memory_kb',
+                       'profile', 'allocation_sites', 'slowest_queries', 'statements')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='cProfile (cumulative)')
+    def profile(self, obj):
+        return format_html('<pre>{}</pre>', obj.stats_report)
+
+    @admin.display(description='Allocations')
+    def allocation_sites(self, obj):
+        return format_html('<pre>{}</pre>', obj.allocations)
+
+    @admin.display(description='EXPLAIN (slowest SELECTs)')
+    def slowest_queries(self, obj):
+        return format_html('<pre>{}</pre>', obj.explain)
+
+    @admin.display(description='SQL log')
+    def statements(self, obj):
+        lines = [f"{q['ms']:>9.3f} ms  {q['sql']}  {q['params']}" for q in obj.sql_log]
+        return format_html('<pre>{}</pre>', '\n'.join(lines))
+
+    @admin.action(description='Download .pstats (single capture)')
+    def download_stats(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, 'Select exactly one capture to download.', level='warning')
+            return None
+        capture = queryset.get()
+        response = HttpResponse(bytes(capture.stats_data), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="capture-{capture.pk}.pstats"'
+        return response
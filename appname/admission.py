@@ -0,0 +1,234 @@
+"""
+Admission control and request coalescing for expensive views.
+
+Gunicorn runs two sync workers with a 120 s timeout. Two users running an
+optimisation or loading a large district roll-up at the same time would
+occupy both, and every other request would queue behind them. Views
+decorated with @expensive(pool) are held to:
+
+  * ADMISSION_PER_WORKER executions at a time in each process (a
+    BoundedSemaphore; it matters under threaded or ASGI workers), and
+  * ADMISSION_GLOBAL executions at a time across all workers in the
+    container. Slots are cache keys in the shared SQLite cache
+    (appname/sqlite_cache.py), taken with cache.add(), which is atomic
+    across processes. Each slot is leased for ADMISSION_LEASE_SECONDS, past
+    gunicorn's timeout, so a slot held by a killed worker frees itself.
+
+A request that finds its pool full waits up to ADMISSION_QUEUE_SECONDS for
+a slot, then gets a 503 with Retry-After instead of tying up the worker.
+
+Identical requests that overlap (same user and session, same view, same
+path and inputs) run once. The first takes a single-flight lock in the
+cache; the others wait for its response, which it stores under its lock
+token (for ADMISSION_COALESCE_SECONDS), and return a copy of it. They wait
+no longer than a queued request, ADMISSION_QUEUE_SECONDS, then get the same
+503 with Retry-After, so only the flight itself holds a worker for long. A
+request arriving after the first has finished runs again, so a coalesced
+response is never older than the request that received it. Streaming responses and
+server errors are not shared; the waiters then run the view themselves.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+# Poll interval while queued or coalesced: starts short, backs off to the cap
+POLL_START = 0.02
+POLL_MAX = 0.25
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+class Busy(Exception):
+    """No execution slot became free within the queue deadline."""
+
+
+def _worker_semaphore(pool):
+    with _semaphores_lock:
+        if pool not in _semaphores:
+            _semaphores[pool] = threading.BoundedSemaphore(settings.ADMISSION_PER_WORKER)
+        return _semaphores[pool]
+
+
+def _slot_key(pool, index):
+    return f'carbomica:admission:{pool}:{index}'
+
+
+def _sleep(delay, deadline):
+    """Sleep for `delay` (at most until `deadline`); return the next delay."""
+    time.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+    return min(delay * 2, POLL_MAX)
+
+
+def _take_slot(pool, token, deadline):
+    """Index of the container-wide slot now leased to `token`, or raise Busy."""
+    delay = POLL_START
+    while True:
+        for index in range(settings.ADMISSION_GLOBAL):
+            if cache.add(_slot_key(pool, index), token, settings.ADMISSION_LEASE_SECONDS):
+                return index
+        if time.monotonic() >= deadline:
+            raise Busy(pool)
+        delay = _sleep(delay, deadline)
+
+
+def _release(key, token):
+    """Delete `key` if it still holds `token` (its lease may have run out)."""
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def admitted(pool, run):
+    """Call run() once a per-worker and a container-wide slot in `pool` are held."""
+    deadline = time.monotonic() + settings.ADMISSION_QUEUE_SECONDS
+    semaphore = _worker_semaphore(pool)
+    if not semaphore.acquire(timeout=settings.ADMISSION_QUEUE_SECONDS):
+        raise Busy(pool)
+    try:
+        token = uuid.uuid4().hex
+        index = _take_slot(pool, token, deadline)
+        try:
+            return run()
+        finally:
+            _release(_slot_key(pool, index), token)
+    finally:
+        semaphore.release()
+
+
+def request_fingerprint(pool, request):
+    """Digest of who is asking and for what: identical requests share it."""
+    parts = [
+        pool,
+        str(request.user.pk),
+        request.session.session_key or '',
+        request.method,
+        request.path,
+        request.headers.get('If-None-Match', ''),
+        repr(sorted(request.GET.lists())),
+        repr(sorted(
+            (name, values) for name, values in request.POST.lists()
+            if name != 'csrfmiddlewaretoken'
+        )),
+    ]
+    return hashlib.sha256('\x00'.join(parts).encode()).hexdigest()
+
+
+def _shareable(response):
+    return not response.streaming and response.status_code < 500
+
+
+def coalesced(key, run):
+    """
+    Run run() as the single flight for `key`, or wait for the flight already
+    in progress and return its response. Raises Busy if that flight is still
+    running after ADMISSION_QUEUE_SECONDS.
+    """
+    lock_key = f'carbomica:flight:{key}'
+    deadline = time.monotonic() + settings.ADMISSION_QUEUE_SECONDS
+    while True:
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, settings.ADMISSION_LEASE_SECONDS):
+            try:
+                response = run()
+                if _shareable(response):
+                    cache.set(f'{lock_key}:{token}', response, settings.ADMISSION_COALESCE_SECONDS)
+                return response
+            finally:
+                _release(lock_key, token)
+
+        leader = cache.get(lock_key)
+        delay = POLL_START
+        while leader is not None:
+            response = cache.get(f'{lock_key}:{leader}')
+            if response is not None:
+                response['X-Carbomica-Coalesced'] = '1'
+                return response
+            if time.monotonic() >= deadline:
+                raise Busy(key)
+            delay = _sleep(delay, deadline)
+            if cache.get(lock_key) != leader:
+                # Finished (or failed) since the last look: one final read of
+                # its result, otherwise become the next flight
+                response = cache.get(f'{lock_key}:{leader}')
+                if response is not None:
+                    response['X-Carbomica-Coalesced'] = '1'
+                    return response
+                leader = None
+
+
+def shared_result(key, compute, timeout):
+    """
+    compute()'s result, cached under `key` for `timeout` seconds and
+    computed by one caller at a time: callers arriving meanwhile wait for it
+    (up to ADMISSION_QUEUE_SECONDS), then compute it themselves. For results
+    several endpoints need, such as the aggregate behind a page's charts.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock_key = f'{key}:computing'
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, settings.ADMISSION_LEASE_SECONDS):
+        deadline = time.monotonic() + settings.ADMISSION_QUEUE_SECONDS
+        delay = POLL_START
+        while time.monotonic() < deadline:
+            delay = _sleep(delay, deadline)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            if cache.get(lock_key) is None:
+                break
+        token = None
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        if token:
+            _release(lock_key, token)
+
+
+def busy_response(request):
+    """503 telling the client when to try again; never cached."""
+    response = render(request, 'appname/busy.html', {
+        'retry_after': settings.ADMISSION_RETRY_AFTER,
+    }, status=503)
+    response['Retry-After'] = str(settings.ADMISSION_RETRY_AFTER)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def expensive(pool, methods=None, coalesce=True):
+    """
+    Hold a view to the admission limits of `pool` and coalesce identical
+    concurrent requests to it. `methods` limits both to those HTTP methods
+    (e.g. ('POST',) when only the submission is expensive). Apply it below
+    @login_required.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods and request.method not in methods:
+                return view(request, *args, **kwargs)
+
+            def run():
+                return admitted(pool, lambda: view(request, *args, **kwargs))
+
+            try:
+                if coalesce:
+                    return coalesced(request_fingerprint(pool, request), run)
+                return run()
+            except Busy:
+                logger.warning('Admission: %s busy, rejected %s %s', pool, request.method, request.path)
+                return busy_response(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,94 @@
+"""
+Async versions of the home and dashboard views for the ASGI deployment
+mode (settings.ASYNC_VIEWS; routed in appname/urls.py).
+
+Both views are built from the same independent parts as their sync
+counterparts (views._home_queries / views._dashboard_queries). Here the
+parts run concurrently, each in a thread from a bounded pool with its own
+database connection. The tCO₂e aggregation (compute_tco2e over every
+record) runs in that pool too, never on the event loop. Whether this beats
+the sync views end to end has not been measured yet; see "ASGI mode" in
+README.md and manage.py load_test.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db import connections
+from django.shortcuts import render
+
+from . import views
+from .access import DASHBOARD_CACHE_TIMEOUT, dashboard_cache_key
+from .models import OptimizationScenario
+
+_query_pool = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_QUERY_THREADS, thread_name_prefix='carbomica-query',
+)
+
+
+def _closing_connections(run):
+    """Run a part, then close the worker thread's connections (conn_max_age=0)."""
+    def wrapper():
+        try:
+            return run()
+        finally:
+            connections.close_all()
+    return wrapper
+
+
+async def gather_parts(parts):
+    """
+    Evaluate {name: zero-argument callable} and return {name: result}.
+
+    With settings.ASYNC_QUERY_CONCURRENCY the callables run concurrently in
+    the query pool; otherwise they run one at a time on the request's sync
+    thread (see the setting's comment).
+    """
+    if settings.ASYNC_QUERY_CONCURRENCY:
+        calls = [
+            sync_to_async(_closing_connections(run), thread_sensitive=False, executor=_query_pool)
+            for run in parts.values()
+        ]
+    else:
+        calls = [sync_to_async(run) for run in parts.values()]
+    results = await asyncio.gather(*(call() for call in calls))
+    return dict(zip(parts, results))
+
+
+async def home(request):
+    """Async views.home."""
+    user = await request.auser()
+    context = await gather_parts(await sync_to_async(views._home_queries)(user))
+    context.update({
+        'call_to_actions': views.HOME_CALL_TO_ACTIONS,
+        'is_user_scope': user.is_authenticated,
+    })
+    return await sync_to_async(render)(request, 'appname/home.html', context)
+
+
+@login_required
+async def dashboard(request):
+    """Async views.dashboard — same per-user cache, concurrent rebuild on a miss."""
+    user = await request.auser()
+    key = await sync_to_async(dashboard_cache_key)(user.pk)
+    context = await cache.aget(key)
+    if context is None:
+        parts = await sync_to_async(views._dashboard_queries)(user)
+        context = views._assemble_dashboard(await gather_parts(parts))
+        await cache.aset(key, context, DASHBOARD_CACHE_TIMEOUT)
+
+    context = {
+        **context,
+        # Lazy as in the sync view; evaluated (if at all) while rendering,
+        # which happens on the sync thread below
+        'optimization_scenarios': (
+            OptimizationScenario.objects
+            .select_related('facility')
+            .filter(facility__in=views._user_facilities(user))
+            .order_by('-created_at')
+        ),
+    }
+    return await sync_to_async(render)(request, 'appname/dashboard.html', context)
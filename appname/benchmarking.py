@@ -0,0 +1,232 @@
+"""
+View benchmark harness — seeds a synthetic portfolio and drives every route
+in appname/urls.py through the test client, recording per view:
+
+  * queries    — number of SQL statements
+  * db_ms      — time spent in those statements
+  * python_ms  — wall time minus db_ms (ORM, views, templates)
+  * peak_kib   — peak traced Python allocation (separate tracemalloc run)
+
+Used by the benchmark_views management command (portfolio sizes 10 / 100 /
+1,000, JSON report, baseline comparison) and by the query-count regression
+test in tests.py. Portfolios come from appname.synthetic. Both require a
+throwaway database: seeding bulk-inserts rows and the POST cases attach,
+detach and delete.
+"""
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+from io import StringIO
+from statistics import median
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .forms import EMISSION_FIELD_LABELS
+from .idempotency import KEY_FIELD
+from .models import Facility, Intervention, OptimizationScenario
+from .synthetic import generate_portfolio
+
+BENCH_USERNAME = 'benchmark'
+BENCH_PASSWORD = 'benchmark'
+
+
+def seed_portfolio(n_facilities, months=36, seed=0):
+    """
+    Generate one organisation of `n_facilities` facilities owned by a
+    single benchmark user, each with `months` monthly emission records and
+    every library intervention linked at its default costs. Returns a dict of the objects the
+    request cases need.
+    """
+    if not Intervention.objects.exists():
+        call_command('sync_interventions', stdout=StringIO())
+    user = User.objects.create_user(BENCH_USERNAME, 'benchmark@example.com', BENCH_PASSWORD)
+    generated = generate_portfolio(
+        organisations=1, facilities_per_org=n_facilities, months=months,
+        members_per_org=0, seed=seed, prefix='BENCH', owner=user,
+        cost_jitter=0,
+    )
+    facility = Facility.objects.get(pk=generated['facility_ids'][0])
+    return {
+        'user': user,
+        'facility': facility,
+        'intervention': Intervention.objects.order_by('id').first(),
+        'scenario': OptimizationScenario.objects.create(
+            facility=facility, name='Benchmark scenario', budget=Decimal('50000'),
+        ),
+    }
+
+
+def _throwaway_scenario(portfolio):
+    scenario = OptimizationScenario.objects.create(
+        facility=portfolio['facility'], name='Benchmark throwaway', budget=Decimal('1000'),
+    )
+    return reverse('delete_scenario', args=[scenario.id])
+
+
+def _throwaway_facility(portfolio):
+    facility = Facility.objects.create(
+        code_name='BENCH_TMP', display_name='Benchmark throwaway', created_by=portfolio['user'],
+    )
+    return reverse('delete_facility', args=[facility.id])
+
+
+def _optimise_payload(portfolio):
+    latest = Facility.objects.select_related('latest_emission').get(
+        pk=portfolio['facility'].pk,
+    ).latest_emission
+    payload = {'name': 'Benchmark run', 'mode': 'budget', 'budget': '50000', 'date': latest.date}
+    payload.update({field: getattr(latest, field) for field in EMISSION_FIELD_LABELS})
+    return payload
+
+
+def request_cases(portfolio):
+    """
+    One case per route (several for routes with a slug choice). Each case is
+    a dict: name, method, url (or a setup callable returning the URL, run
+    outside the measurement), and optional POST data.
+    """
+    fid = portfolio['facility'].id
+    iid = portfolio['intervention'].id
+    sid = portfolio['scenario'].id
+    get = lambda name, *args: {'name': name, 'method': 'get', 'url': reverse(name, args=args)}
+    post = lambda name, *args, data=None: {
+        'name': name, 'method': 'post', 'url': reverse(name, args=args), 'data': data or {},
+    }
+    cases = [
+        get('home'),
+        get('dashboard'),
+        *[dict(get('dashboard_chart', c), name=f'dashboard_chart:{c}')
+          for c in ('sources', 'facilities', 'monthly')],
+        get('facilities'),
+        get('facility_detail', fid),
+        *[dict(get('facility_chart', fid, c), name=f'facility_chart:{c}')
+          for c in ('categories', 'bar')],
+        get('facility_emission_history', fid),
+        get('add_facility'),
+        get('interventions'),
+        get('optimize_interventions', fid),
+        dict(post('optimize_interventions', fid, data=_optimise_payload(portfolio)),
+             name='optimize_interventions:post'),
+        get('optimization_results', sid),
+        get('upload_emissions'),
+        get('upload_interventions'),
+        get('my_organisation'),
+        get('methodology'),
+        get('district_planning'),
+        get('district_chart'),
+        *[dict(get('export_data', dataset, fmt), name=f'export_data:{dataset}.{fmt}')
+          for dataset in ('emissions', 'tco2e', 'interventions') for fmt in ('csv', 'ndjson')],
+        get('api_facilities'),
+        get('api_facility', fid),
+        get('api_facility_emissions', fid),
+        get('api_facility_interventions', fid),
+        get('api_facility_scenarios', fid),
+        get('api_scenario', sid),
+        get('metrics'),
+        # Write paths. Toggle flips the link each run; detach/attach and the
+        # bulk pair restore what they remove; deletes get fresh throwaways.
+        post('toggle_intervention', fid, iid),
+        post('detach_intervention', fid, iid),
+        post('attach_intervention', fid, iid),
+        post('bulk_detach_interventions', fid),
+        post('bulk_attach_interventions', fid),
+        {'name': 'delete_scenario', 'method': 'post', 'url': _throwaway_scenario},
+        {'name': 'delete_facility', 'method': 'post', 'url': _throwaway_facility},
+    ]
+    return cases
+
+
+def _run(client, case, portfolio):
+    url = case['url'](portfolio) if callable(case['url']) else case['url']
+    send = getattr(client, case['method'])
+    data = dict(case.get('data') or {})
+    if case['method'] == 'post':
+        # A fresh form each run, as a browser sends; a repeated key would
+        # time the idempotent replay instead of the view
+        data[KEY_FIELD] = uuid.uuid4().hex
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        response = send(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - start
+    db = sum(float(q['time']) for q in ctx.captured_queries)
+    return response.status_code, len(ctx.captured_queries), db * 1000, elapsed * 1000
+
+
+def measure_case(client, case, portfolio, repeat=3, trace_memory=True):
+    """
+    Cold run (cache cleared) followed by `repeat` warm runs; then one more
+    run under tracemalloc for peak memory, kept out of the timings because
+    tracing slows everything down.
+    """
+    cache.clear()
+    status, queries, db_ms, total_ms = _run(client, case, portfolio)
+    result = {
+        'status': status,
+        'queries': queries,
+        'db_ms': round(db_ms, 2),
+        'python_ms': round(total_ms - db_ms, 2),
+        'total_ms': round(total_ms, 2),
+    }
+    if repeat:
+        warm = [_run(client, case, portfolio) for _ in range(repeat)]
+        result.update({
+            'warm_queries': max(run[1] for run in warm),
+            'warm_total_ms': round(median(run[3] for run in warm), 2),
+        })
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            _run(client, case, portfolio)
+            result['peak_kib'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmark(client, n_facilities, months=36, repeat=3, trace_memory=True, seed=0):
+    """Seed a portfolio into the (empty) current database and measure every case."""
+    portfolio = seed_portfolio(n_facilities, months=months, seed=seed)
+    client.force_login(portfolio['user'])
+    return {
+        case['name']: measure_case(client, case, portfolio, repeat, trace_memory)
+        for case in request_cases(portfolio)
+    }
+
+
+def query_growth(results_by_size):
+    """
+    {case: (smallest_size_queries, largest_size_queries)} for every case
+    whose cold query count grows with portfolio size.
+    """
+    sizes = sorted(results_by_size, key=int)
+    small, large = results_by_size[sizes[0]], results_by_size[sizes[-1]]
+    return {
+        name: (small[name]['queries'], large[name]['queries'])
+        for name in large
+        if name in small and large[name]['queries'] > small[name]['queries']
+    }
+
+
+def latency_regressions(results_by_size, baseline, max_slowdown=1.5, min_delta_ms=5.0):
+    """
+    {"size/case": (baseline_ms, current_ms)} for every measurement slower
+    than max_slowdown × its baseline by more than min_delta_ms.
+    """
+    regressions = {}
+    for size, results in results_by_size.items():
+        for name, current in results.items():
+            before = baseline.get(str(size), {}).get(name)
+            if not before:
+                continue
+            was, now = before['total_ms'], current['total_ms']
+            if now > was * max_slowdown and now - was > min_delta_ms:
+                regressions[f'{size}/{name}'] = (was, now)
+    return regressions
@@ -0,0 +1,228 @@
+"""
+Idempotent form submissions.
+
+Cloud Run and Firebase Hosting may retry a POST, and users double-click.
+Views decorated with @idempotent(scope) run at most once per submission:
+
+  * Every form renders a fresh key ({% idempotency_key %} in
+    appname/templatetags/carbomica_extras.py); API clients may send an
+    Idempotency-Key header instead. A POST with neither is keyed by its
+    content, for IDEMPOTENCY_CONTENT_SECONDS only.
+  * The key is claimed by inserting a SubmissionRecord, whose unique
+    constraint makes the claim atomic across workers and instances. The row
+    also stores a hash of the form fields and the uploaded files' content.
+  * When the view redirects, the record keeps the redirect and the flash
+    messages it queued. A later POST with the same key and content gets the
+    same redirect and messages, and nothing is recomputed or rewritten. A
+    POST arriving while the first is still running waits for it for as long
+    as a queued expensive request would (ADMISSION_QUEUE_SECONDS), then gets
+    a 503 with Retry-After.
+  * Views that import files use @idempotent(scope, by_content=True). A POST
+    carrying files is also matched on content: the same form fields and
+    files, for the facility named by the form's `facility` field, at the
+    revision that facility had when the earlier import finished. Within
+    IDEMPOTENCY_CONTENT_SECONDS such a POST replays the earlier import even
+    under a new key, so the same file uploaded again from a freshly loaded
+    form imports nothing; any change to the facility since (a record
+    deleted, interventions detached) bumps its revision and the file is
+    imported again. POSTs without files (manual entry, single attachments)
+    are matched on their key only. Two identical uploads sent at the same
+    moment from two forms can both run.
+  * Any other outcome (a form re-rendered with errors, an exception) drops
+    the claim, so the submission can simply be sent again.
+
+Expired records are swept at most once per IDEMPOTENCY_PRUNE_SECONDS in
+the container (the turn is taken with cache.add); until then a claim
+ignores an expired record for its own key.
+
+The same key with different content is refused with a flash message: the
+user is sent back to the form, which renders a new key.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponseRedirect
+from django.utils import timezone
+
+from .admission import busy_response
+from .models import Facility, SubmissionRecord
+
+KEY_FIELD = 'idempotency_key'
+KEY_HEADER = 'Idempotency-Key'
+PRUNE_KEY = 'carbomica:idempotency:pruned'
+FILE_CHUNK = 64 * 1024
+# Poll interval while waiting for the first submission to finish
+POLL_START = 0.05
+POLL_MAX = 0.5
+
+
+def submission_hash(scope, request):
+    """SHA-256 of the URL, the form fields and every uploaded file's content."""
+    digest = hashlib.sha256()
+    digest.update(f'{scope}\x00{request.path}\x00'.encode())
+    fields = sorted(
+        (name, values) for name, values in request.POST.lists()
+        if name not in ('csrfmiddlewaretoken', KEY_FIELD)
+    )
+    digest.update(repr(fields).encode())
+    for name, files in sorted(request.FILES.lists()):
+        for upload in files:
+            digest.update(f'\x00{name}\x00{upload.size}\x00'.encode())
+            for chunk in upload.chunks(FILE_CHUNK):
+                digest.update(chunk)
+            upload.seek(0)
+    return digest.hexdigest()
+
+
+def _prune(now):
+    """Delete expired records, if no worker has done so in IDEMPOTENCY_PRUNE_SECONDS."""
+    if cache.add(PRUNE_KEY, now.isoformat(), settings.IDEMPOTENCY_PRUNE_SECONDS):
+        SubmissionRecord.objects.filter(expires_at__lte=now).delete()
+
+
+def _claim(user, scope, key, request_hash, ttl):
+    """(new pending record, None) if the key was free, else (None, existing record)."""
+    now = timezone.now()
+    _prune(now)
+    # This key's record if it has expired, or if it is a pending claim older
+    # than any request can run (it belongs to a killed worker)
+    SubmissionRecord.objects.filter(user=user, scope=scope, key=key).filter(
+        Q(expires_at__lte=now)
+        | Q(completed=False, created_at__lt=now - timedelta(seconds=settings.ADMISSION_LEASE_SECONDS))
+    ).delete()
+    try:
+        with transaction.atomic():
+            return SubmissionRecord.objects.create(
+                user=user, scope=scope, key=key, request_hash=request_hash,
+                created_at=now, expires_at=now + timedelta(seconds=ttl),
+            ), None
+    except IntegrityError:
+        return None, SubmissionRecord.objects.filter(user=user, scope=scope, key=key).first()
+
+
+def _queued_messages(request):
+    """Flash messages added during this request, as JSON-ready triples."""
+    storage = messages.get_messages(request)
+    return [
+        [message.level, str(message.message), message.extra_tags or '']
+        for message in getattr(storage, '_queued_messages', [])
+    ]
+
+
+def content_hash(request, request_hash):
+    """
+    request_hash combined with the current revision of the facility the
+    form targets; '' when the POST carries no files or names no facility.
+    """
+    facility_id = request.POST.get('facility', '')
+    if not request.FILES or not facility_id.isdecimal():
+        return ''
+    revision = Facility.objects.filter(pk=int(facility_id)).values_list('revision', flat=True).first()
+    if revision is None:
+        return ''
+    return hashlib.sha256(f'{request_hash}\x00{facility_id}\x00{revision}'.encode()).hexdigest()
+
+
+def _same_content(user, scope, state):
+    """A completed import with content hash `state` within IDEMPOTENCY_CONTENT_SECONDS, if any."""
+    now = timezone.now()
+    return SubmissionRecord.objects.filter(
+        user=user, scope=scope, content_hash=state, completed=True,
+        created_at__gte=now - timedelta(seconds=settings.IDEMPOTENCY_CONTENT_SECONDS),
+        expires_at__gt=now,
+    ).order_by('-created_at').first()
+
+
+def _replay(request, record):
+    for level, text, extra_tags in record.messages:
+        messages.add_message(request, level, text, extra_tags=extra_tags)
+    response = HttpResponseRedirect(record.location)
+    response['X-Carbomica-Replayed'] = '1'
+    return response
+
+
+def _wait_for(record, deadline):
+    """The record once completed; None if it was dropped or is still pending at `deadline`."""
+    delay = POLL_START
+    while time.monotonic() < deadline:
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, POLL_MAX)
+        record = SubmissionRecord.objects.filter(pk=record.pk).first()
+        if record is None or record.completed:
+            return record
+    return None
+
+
+def idempotent(scope, by_content=False):
+    """
+    Run a view's POSTs at most once per idempotency key (see module
+    docstring); with `by_content`, a file import also at most once per
+    content and facility revision within IDEMPOTENCY_CONTENT_SECONDS. Apply it below @login_required and above
+    @expensive, so a replay never waits for an admission slot.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+
+            request_hash = submission_hash(scope, request)
+            key = request.POST.get(KEY_FIELD) or request.headers.get(KEY_HEADER)
+            if key:
+                ttl = settings.IDEMPOTENCY_KEY_SECONDS
+                state = content_hash(request, request_hash) if by_content else ''
+                if state:
+                    earlier = _same_content(request.user, scope, state)
+                    if earlier is not None:
+                        return _replay(request, earlier)
+            else:
+                key, ttl = request_hash, settings.IDEMPOTENCY_CONTENT_SECONDS
+            key = key[:100]
+
+            deadline = time.monotonic() + settings.ADMISSION_QUEUE_SECONDS
+            while True:
+                record, existing = _claim(request.user, scope, key, request_hash, ttl)
+                if record is not None:
+                    break
+                if existing is None:
+                    continue  # released or expired between the insert and the read
+                if existing.request_hash != request_hash:
+                    messages.error(
+                        request,
+                        'This form was already submitted with different values. '
+                        'It has been reloaded; please submit it again.',
+                    )
+                    return HttpResponseRedirect(request.path)
+                if not existing.completed:
+                    existing = _wait_for(existing, deadline)
+                    if existing is None:
+                        if time.monotonic() >= deadline:
+                            return busy_response(request)
+                        continue  # the first attempt failed: run it ourselves
+                return _replay(request, existing)
+
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                record.delete()
+                raise
+            if response.status_code in (301, 302, 303) and not response.streaming:
+                record.completed = True
+                record.location = response['Location']
+                record.messages = _queued_messages(request)
+                # The revision the import left behind: re-uploading the file
+                # replays only while nothing else has changed the facility
+                record.content_hash = content_hash(request, request_hash) if by_content else ''
+                record.save(update_fields=['completed', 'location', 'messages', 'content_hash'])
+            else:
+                record.delete()
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,187 @@
+"""
+Per-request hot-path timings and per-view histograms.
+
+RequestMetricsMiddleware (appname/middleware.py) opens a RequestTimings for
+each request. While it is open, the engine stages below add to it:
+
+  db         — every SQL statement (query count and time)
+  tco2e      — compute_tco2e / sum_tco2e
+  optimizer  — CarbomicaOptimizer.run_all_scenarios
+  template   — template rendering (includes any lazy queries it triggers)
+
+The current request lives in a ContextVar, so work handed to worker
+threads by asgiref (sync_to_async, the async views' query pool) is still
+attributed to it. Outside a request every hook is a single ContextVar
+lookup. Plain Python only: modeling.py imports `timed` from here and must
+stay free of Django.
+
+Finished requests are folded into HISTOGRAMS, which the staff /metrics
+endpoint renders in Prometheus text format. Histograms are per process,
+so each gunicorn worker reports its own.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+STAGES = ('db', 'tco2e', 'optimizer', 'template')
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = ContextVar('carbomica_request_timings', default=None)
+# Stages already being timed in this context, so nested calls count once
+# (per thread: concurrent workers each time their own calls)
+_open_stages = ContextVar('carbomica_open_stages', default=frozenset())
+
+
+class RequestTimings:
+    """Stage totals for one request. Worker threads may add concurrently."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, queries=0):
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.queries += queries
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value (durations in ms)."""
+        parts = [f'total;dur={self.elapsed() * 1000:.1f}']
+        parts.append(f'db;dur={self.seconds["db"] * 1000:.1f};desc="{self.queries} queries"')
+        parts += [
+            f'{stage};dur={self.seconds[stage] * 1000:.1f}'
+            for stage in STAGES[1:] if self.seconds[stage]
+        ]
+        return ', '.join(parts)
+
+
+def current():
+    """The RequestTimings of the request being served, or None."""
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """Open a RequestTimings for the enclosed block and yield it."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """
+    Add the enclosed block's wall time to stage `name` of the current
+    request. Nested blocks of the same stage (sum_tco2e calling
+    compute_tco2e) count once.
+    """
+    timings = _current.get()
+    open_stages = _open_stages.get()
+    if timings is None or name in open_stages:
+        yield
+        return
+    token = _open_stages.set(open_stages | {name})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+        _open_stages.reset(token)
+
+
+def timed(name):
+    """Decorator form of stage(); a ContextVar lookup when no request is open."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting statements and time for the current request."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - start, queries=1)
+
+
+class Histograms:
+    """Cumulative Prometheus-style histograms keyed by (metric, labels)."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, buckets, labels, value):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0,
+                }
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def observe_request(self, view, timings):
+        """Fold one finished request into the per-view histograms."""
+        labels = {'view': view}
+        self.observe('carbomica_request_seconds', SECONDS_BUCKETS, labels, timings.elapsed())
+        self.observe('carbomica_request_queries', QUERY_BUCKETS, labels, timings.queries)
+        for name in STAGES:
+            self.observe(
+                'carbomica_stage_seconds', SECONDS_BUCKETS,
+                {'view': view, 'stage': name}, timings.seconds[name],
+            )
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            series = sorted(self._series.items())
+            snapshot = [(key, dict(s, counts=list(s['counts']))) for key, s in series]
+        lines, typed = [], set()
+        for (metric, labels), s in snapshot:
+            if metric not in typed:
+                lines.append(f'# TYPE {metric} histogram')
+                typed.add(metric)
+            label_str = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+            for bound, count in zip(s['buckets'], s['counts']):
+                lines.append(f'{metric}_bucket{{{label_str},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{label_str},le="+Inf"}} {s["count"]}')
+            lines.append(f'{metric}_sum{{{label_str}}} {s["sum"]:.6f}')
+            lines.append(f'{metric}_count{{{label_str}}} {s["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+HISTOGRAMS = Histograms()
@@ -1,10 +1,17 @@
 """
 backfill_facility_interventions — populate FacilityIntervention rows for
-every existing Facility, using the same _seed_facility_interventions
-helper that runs on facility creation.
+every existing Facility, with the same cost defaults that
+_seed_facility_interventions applies on facility creation.
 
-Idempotent: relies on the unique constraint (facility, intervention)
-added in migration 0011 + bulk_create(ignore_conflicts=True).
+One set-based INSERT … SELECT covers every (facility, intervention) pair
+that has no link yet, so the cost of a no-op run is a single query however
+large the portfolio. Costs come from DEFAULT_COSTS via a CASE on
+Intervention.code_name, falling back to PLACEHOLDER_COSTS; the stored
+financial metrics (ROI, NPV, …) are computed per code the same way.
+
+Idempotent: only missing pairs are selected, and ON CONFLICT DO NOTHING
+covers a concurrent run racing on the (facility, intervention) unique
+constraint added in migration 0011.
 
 Usage:
     python manage.py backfill_facility_interventions
@@ -14,11 +21,94 @@ Rollback (only deletes auto-attached rows, never user-edited ones):
     python manage.py shell -c "from appname.models import FacilityIntervention; \
         FacilityIntervention.objects.exclude(cost_source='USER').delete()"
 """
+from decimal import Decimal
+
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
+
+from appname.management.commands.sync_interventions import DEFAULT_COSTS
+from appname.modeling import intervention_financials
+from appname.models import Facility, FacilityIntervention, Intervention
+from appname.signals import adjust_platform_stats, facility_data_changed
+from appname.views import PLACEHOLDER_COSTS
+
+
+def _missing_links_sql():
+    """FROM/WHERE selecting every facility × intervention pair with no link."""
+    qn = connection.ops.quote_name
+    return (
+        f'FROM {qn(Facility._meta.db_table)} f CROSS JOIN {qn(Intervention._meta.db_table)} i '
+        f'WHERE NOT EXISTS (SELECT 1 FROM {qn(FacilityIntervention._meta.db_table)} x '
+        f'WHERE x.facility_id = f.id AND x.intervention_id = i.id)'
+    )
+
+
+def _link_values(costs):
+    """Column values of a link with these default costs, stored metrics included."""
+    values = {
+        'implementation_cost': Decimal(costs['impl']),
+        'maintenance_cost': Decimal(costs['maint']),
+        'annual_savings': Decimal(costs['savings']),
+    }
+    values.update(intervention_financials(*values.values()))
+    return values
+
 
-from appname.models import Facility, FacilityIntervention
-from appname.views import _seed_facility_interventions
+def _column_case(column):
+    """CASE i.code_name → the DEFAULT_COSTS link's value of `column`, else the placeholder's."""
+    whens, params = [], []
+    for code, costs in DEFAULT_COSTS.items():
+        whens.append('WHEN %s THEN %s')
+        params += [code, _link_values(costs)[column]]
+    return (
+        f'CASE i.code_name {" ".join(whens)} ELSE %s END',
+        params + [_link_values(PLACEHOLDER_COSTS)[column]],
+    )
+
+
+def insert_missing_links():
+    """
+    Attach every library intervention a facility lacks, in one statement.
+    Returns (rows_inserted, facility_ids_touched).
+    """
+    missing = _missing_links_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT DISTINCT f.id {missing}')
+        facility_ids = [row[0] for row in cursor.fetchall()]
+        if not facility_ids:
+            return 0, []
+        statuses = Intervention.ACTIVE_STATUSES
+        cursor.execute(
+            f'SELECT COUNT(*) {missing} AND i.status IN ({", ".join(["%s"] * len(statuses))})',
+            list(statuses),
+        )
+        active = cursor.fetchone()[0]
+
+        columns = list(_link_values(PLACEHOLDER_COSTS))
+        cases, params = [], []
+        for column in columns:
+            case, case_params = _column_case(column)
+            cases.append(case)
+            params += case_params
+        codes = list(DEFAULT_COSTS)
+        source = (
+            f'CASE WHEN i.code_name IN ({", ".join(["%s"] * len(codes))}) '
+            f"THEN 'DEFAULT' ELSE 'PLACEHOLDER' END"
+        )
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(FacilityIntervention._meta.db_table)} '
+            f'(facility_id, intervention_id, {", ".join(columns)}, '
+            'emission_reduction_achieved, roi, cost_source) '
+            f'SELECT f.id, i.id, {", ".join(cases)}, 0, 0, {source} {missing} '
+            'ON CONFLICT DO NOTHING',
+            params + codes,
+        )
+        inserted = cursor.rowcount
+    # Raw SQL bypasses post_save, so bump the revisions and the platform's
+    # active-intervention count ourselves.
+    facility_data_changed(facility_ids)
+    adjust_platform_stats(active_interventions=active)
+    return inserted, facility_ids
 
 
 class Command(BaseCommand):
@@ -32,29 +122,19 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        dry_run = options['dry_run']
-        facilities = Facility.objects.all()
-        self.stdout.write(f'Found {facilities.count()} facilities.')
-
-        total_created = 0
-        for facility in facilities:
-            existing = FacilityIntervention.objects.filter(facility=facility).count()
-            if dry_run:
-                self.stdout.write(
-                    f'  [DRY] {facility.display_name}: {existing} existing rows, '
-                    f'would seed remaining.'
-                )
-                continue
-            with transaction.atomic():
-                created, skipped = _seed_facility_interventions(facility)
-            total_created += created
+        if options['dry_run']:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*), COUNT(DISTINCT f.id) {_missing_links_sql()}')
+                pairs, facilities = cursor.fetchone()
             self.stdout.write(
-                f'  {facility.display_name}: +{created} created, {skipped} already present.'
+                f'  [DRY] {pairs} missing links across {facilities} facilities would be created.'
             )
-
-        if dry_run:
             self.stdout.write(self.style.WARNING('Dry run — no rows written.'))
-        else:
-            self.stdout.write(self.style.SUCCESS(
-                f'\nDone — {total_created} new FacilityIntervention rows created.'
-            ))
+            return
+
+        with transaction.atomic():
+            inserted, facility_ids = insert_missing_links()
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {inserted} new FacilityIntervention rows created '
+            f'across {len(facility_ids)} facilities.'
+        ))
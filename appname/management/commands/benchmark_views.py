@@ -0,0 +1,113 @@
+"""
+benchmark_views — query-count and latency regression benchmark for every
+view in appname/urls.py.
+
+Creates a throwaway test database, and for each portfolio size seeds that
+many facilities (× every library intervention × N months of records),
+drives every route through the test client and records query count, DB
+time, Python time and peak memory. Never touches the configured database.
+
+Fails (exit 1) when:
+  * any view's query count is higher at the largest size than the smallest
+    (an N+1 crept in), or
+  * with --baseline, any view is slower than --max-slowdown × its baseline
+    time by more than --min-delta-ms.
+
+Usage:
+    python manage.py benchmark_views
+    python manage.py benchmark_views --sizes 10,100 --months 12 --output bench.json
+    python manage.py benchmark_views --baseline benchmarks/baseline.json
+    python manage.py benchmark_views --output benchmarks/baseline.json   # refresh the baseline
+"""
+import json
+import platform
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from appname.benchmarking import latency_regressions, query_growth, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query counts and latency of every view across portfolio sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000',
+                            help='Comma-separated facility counts (default: 10,100,1000).')
+        parser.add_argument('--months', type=int, default=36,
+                            help='Monthly emission records per facility (default: 36).')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Warm runs per view after the cold run (default: 3).')
+        parser.add_argument('--output', help='Write the JSON report to this path.')
+        parser.add_argument('--baseline', help='Compare timings against this earlier report.')
+        parser.add_argument('--max-slowdown', type=float, default=1.5,
+                            help='Allowed ratio to the baseline time (default: 1.5).')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help='Ignore slowdowns smaller than this many ms (default: 5).')
+        parser.add_argument('--no-memory', action='store_true',
+                            help='Skip the tracemalloc peak-memory run.')
+
+    def handle(self, *args, **options):
+        sizes = sorted({int(s) for s in options['sizes'].split(',') if s.strip()})
+        if not sizes:
+            raise CommandError('--sizes needs at least one facility count.')
+        baseline = None
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())['results']
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = {}
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                self.stdout.write(f'Benchmarking {size} facilities × {options["months"]} months…')
+                results[str(size)] = run_benchmark(
+                    Client(), size, months=options['months'], repeat=options['repeat'],
+                    trace_memory=not options['no_memory'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'months': options['months'],
+            'results': results,
+        }
+        self._print_table(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, sort_keys=True))
+            self.stdout.write(f'Report written to {options["output"]}')
+
+        failures = []
+        if len(sizes) > 1:
+            for name, (small, large) in sorted(query_growth(results).items()):
+                failures.append(f'{name}: {small} → {large} queries as the portfolio grows')
+        if baseline is not None:
+            regressions = latency_regressions(
+                results, baseline, options['max_slowdown'], options['min_delta_ms'],
+            )
+            for key, (was, now) in sorted(regressions.items()):
+                failures.append(f'{key}: {was:.1f} ms → {now:.1f} ms')
+        if failures:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No query-count growth or latency regressions.'))
+
+    def _print_table(self, results):
+        sizes = list(results)
+        header = f'{"view":<36}' + ''.join(f'{s + " q":>10}{s + " ms":>12}' for s in sizes)
+        self.stdout.write(header)
+        for name in results[sizes[0]]:
+            line = f'{name:<36}'
+            for size in sizes:
+                r = results[size].get(name, {})
+                line += f'{r.get("queries", "-"):>10}{r.get("total_ms", "-"):>12}'
+            self.stdout.write(line)
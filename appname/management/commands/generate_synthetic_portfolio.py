@@ -0,0 +1,94 @@
+"""
+generate_synthetic_portfolio — create a production-scale synthetic
+portfolio (organisations × facilities × monthly emission records ×
+intervention links) for performance work. Deterministic for a given --seed
+and --end-month; all inserts are batched and run in one transaction.
+
+Usage:
+    python manage.py generate_synthetic_portfolio --organisations 10 --facilities-per-org 10
+    python manage.py generate_synthetic_portfolio --organisations 50 --facilities-per-org 20 \\
+        --months 36 --interventions-per-facility 20 --seed 7 --end-month 2026-06
+    python manage.py generate_synthetic_portfolio --clear   # remove a previous SYN portfolio first
+
+Sizing: rows of EmissionData = organisations × facilities-per-org × months
+(e.g. 100 × 280 × 36 ≈ 1,000,000).
+
+Rollback:
+    python manage.py generate_synthetic_portfolio --clear --organisations 0
+"""
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from appname.models import Facility, Intervention, Organisation
+from appname.signals import batched_facility_changes
+from appname.synthetic import generate_portfolio
+
+
+class Command(BaseCommand):
+    help = 'Generate a large deterministic synthetic portfolio with bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organisations', type=int, default=10)
+        parser.add_argument('--facilities-per-org', type=int, default=10)
+        parser.add_argument('--months', type=int, default=36,
+                            help='Monthly emission records per facility (default: 36).')
+        parser.add_argument('--interventions-per-facility', type=int, default=None,
+                            help='Random library subset per facility (default: whole library).')
+        parser.add_argument('--members-per-org', type=int, default=2,
+                            help='Members besides the owner (default: 2).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--end-month', help='Last month generated, YYYY-MM (default: this month).')
+        parser.add_argument('--prefix', default='SYN',
+                            help='Prefix for generated names, used by --clear (default: SYN).')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete a previously generated portfolio with this prefix first.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        end_month = None
+        if options['end_month']:
+            try:
+                year, month = (int(part) for part in options['end_month'].split('-'))
+                end_month = date(year, month, 1)
+            except ValueError:
+                raise CommandError('--end-month must look like 2026-06.')
+
+        if options['clear']:
+            self._clear(prefix)
+        if options['organisations'] <= 0 or options['facilities_per_org'] <= 0:
+            return
+
+        if not Intervention.objects.exists():
+            self.stdout.write('Intervention library empty — running sync_interventions first.')
+            call_command('sync_interventions', verbosity=0, stdout=self.stdout)
+
+        started = time.perf_counter()
+        counts = generate_portfolio(
+            organisations=options['organisations'],
+            facilities_per_org=options['facilities_per_org'],
+            months=options['months'],
+            interventions_per_facility=options['interventions_per_facility'],
+            members_per_org=options['members_per_org'],
+            seed=options['seed'],
+            prefix=prefix,
+            end_month=end_month,
+            stdout=self.stdout,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {elapsed:.1f}s — {counts["organisations"]} organisations, '
+            f'{counts["facilities"]} facilities, {counts["emission_records"]} emission records, '
+            f'{counts["intervention_links"]} intervention links.'
+        ))
+
+    def _clear(self, prefix):
+        with transaction.atomic(), batched_facility_changes():
+            facilities, _ = Facility.objects.filter(code_name__startswith=f'{prefix}_').delete()
+            Organisation.objects.filter(name__startswith=f'{prefix} Organisation ').delete()
+            User.objects.filter(username__startswith=f'{prefix.lower()}_user_').delete()
+        self.stdout.write(f'Cleared previous {prefix} portfolio ({facilities} rows).')
@@ -0,0 +1,135 @@
+"""
+load_test — fire concurrent GETs at a running server and report
+throughput and latency percentiles, to compare deployment modes (e.g. the
+WSGI workers against SERVER_MODE=asgi) on the same container size.
+
+Signs in by writing a session for --user straight into the configured
+database, so point it at the same database the server under test uses.
+
+Usage:
+    # one run per server mode, same data, same container
+    python manage.py load_test --base-url http://localhost:8080 --user alice \\
+        --path / --path /dashboard/ --concurrency 32 --requests 2000 --output wsgi.json
+    python manage.py load_test --base-url http://localhost:8081 --user alice \\
+        --path / --path /dashboard/ --concurrency 32 --requests 2000 --output asgi.json
+    python manage.py load_test --compare wsgi.json asgi.json
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return round(sorted_values[index], 1)
+
+
+def _session_cookie(username):
+    try:
+        user = User.objects.get(username=username)
+    except User.DoesNotExist:
+        raise CommandError(f'No user named {username!r} in this database.')
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def _fetch(url, cookie, timeout):
+    request = urllib.request.Request(url, headers={'Cookie': cookie} if cookie else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, (time.perf_counter() - start) * 1000
+
+
+def run_load(urls, cookie, concurrency, total, timeout=30):
+    """Issue `total` GETs round-robin over `urls` from `concurrency` threads."""
+    targets = [urls[i % len(urls)] for i in range(total)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda url: _fetch(url, cookie, timeout), targets))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(ms for status, ms in results if status and status < 400)
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': sum(1 for status, _ in results if not status or status >= 400),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': _percentile(latencies, 50),
+        'p95_ms': _percentile(latencies, 95),
+        'p99_ms': _percentile(latencies, 99),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Load-test a running server and report requests/s and latency percentiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8080')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request; repeat for several (default: / and /dashboard/).')
+        parser.add_argument('--user', help='Username to sign in as (omit for anonymous).')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=20,
+                            help='Unmeasured requests first, to fill caches and pools (default: 20).')
+        parser.add_argument('--output', help='Write the JSON result to this path.')
+        parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                            help='Compare two earlier --output files instead of running.')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self._compare(*options['compare'])
+            return
+
+        base = options['base_url'].rstrip('/')
+        urls = [base + path for path in (options['paths'] or ['/', '/dashboard/'])]
+        cookie = _session_cookie(options['user']) if options['user'] else None
+        if options['warmup']:
+            run_load(urls, cookie, options['concurrency'], options['warmup'])
+        result = run_load(urls, cookie, options['concurrency'], options['requests'])
+        result.update({'base_url': base, 'paths': [url[len(base):] for url in urls]})
+
+        self.stdout.write(
+            f'{result["requests"]} requests, concurrency {result["concurrency"]}: '
+            f'{result["rps"]} req/s, p50 {self._ms(result["p50_ms"])}, '
+            f'p95 {self._ms(result["p95_ms"])}, p99 {self._ms(result["p99_ms"])}, '
+            f'{result["errors"]} errors'
+        )
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(result, indent=2))
+            self.stdout.write(f'Result written to {options["output"]}')
+        if result['errors'] == result['requests']:
+            raise CommandError('Every request failed — is the server running and the user valid?')
+
+    def _compare(self, before_path, after_path):
+        before = json.loads(Path(before_path).read_text())
+        after = json.loads(Path(after_path).read_text())
+        self.stdout.write(f'{"":<8}{before_path:>20}{after_path:>20}')
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errors'):
+            self.stdout.write(f'{key:<8}{before.get(key)!s:>20}{after.get(key)!s:>20}')
+
+    @staticmethod
+    def _ms(value):
+        return '-' if value is None else f'{value:.1f} ms'
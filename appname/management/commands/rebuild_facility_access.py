@@ -0,0 +1,40 @@
+"""
+rebuild_facility_access — recompute the FacilityAccess table (who can see
+which facility) from Facility.created_by and organisation membership.
+
+The table is normally kept in step by appname.signals; this command is the
+consistency check and repair path after raw SQL edits, restores, or
+anything else that bypasses model signals.
+
+Usage:
+    python manage.py rebuild_facility_access
+    python manage.py rebuild_facility_access --check   # report drift, exit 1 if any
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from appname.access import rebuild_facility_access
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FacilityAccess table from facility owners and organisation members.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report missing/stale rows without writing; fail if any are found.',
+        )
+
+    def handle(self, *args, **options):
+        check = options['check']
+        added, removed = rebuild_facility_access(dry_run=check)
+        if check:
+            if added or removed:
+                raise CommandError(
+                    f'FacilityAccess is out of date: {added} missing, {removed} stale rows.'
+                )
+            self.stdout.write(self.style.SUCCESS('FacilityAccess is consistent.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {added} rows added, {removed} stale rows removed.'
+        ))
@@ -0,0 +1,78 @@
+"""
+rebuild_platform_stats — recount PlatformStats (the anonymous home page's
+platform-wide totals) and every facility's stored emissions_tco2e from the
+source tables.
+
+Both are normally kept in step by appname.signals, one delta per write;
+this command is the consistency check and repair path after raw SQL edits,
+restores, or anything else that bypasses model signals. Emission records
+are streamed, so it runs in constant memory on any portfolio size.
+
+Usage:
+    python manage.py rebuild_platform_stats
+    python manage.py rebuild_platform_stats --check   # report drift, exit 1 if any
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from appname.models import Facility, PlatformStats
+from appname.stats import (
+    STAT_FIELDS,
+    compute_platform_stats,
+    rebuild_platform_stats,
+    recount_facility_emissions,
+)
+
+
+class Command(BaseCommand):
+    help = 'Recount platform-wide statistics and per-facility emission totals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report drift without writing; fail if any is found.',
+        )
+
+    def handle(self, *args, **options):
+        wrong_facilities = recount_facility_emissions()
+        for facility_id, (stored, recounted) in wrong_facilities.items():
+            self.stdout.write(f'  Facility {facility_id}: emissions_tco2e {stored} → {recounted}')
+
+        if options['check']:
+            drift = self._stats_drift(wrong_facilities)
+            for name, (stored, counted) in drift.items():
+                self.stdout.write(f'  PlatformStats.{name}: {stored} → {counted}')
+            if wrong_facilities or drift:
+                raise CommandError(
+                    f'Platform statistics are out of date: {len(wrong_facilities)} facility '
+                    f'totals and {len(drift)} platform figures differ.'
+                )
+            self.stdout.write(self.style.SUCCESS('Platform statistics are consistent.'))
+            return
+
+        with transaction.atomic():
+            facilities = list(Facility.objects.filter(id__in=wrong_facilities).only('id'))
+            for facility in facilities:
+                facility.emissions_tco2e = wrong_facilities[facility.id][1]
+            Facility.objects.bulk_update(facilities, ['emissions_tco2e'], batch_size=500)
+            stats = rebuild_platform_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {len(facilities)} facility totals corrected; {stats.facility_count} facilities, '
+            f'{stats.total_tco2e} tCO₂e, {stats.active_interventions} active interventions, '
+            f'{stats.optimized_scenarios} optimised scenarios.'
+        ))
+
+    @staticmethod
+    def _stats_drift(wrong_facilities):
+        """{field: (stored, counted)} for every PlatformStats figure that is off."""
+        stored = PlatformStats.objects.filter(pk=PlatformStats.SINGLETON_ID).values(*STAT_FIELDS).first()
+        if stored is None:
+            return {}  # not counted yet; the first read of the home page counts it
+        counted = compute_platform_stats()
+        # compute_platform_stats sums the stored per-facility totals; correct them
+        counted['total_tco2e'] += sum(new - old for old, new in wrong_facilities.values())
+        return {
+            name: (stored[name], counted[name])
+            for name in STAT_FIELDS if stored[name] != counted[name]
+        }
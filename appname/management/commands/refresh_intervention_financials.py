@@ -0,0 +1,84 @@
+"""
+refresh_intervention_financials — recompute the financial metrics stored on
+every FacilityIntervention (total_cost, roi_pct, payback_years, npv) from
+its costs.
+
+FacilityIntervention.save() keeps them current and the bulk writers compute
+them as they insert; this command is the batch job for everything else:
+raw SQL edits, restores, or a change to the NPV horizon or DISCOUNT_RATE in
+appname.modeling. Links are read in id order 2000 at a time, so it runs in
+constant memory on any portfolio size, and only links whose stored values
+differ are written (one executemany UPDATE per chunk).
+
+Usage:
+    python manage.py refresh_intervention_financials
+    python manage.py refresh_intervention_financials --check   # report drift, exit 1 if any
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from appname.modeling import intervention_financials
+from appname.models import FacilityIntervention
+
+CHUNK_SIZE = 2000
+
+FIELDS = FacilityIntervention.FINANCIAL_FIELDS
+
+
+def stale_financials():
+    """Yield, per chunk of links, [(link_id, recomputed metrics)] for every
+    link whose stored metrics differ from a recomputation."""
+    links = FacilityIntervention.objects.values_list(
+        'id', 'implementation_cost', 'maintenance_cost', 'annual_savings', 'roi', *FIELDS,
+    ).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(links.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        stale = []
+        for link_id, impl, maint, savings, roi, *stored in chunk:
+            metrics = intervention_financials(impl, maint, savings, roi)
+            if stored != [metrics[name] for name in FIELDS]:
+                stale.append((link_id, metrics))
+        if stale:
+            yield stale
+
+
+def write_financials(stale):
+    """Store recomputed metrics: one UPDATE by primary key per link, batched."""
+    qn = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE id = %s'.format(
+        qn(FacilityIntervention._meta.db_table),
+        ', '.join(f'{qn(name)} = %s' for name in FIELDS),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (*(metrics[name] for name in FIELDS), link_id) for link_id, metrics in stale
+        ])
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored ROI, NPV, payback and total cost of every facility intervention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report links with out-of-date metrics without writing; fail if any.',
+        )
+
+    def handle(self, *args, **options):
+        changed = 0
+        for stale in stale_financials():
+            changed += len(stale)
+            if not options['check']:
+                write_financials(stale)
+
+        if options['check']:
+            if changed:
+                raise CommandError(f'{changed} facility interventions have out-of-date financial metrics.')
+            self.stdout.write(self.style.SUCCESS('Stored financial metrics are up to date.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Done — {changed} facility interventions updated.'))
@@ -0,0 +1,101 @@
+"""
+sync_emission_factors — carry a change to the emission factor tables
+(EMISSION_FACTORS / ELECTRICITY_EF in appname.modeling) into the data
+derived from them.
+
+Every facility stores tCO₂e computed with the factors of the day
+(latest_tco2e, emissions_tco2e, and through them PlatformStats), and every
+ETag served for a facility is keyed on its revision. When a deploy changes
+a factor, this command recomputes the stored figures and bumps each
+facility's revision, so cached charts, API responses and pages all
+revalidate. It skips itself when the factor hash matches the one recorded
+by the last run (LibrarySyncState) — the common case on a cold start.
+
+The first run on a database records the hash without recomputing: the
+stored figures were written with the factors the code already has.
+
+Usage:
+    python manage.py sync_emission_factors
+    python manage.py sync_emission_factors --force    # recompute even if unchanged
+    python manage.py sync_emission_factors --check    # exit 1 if the factors changed
+"""
+import hashlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from appname.models import Facility, LibrarySyncState
+from appname.modeling import ELECTRICITY_EF, EMISSION_FACTORS
+from appname.signals import facility_data_changed, refresh_latest_emission
+
+SYNC_STATE_NAME = 'emission_factors'
+
+# Facilities recomputed per transaction; each chunk streams its own records
+FACILITY_CHUNK = 500
+
+
+def factor_hash():
+    """SHA-256 of the factor tables; changes whenever any factor does."""
+    content = json.dumps(
+        [EMISSION_FACTORS, ELECTRICITY_EF],
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored tCO₂e and bump facility revisions after an emission factor change.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute even when the factor hash is unchanged.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report whether the factors changed since the last sync without writing; fail if so.',
+        )
+
+    def handle(self, *args, **options):
+        content_hash = factor_hash()
+        stored = LibrarySyncState.objects.filter(
+            name=SYNC_STATE_NAME,
+        ).values_list('content_hash', flat=True).first()
+
+        if options['check']:
+            if stored is not None and stored != content_hash:
+                raise CommandError(
+                    f'Emission factors changed ({stored[:12]} → {content_hash[:12]}); '
+                    f'stored tCO₂e is out of date.'
+                )
+            self.stdout.write(self.style.SUCCESS('Stored tCO₂e matches the emission factors.'))
+            return
+
+        if not options['force']:
+            if stored == content_hash:
+                self.stdout.write(f'Emission factors unchanged ({content_hash[:12]}) — skipped.')
+                return
+            if stored is None:
+                self._record(content_hash)
+                self.stdout.write(f'Recorded emission factors ({content_hash[:12]}).')
+                return
+
+        facility_ids = list(Facility.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(facility_ids), FACILITY_CHUNK):
+            chunk = facility_ids[start:start + FACILITY_CHUNK]
+            with transaction.atomic():
+                refresh_latest_emission(chunk)
+                facility_data_changed(chunk)
+        self._record(content_hash)
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — recomputed tCO₂e for {len(facility_ids)} facilities ({content_hash[:12]}).'
+        ))
+
+    @staticmethod
+    def _record(content_hash):
+        LibrarySyncState.objects.update_or_create(
+            name=SYNC_STATE_NAME, defaults={'content_hash': content_hash},
+        )
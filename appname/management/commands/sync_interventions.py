@@ -2,16 +2,31 @@
 sync_interventions — seed / refresh the Intervention table from INTERVENTION_LIBRARY.
 
 Creates missing interventions and updates existing ones if the display name matches.
-Safe to run multiple times (idempotent).
+Safe to run multiple times (idempotent). Existing rows are loaded once and
+diffed in memory; changes go out as one bulk_create and one bulk_update, so
+the query count does not grow with the library.
+
+Skips itself when the content hash of INTERVENTION_LIBRARY / DEFAULT_COSTS /
+REDUCTION_PCT matches the one stored by the last sync (LibrarySyncState) and
+every library entry is present — the common case on a cold start.
 
 Usage:
     python manage.py sync_interventions
+    python manage.py sync_interventions --force    # sync even if unchanged
+    python manage.py sync_interventions --check    # report the diff, exit 1 if any
 """
-from django.core.management.base import BaseCommand
+import hashlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
-from appname.models import Intervention
+from appname.models import Intervention, LibrarySyncState
 from appname.modeling import INTERVENTION_LIBRARY
+from appname.signals import library_changed
+from appname.stats import recount_platform_stats
+
+SYNC_STATE_NAME = 'interventions'
 
 
 # Default cost assumptions (USD) for each intervention type.
@@ -197,43 +212,124 @@ REDUCTION_PCT = {
 }
 
 
+def library_hash():
+    """SHA-256 of everything the sync writes from; changes whenever any entry does."""
+    content = json.dumps(
+        [INTERVENTION_LIBRARY, DEFAULT_COSTS, REDUCTION_PCT],
+        sort_keys=True, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _library_values(code, data):
+    """Field values the sync writes for one library entry (everything but code_name)."""
+    return {
+        'display_name':               data['display_name'],
+        'description':                data.get('notes', ''),
+        'sdg_goals':                  ','.join(str(g) for g in data.get('sdg_goals', [])),
+        'emission_reduction_percentage': REDUCTION_PCT.get(code, 0),
+        'energy_savings':             DEFAULT_COSTS.get(code, {}).get('savings', 0),
+        'status':                     'Planned',
+        'target_category':            ','.join(data.get('reduces', {}).keys()),
+    }
+
+
+def library_diff():
+    """
+    Compare the Intervention table with the library in one query.
+    Returns (to_create, to_update) — unsaved new Intervention objects, and
+    (existing object with library values applied, changed field names) pairs.
+    """
+    existing = {
+        iv.code_name: iv
+        for iv in Intervention.objects.filter(code_name__in=INTERVENTION_LIBRARY)
+    }
+    to_create, to_update = [], []
+    for code, data in INTERVENTION_LIBRARY.items():
+        values = _library_values(code, data)
+        obj = existing.get(code)
+        if obj is None:
+            to_create.append(Intervention(code_name=code, **values))
+            continue
+        changed = [
+            name for name, value in values.items()
+            if getattr(obj, name) != Intervention._meta.get_field(name).to_python(value)
+        ]
+        for name in changed:
+            setattr(obj, name, values[name])
+        if changed:
+            to_update.append((obj, changed))
+    return to_create, to_update
+
+
 class Command(BaseCommand):
     help = 'Seed Intervention table from the CARBOMICA intervention library in modeling.py'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Sync even when the library hash is unchanged.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report entries that would be created or updated without writing; fail if any.',
+        )
+
     def handle(self, *args, **options):
-        created_count = 0
-        updated_count = 0
+        content_hash = library_hash()
+        check = options['check']
+        if not (options['force'] or check) and self._up_to_date(content_hash):
+            self.stdout.write(f'Library unchanged ({content_hash[:12]}) — skipped.')
+            return
+
+        to_create, to_update = library_diff()
+        for obj in to_create:
+            self.stdout.write(f'  {"Would create" if check else "Created"}: {obj.display_name}')
+        for obj, changed in to_update:
+            self.stdout.write(
+                f'  {"Would update" if check else "Updated"}: {obj.display_name} ({", ".join(changed)})'
+            )
+        unchanged = len(INTERVENTION_LIBRARY) - len(to_create) - len(to_update)
+
+        if check:
+            if to_create or to_update:
+                raise CommandError(
+                    f'Intervention table is out of date: {len(to_create)} missing, '
+                    f'{len(to_update)} changed.'
+                )
+            self.stdout.write(self.style.SUCCESS('Intervention table matches the library.'))
+            return
 
         with transaction.atomic():
-            for code, data in INTERVENTION_LIBRARY.items():
-                costs = DEFAULT_COSTS.get(code, {})
-                sdg_str = ','.join(str(g) for g in data.get('sdg_goals', []))
-
-                target_cats = ','.join(data.get('reduces', {}).keys())
-
-                obj, created = Intervention.objects.update_or_create(
-                    code_name=code,
-                    defaults={
-                        'display_name':               data['display_name'],
-                        'description':                data.get('notes', ''),
-                        'sdg_goals':                  sdg_str,
-                        'emission_reduction_percentage': REDUCTION_PCT.get(code, 0),
-                        'energy_savings':             costs.get('savings', 0),
-                        'status':                     'Planned',
-                        'target_category':            target_cats,
-                    },
-                )
-                if created:
-                    created_count += 1
-                    self.stdout.write(f'  Created: {data["display_name"]}')
-                else:
-                    updated_count += 1
-                    self.stdout.write(f'  Updated: {data["display_name"]}')
+            Intervention.objects.bulk_create(to_create)
+            if to_update:
+                fields = sorted({name for _, changed in to_update for name in changed})
+                Intervention.objects.bulk_update([obj for obj, _ in to_update], fields)
+                if 'status' in fields:
+                    # bulk_update skips the status-change signal
+                    recount_platform_stats('active_interventions')
+            if to_create or to_update:
+                # bulk writes skip the signal that rotates the library version
+                library_changed()
+            LibrarySyncState.objects.update_or_create(
+                name=SYNC_STATE_NAME, defaults={'content_hash': content_hash},
+            )
 
         self.stdout.write(self.style.SUCCESS(
-            f'\nDone — {created_count} created, {updated_count} updated.'
+            f'\nDone — {len(to_create)} created, {len(to_update)} updated, {unchanged} unchanged.'
         ))
         self.stdout.write(
             'Next: go to Upload data → Facility interventions to attach these to a facility '
             'with site-specific costs.'
         )
+
+    def _up_to_date(self, content_hash):
+        """Stored hash matches and no library entry has gone missing since."""
+        stored = LibrarySyncState.objects.filter(
+            name=SYNC_STATE_NAME, content_hash=content_hash,
+        ).exists()
+        return stored and Intervention.objects.filter(
+            code_name__in=INTERVENTION_LIBRARY,
+        ).count() == len(INTERVENTION_LIBRARY)
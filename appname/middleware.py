@@ -0,0 +1,121 @@
+"""
+Request middleware.
+
+RequestMetricsMiddleware times every request's hot paths (see
+appname.instrumentation), adds them to the response as a Server-Timing
+header, and folds them into the per-view histograms behind /metrics.
+
+ProfilerMiddleware profiles a single request on demand for staff users
+(see appname.profiling).
+"""
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from .instrumentation import HISTOGRAMS, collect, record_query
+from .profiling import profiled, save_capture
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Carbomica-Profile'
+# Values of the parameter or header that switch profiling on
+PROFILE_ON = {'1', 'true', 'yes', 'on'}
+
+
+def _install_query_recorder(connection, **kwargs):
+    # First in the list, so connection.execute_wrapper() blocks — which pop
+    # the last wrapper on exit — never remove it
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def _install_query_recorder_signal(sender, connection, **kwargs):
+    _install_query_recorder(connection)
+
+
+class RequestMetricsMiddleware:
+    """
+    Server-Timing + per-view histograms. Works under WSGI and ASGI; queries
+    run in the async views' worker threads are counted too, because the
+    recorder sits on every connection and finds the request via ContextVar.
+    Streaming responses are timed up to the first byte only.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(
+            _install_query_recorder_signal, dispatch_uid='carbomica-query-recorder',
+        )
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect() as timings:
+            response = self.get_response(request)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        with collect() as timings:
+            response = await self.get_response(request)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        match = getattr(request, 'resolver_match', None)
+        HISTOGRAMS.observe_request(match.view_name if match else '<unresolved>', timings)
+        response['Server-Timing'] = timings.server_timing()
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    Profile one request when a staff user adds ?_profile=1 or sends an
+    X-Carbomica-Profile: 1 header. The capture is stored as a ProfileCapture
+    and the response carries its admin URL in X-Carbomica-Profile. Every
+    other request pays one attribute check.
+
+    Works under WSGI and ASGI. Under ASGI unflagged requests stay on the
+    event loop; a flagged one is profiled in a worker thread that drives the
+    rest of the stack with async_to_sync, so the sync views it reaches run
+    on that thread and show up in cProfile.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not (self._flagged(request) and request.user.is_staff):
+            return self.get_response(request)
+        return self._profile(self.get_response, request)
+
+    async def __acall__(self, request):
+        if not (self._flagged(request) and (await request.auser()).is_staff):
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(async_to_sync(self.get_response), request)
+
+    @staticmethod
+    def _flagged(request):
+        flags = (request.GET.get(PROFILE_PARAM), request.headers.get(PROFILE_HEADER))
+        return any((flag or '').strip().lower() in PROFILE_ON for flag in flags)
+
+    @staticmethod
+    def _profile(get_response, request):
+        with profiled() as capture:
+            response = get_response(request)
+        if capture is None:
+            response[PROFILE_HEADER] = 'busy'
+            return response
+        saved = save_capture(capture, request, response)
+        response[PROFILE_HEADER] = reverse('admin:appname_profilecapture_change', args=[saved.pk])
+        return response
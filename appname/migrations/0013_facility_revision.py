@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0012_alter_optimizationscenario_budget_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facility',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='facility',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_facility_access(apps, schema_editor):
+    """Materialise grants for every existing facility (owner + org members)."""
+    Facility = apps.get_model('appname', 'Facility')
+    FacilityAccess = apps.get_model('appname', 'FacilityAccess')
+    Membership = apps.get_model('appname', 'Organisation').members.through
+
+    members_by_org = {}
+    for org_id, user_id in Membership.objects.values_list('organisation_id', 'user_id'):
+        members_by_org.setdefault(org_id, []).append(user_id)
+
+    rows = []
+    for facility_id, owner_id, org_id in Facility.objects.values_list(
+        'id', 'created_by_id', 'organisation_id',
+    ):
+        if owner_id is not None:
+            rows.append(FacilityAccess(user_id=owner_id, facility_id=facility_id, via_org=False))
+        for user_id in members_by_org.get(org_id, []):
+            rows.append(FacilityAccess(user_id=user_id, facility_id=facility_id, via_org=True))
+    FacilityAccess.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0013_facility_revision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacilityAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('via_org', models.BooleanField(default=False, help_text='True when granted through organisation membership rather than ownership.')),
+                ('facility', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_grants', to='appname.facility')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facility_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Facility Access',
+                'verbose_name_plural': 'Facility Access',
+                'constraints': [models.UniqueConstraint(fields=('user', 'facility', 'via_org'), name='uniq_facility_access')],
+            },
+        ),
+        migrations.RunPython(populate_facility_access, migrations.RunPython.noop),
+    ]
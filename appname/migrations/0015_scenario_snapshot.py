@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0014_facility_access'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScenarioSnapshot',
+            fields=[
+                ('scenario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='appname.optimizationscenario')),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Scenario Snapshot',
+                'verbose_name_plural': 'Scenario Snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:23
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Frozen copy of appname.modeling's factor tables and compute_tco2e as of
+# this migration, so it computes the same figures whatever the live module
+# becomes (tCO₂e per unit; grid electricity is per country)
+ELECTRICITY_EF = {
+    'ZW': Decimal('0.000556'),
+    'ZA': Decimal('0.000928'),
+    'KE': Decimal('0.000032'),
+    'OTHER': Decimal('0.000400'),
+}
+EMISSION_FACTORS = {
+    'grid_electricity': None,
+    'grid_gas': Decimal('0.00202'),
+    'bottled_gas': Decimal('0.00214'),
+    'liquid_fuel': Decimal('0.00268'),
+    'vehicle_fuel_owned': Decimal('0.00268'),
+    'business_travel': Decimal('0.000171'),
+    'anaesthetic_gases': Decimal('0.802'),
+    'refrigeration_gases': Decimal('1.800'),
+    'waste_management': Decimal('0.467'),
+    'medical_inhalers': Decimal('0.0189'),
+    'contractor_logistics': Decimal('0.000267'),
+}
+
+
+def tco2e_total(record, country):
+    electricity_ef = ELECTRICITY_EF.get(country, ELECTRICITY_EF['OTHER'])
+    total = Decimal('0')
+    for field, factor in EMISSION_FACTORS.items():
+        raw = getattr(record, field, None) or Decimal('0')
+        ef = electricity_ef if field == 'grid_electricity' else (factor or Decimal('0'))
+        total += Decimal(str(raw)) * ef
+    return total
+
+
+def populate_latest_emission(apps, schema_editor):
+    """Point every facility at its newest record and store its tCO₂e total."""
+    Facility = apps.get_model('appname', 'Facility')
+    EmissionData = apps.get_model('appname', 'EmissionData')
+    Facility.objects.update(latest_emission_id=Subquery(
+        EmissionData.objects
+        .filter(emission_source__facility=OuterRef('pk'))
+        .order_by('-date', '-id')
+        .values('id')[:1]
+    ))
+    facilities = list(
+        Facility.objects.filter(latest_emission__isnull=False).select_related('latest_emission')
+    )
+    for facility in facilities:
+        facility.latest_tco2e = tco2e_total(facility.latest_emission, facility.country)
+    Facility.objects.bulk_update(facilities, ['latest_tco2e'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0015_scenario_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facility',
+            name='latest_emission',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='appname.emissiondata'),
+        ),
+        migrations.AddField(
+            model_name='facility',
+            name='latest_tco2e',
+            field=models.DecimalField(blank=True, decimal_places=4, editable=False, max_digits=18, null=True),
+        ),
+        migrations.RunPython(populate_latest_emission, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0016_facility_latest_emission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibrarySyncState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Library Sync State',
+                'verbose_name_plural': 'Library Sync State',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0017_library_sync_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2000)),
+                ('view_name', models.CharField(blank=True, default='', max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('sql_ms', models.FloatField()),
+                ('peak_memory_kb', models.PositiveIntegerField()),
+                ('stats_report', models.TextField(help_text='cProfile functions by cumulative time.')),
+                ('stats_data', models.BinaryField(help_text='Marshalled pstats; download from admin and load with pstats.Stats.')),
+                ('allocations', models.TextField(help_text='Top tracemalloc allocation sites.')),
+                ('sql_log', models.JSONField(default=list, help_text='[{"sql", "params", "ms"}, …] in execution order.')),
+                ('explain', models.TextField(blank=True, default='', help_text='EXPLAIN output for the slowest SELECTs.')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profile Capture',
+                'verbose_name_plural': 'Profile Captures',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
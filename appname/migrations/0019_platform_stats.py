@@ -0,0 +1,89 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:06
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copy of appname.modeling's factor tables and compute_tco2e as of
+# this migration, so it computes the same figures whatever the live module
+# becomes (tCO₂e per unit; grid electricity is per country)
+ELECTRICITY_EF = {
+    'ZW': Decimal('0.000556'),
+    'ZA': Decimal('0.000928'),
+    'KE': Decimal('0.000032'),
+    'OTHER': Decimal('0.000400'),
+}
+EMISSION_FACTORS = {
+    'grid_electricity': None,
+    'grid_gas': Decimal('0.00202'),
+    'bottled_gas': Decimal('0.00214'),
+    'liquid_fuel': Decimal('0.00268'),
+    'vehicle_fuel_owned': Decimal('0.00268'),
+    'business_travel': Decimal('0.000171'),
+    'anaesthetic_gases': Decimal('0.802'),
+    'refrigeration_gases': Decimal('1.800'),
+    'waste_management': Decimal('0.467'),
+    'medical_inhalers': Decimal('0.0189'),
+    'contractor_logistics': Decimal('0.000267'),
+}
+
+
+def tco2e_total(record, country):
+    electricity_ef = ELECTRICITY_EF.get(country, ELECTRICITY_EF['OTHER'])
+    total = Decimal('0')
+    for field, factor in EMISSION_FACTORS.items():
+        raw = getattr(record, field, None) or Decimal('0')
+        ef = electricity_ef if field == 'grid_electricity' else (factor or Decimal('0'))
+        total += Decimal(str(raw)) * ef
+    return total
+
+
+def populate_emissions_tco2e(apps, schema_editor):
+    """Store each facility's all-records tCO₂e total, streaming the records."""
+    Facility = apps.get_model('appname', 'Facility')
+    EmissionData = apps.get_model('appname', 'EmissionData')
+    rows = EmissionData.objects.values_list(
+        'emission_source__facility_id', 'emission_source__facility__country',
+        *EMISSION_FACTORS, named=True,
+    )
+    totals = defaultdict(Decimal)
+    for row in rows.iterator(chunk_size=2000):
+        totals[row.emission_source__facility_id] += tco2e_total(
+            row, row.emission_source__facility__country,
+        )
+    facilities = list(Facility.objects.filter(id__in=totals).only('id'))
+    for facility in facilities:
+        facility.emissions_tco2e = totals[facility.id].quantize(Decimal('0.0001'))
+    Facility.objects.bulk_update(facilities, ['emissions_tco2e'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0018_profile_capture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facility_count', models.BigIntegerField(default=0)),
+                ('total_tco2e', models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ('active_interventions', models.BigIntegerField(default=0)),
+                ('optimized_scenarios', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Platform Stats',
+                'verbose_name_plural': 'Platform Stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='facility',
+            name='emissions_tco2e',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, max_digits=20),
+        ),
+        migrations.RunPython(populate_emissions_tco2e, migrations.RunPython.noop),
+    ]
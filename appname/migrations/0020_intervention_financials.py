@@ -0,0 +1,95 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:32
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+FINANCIAL_FIELDS = ('total_cost', 'roi_pct', 'payback_years', 'npv')
+# Frozen copy of appname.modeling's calculate_npv and intervention_financials
+# as of this migration, so it computes the same figures whatever the live
+# module becomes
+DISCOUNT_RATE = Decimal('0.08')
+
+
+def calculate_npv(annual_savings, implementation_cost, years=10, discount_rate=DISCOUNT_RATE):
+    annual_savings = Decimal(str(annual_savings))
+    implementation_cost = Decimal(str(implementation_cost))
+    npv = -implementation_cost
+    for year in range(1, years + 1):
+        npv += annual_savings / (1 + discount_rate) ** year
+    return round(npv, 2)
+
+
+def intervention_financials(implementation_cost, maintenance_cost, annual_savings, fallback_roi=Decimal('0')):
+    impl = Decimal(str(implementation_cost or 0))
+    savings = Decimal(str(annual_savings or 0))
+    total = impl + Decimal(str(maintenance_cost or 0))
+    cent = Decimal('0.01')
+    roi = savings / total * 100 if total > 0 else Decimal(str(fallback_roi or 0))
+    return {
+        'total_cost': total.quantize(cent),
+        'roi_pct': roi.quantize(cent),
+        'payback_years': (total / savings).quantize(cent) if savings > 0 else None,
+        'npv': calculate_npv(savings, impl),
+    }
+
+
+def populate_financials(apps, schema_editor):
+    """
+    Compute the stored metrics of every existing link, 2000 rows at a time.
+    One executemany UPDATE by primary key per chunk: bulk_update's CASE over
+    the whole batch makes each row's update linear in the batch size.
+    """
+    FacilityIntervention = apps.get_model('appname', 'FacilityIntervention')
+    connection = schema_editor.connection
+    qn = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE id = %s'.format(
+        qn(FacilityIntervention._meta.db_table),
+        ', '.join(f'{qn(name)} = %s' for name in FINANCIAL_FIELDS),
+    )
+    links = FacilityIntervention.objects.values_list(
+        'id', 'implementation_cost', 'maintenance_cost', 'annual_savings', 'roi',
+    ).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(links.filter(id__gt=last_id)[:2000])
+        if not chunk:
+            break
+        params = []
+        for link_id, impl, maint, savings, roi in chunk:
+            metrics = intervention_financials(impl, maint, savings, roi)
+            params.append((*(metrics[name] for name in FINANCIAL_FIELDS), link_id))
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0019_platform_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facilityintervention',
+            name='npv',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='facilityintervention',
+            name='payback_years',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='facilityintervention',
+            name='roi_pct',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='facilityintervention',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(populate_financials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0020_intervention_financials'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=100)),
+                ('request_hash', models.CharField(max_length=64)),
+                ('completed', models.BooleanField(default=False)),
+                ('location', models.CharField(blank=True, default='', max_length=2000)),
+                ('messages', models.JSONField(default=list, help_text='[[level, message, extra_tags], …] to replay.')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Submission Record',
+                'verbose_name_plural': 'Submission Records',
+                'constraints': [models.UniqueConstraint(fields=('user', 'scope', 'key'), name='unique_submission_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0021_submission_records'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submissionrecord',
+            index=models.Index(fields=['user', 'scope', 'request_hash'], name='submission_content_idx'),
+        ),
+    ]
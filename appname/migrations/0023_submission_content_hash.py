@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appname', '0022_submission_content_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='submissionrecord',
+            name='submission_content_idx',
+        ),
+        migrations.AddField(
+            model_name='submissionrecord',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text="File imports only: the request hash plus the target facility's revision after the import.", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='submissionrecord',
+            index=models.Index(fields=['user', 'scope', 'content_hash'], name='submission_content_idx'),
+        ),
+    ]
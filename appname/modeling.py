@@ -11,6 +11,8 @@ Funded by: European Union — Horizon Europe Grant No. 101057843 (HIGH Horizons)
 """
 from decimal import Decimal
 
+from .instrumentation import timed
+
 # ---------------------------------------------------------------------------
 # Country-specific electricity costs (USD / kWh)
 # Sources: ZESA (ZW), Eskom standard tariff (ZA), Kenya Power residential (KE)
@@ -67,6 +69,7 @@ EMISSION_FACTORS = {
 }
 
 
+@timed('tco2e')
 def compute_tco2e(emission_data, country='OTHER'):
     """
     Convert raw usage quantities stored in an EmissionData record to tCO₂e.
@@ -88,6 +91,7 @@ def compute_tco2e(emission_data, country='OTHER'):
     return results
 
 
+@timed('tco2e')
 def sum_tco2e(emission_data_qs, country='OTHER'):
     """Sum tCO₂e across a queryset of EmissionData records for one facility."""
     return sum(compute_tco2e(ed, country)['total'] for ed in emission_data_qs) or Decimal('0')
@@ -843,6 +847,7 @@ class CarbomicaOptimizer:
         roi = ((annual_savings * 10 - cost) / cost * 100) if cost > 0 else Decimal('0')
         return {
             'priority': priority,
+            'intervention_id': fi.intervention_id,
             'intervention_name': fi.intervention.display_name,
             'facility_name': fi.facility.display_name,
             'cost': cost,
@@ -920,6 +925,7 @@ class CarbomicaOptimizer:
         """Scenario 3: greedy — best tCO2e-per-USD first until the constraint is hit."""
         return self._select(sorted(self.interventions, key=self._cost_effectiveness, reverse=True))
 
+    @timed('optimizer')
     def run_all_scenarios(self):
         full = self.full_coverage()
         fixed = self.fixed_budget()
@@ -948,6 +954,26 @@ def calculate_npv(annual_savings, implementation_cost, years=10, discount_rate=D
     return round(npv, 2)
 
 
+def intervention_financials(implementation_cost, maintenance_cost, annual_savings, fallback_roi=Decimal('0')):
+    """
+    Financial metrics stored on every FacilityIntervention (see
+    FacilityIntervention.refresh_financials): total cost (implementation +
+    maintenance), ROI % as FacilityIntervention.calculate_roi defines it,
+    simple payback in years (None without savings) and 10-year NPV.
+    """
+    impl = Decimal(str(implementation_cost or 0))
+    savings = Decimal(str(annual_savings or 0))
+    total = impl + Decimal(str(maintenance_cost or 0))
+    cent = Decimal('0.01')
+    roi = savings / total * 100 if total > 0 else Decimal(str(fallback_roi or 0))
+    return {
+        'total_cost': total.quantize(cent),
+        'roi_pct': roi.quantize(cent),
+        'payback_years': (total / savings).quantize(cent) if savings > 0 else None,
+        'npv': calculate_npv(savings, impl),
+    }
+
+
 class GreenInvestmentAnalyzer:
     """Financial analysis for individual facility interventions."""
 
@@ -1,9 +1,14 @@
+import json
+import zlib
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .modeling import intervention_financials
+
 class Organisation(models.Model):
     """
     A team of users who share access to the same set of facilities.
@@ -58,6 +63,27 @@ class Facility(models.Model):
         related_name='facilities',
         help_text='Organisation this facility belongs to. All org members can access it.'
     )
+    # Bumped (never reset) by appname.signals whenever anything that feeds a
+    # facility's numbers changes — emission records, intervention links,
+    # scenarios or the facility itself. Together with updated_at it is the
+    # validator behind the API's ETag / Last-Modified headers.
+    revision = models.PositiveBigIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Maintained by appname.signals on every EmissionData write (and on a
+    # country change): the facility's newest record by (date, id) and its
+    # tCO₂e total, so list pages and roll-ups need no emission query.
+    latest_emission = models.ForeignKey(
+        'EmissionData', null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name='+',
+    )
+    latest_tco2e = models.DecimalField(
+        max_digits=18, decimal_places=4, null=True, blank=True, editable=False,
+    )
+    # Maintained alongside latest_tco2e: tCO₂e summed over all of the
+    # facility's records. Changes to it are folded into PlatformStats.
+    emissions_tco2e = models.DecimalField(
+        max_digits=20, decimal_places=4, default=0, editable=False,
+    )
 
     class Meta:
         verbose_name = _('Facility')
@@ -67,6 +93,34 @@ class Facility(models.Model):
     def __str__(self):
         return self.display_name
 
+class FacilityAccess(models.Model):
+    """
+    Materialised "who can see which facility" table — one row per grant,
+    maintained by appname.access.sync_facility_access from Facility.created_by
+    and Organisation.members. Lets access checks run as one indexed
+    semi-join instead of an OR across two joins plus DISTINCT.
+    Rebuild from source with `manage.py rebuild_facility_access`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='facility_access')
+    facility = models.ForeignKey(Facility, on_delete=models.CASCADE, related_name='access_grants')
+    via_org = models.BooleanField(
+        default=False,
+        help_text='True when granted through organisation membership rather than ownership.'
+    )
+
+    class Meta:
+        verbose_name = _('Facility Access')
+        verbose_name_plural = _('Facility Access')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'facility', 'via_org'],
+                name='uniq_facility_access',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} → {self.facility}"
+
 class EmissionSource(models.Model):
     facility = models.ForeignKey(Facility, related_name='emission_sources', on_delete=models.CASCADE)
     code_name = models.CharField(max_length=100)
@@ -116,6 +170,9 @@ class EmissionData(models.Model):
         )
 
 class Intervention(models.Model):
+    # Statuses counted as active on the home page and in PlatformStats
+    ACTIVE_STATUSES = ('Planned', 'In Progress')
+
     code_name = models.CharField(max_length=100)
     display_name = models.CharField(max_length=100)
     status = models.CharField(
@@ -169,6 +226,50 @@ class Intervention(models.Model):
     def __str__(self):
         return self.display_name
 
+class LibrarySyncState(models.Model):
+    """
+    Content hash of the last intervention library written by
+    sync_interventions, so a cold start with an unchanged library skips the
+    per-entry sync. One row per synced source: 'interventions', and
+    'emission_factors' for sync_emission_factors. The 'library_version' row
+    holds a random token rotated on every Intervention write (see
+    appname.signals.library_changed).
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    content_hash = models.CharField(max_length=64)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Library Sync State')
+        verbose_name_plural = _('Library Sync State')
+
+    def __str__(self):
+        return f"{self.name} @ {self.content_hash[:12]}"
+
+class PlatformStats(models.Model):
+    """
+    Platform-wide totals for the anonymous home page, kept current by
+    appname.signals with a delta per write instead of being recounted per
+    request. A single row (pk=1); appname.stats.platform_stats() creates it
+    from a full count on first read. Check or repair it with
+    `manage.py rebuild_platform_stats`.
+    """
+    SINGLETON_ID = 1
+
+    facility_count = models.BigIntegerField(default=0)
+    total_tco2e = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+    # Links whose intervention is Planned or In Progress
+    active_interventions = models.BigIntegerField(default=0)
+    optimized_scenarios = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Platform Stats')
+        verbose_name_plural = _('Platform Stats')
+
+    def __str__(self):
+        return f"{self.facility_count} facilities, {self.total_tco2e} tCO₂e"
+
 class FacilityIntervention(models.Model):
     facility = models.ForeignKey(Facility, related_name='facility_interventions', on_delete=models.CASCADE)
     intervention = models.ForeignKey(Intervention, related_name='facility_interventions', on_delete=models.CASCADE)
@@ -213,6 +314,15 @@ class FacilityIntervention(models.Model):
         ],
         help_text="Provenance of cost values — used for rollback and 'verify before reporting' UI badges.",
     )
+    # Derived from the costs above by refresh_financials() on every save();
+    # bulk writers call it themselves (or compute the same values in SQL).
+    # The interventions page filters, sorts and sums on these columns.
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    roi_pct = models.DecimalField(max_digits=16, decimal_places=2, default=0, editable=False)
+    payback_years = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
+    npv = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
+    FINANCIAL_FIELDS = ('total_cost', 'roi_pct', 'payback_years', 'npv')
 
     class Meta:
         verbose_name = _('Facility Intervention')
@@ -232,6 +342,20 @@ class FacilityIntervention(models.Model):
             return (self.annual_savings / total_cost) * 100
         return self.roi
 
+    def refresh_financials(self):
+        """Recompute the stored financial metrics from the current costs."""
+        metrics = intervention_financials(
+            self.implementation_cost, self.maintenance_cost, self.annual_savings, self.roi,
+        )
+        for name, value in metrics.items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        self.refresh_financials()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.FINANCIAL_FIELDS}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.facility.display_name} - {self.intervention.display_name}"
 
@@ -302,6 +426,35 @@ class OptimizationResult(models.Model):
     def __str__(self):
         return f"{self.scenario.name} - {self.intervention.display_name}"
 
+class ScenarioSnapshot(models.Model):
+    """
+    All three optimiser scenarios (results + summaries) and the inputs that
+    produced them, stored as zlib-compressed JSON alongside the scenario.
+    OptimizationResult only keeps the optimised ranking; this is what the
+    results page renders.
+    """
+    scenario = models.OneToOneField(
+        OptimizationScenario, related_name='snapshot', on_delete=models.CASCADE, primary_key=True,
+    )
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Scenario Snapshot')
+        verbose_name_plural = _('Scenario Snapshots')
+
+    def __str__(self):
+        return f"{self.scenario.name} snapshot"
+
+    @staticmethod
+    def encode(data):
+        """Compact JSON, zlib-compressed. Decimals must already be floats."""
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(bytes(self.payload)))
+
 class EffectSize(models.Model):
     facility = models.ForeignKey(Facility, related_name='effect_sizes', on_delete=models.CASCADE)
     recycling_waste_segregation = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.0)])
@@ -361,3 +514,70 @@ class Policy(models.Model):
 
     def __str__(self):
         return self.name
+
+class ProfileCapture(models.Model):
+    """
+    One staff-requested profile of a single request (see
+    appname.middleware.ProfilerMiddleware): cProfile stats, the top
+    tracemalloc allocations, and every SQL statement with EXPLAIN output
+    for the slowest ones. Viewed and downloaded in admin.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    view_name = models.CharField(max_length=200, blank=True, default='')
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    sql_ms = models.FloatField()
+    peak_memory_kb = models.PositiveIntegerField()
+    stats_report = models.TextField(help_text='cProfile functions by cumulative time.')
+    stats_data = models.BinaryField(help_text='Marshalled pstats; download from admin and load with pstats.Stats.')
+    allocations = models.TextField(help_text='Top tracemalloc allocation sites.')
+    sql_log = models.JSONField(default=list, help_text='[{"sql", "params", "ms"}, …] in execution order.')
+    explain = models.TextField(blank=True, default='', help_text='EXPLAIN output for the slowest SELECTs.')
+
+    class Meta:
+        verbose_name = _('Profile Capture')
+        verbose_name_plural = _('Profile Captures')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+class SubmissionRecord(models.Model):
+    """
+    One idempotent form submission (appname.idempotency): the key the form
+    carried, a hash of its inputs and uploaded file contents, and, once the
+    view finished, the redirect and flash messages it produced. A retried or
+    double-clicked POST with the same key replays those instead of running
+    the view again. Rows are dropped once expires_at has passed.
+    """
+    user = models.ForeignKey(User, related_name='submission_records', on_delete=models.CASCADE)
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=100)
+    request_hash = models.CharField(max_length=64)
+    content_hash = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text="File imports only: the request hash plus the target facility's revision after the import.",
+    )
+    completed = models.BooleanField(default=False)
+    location = models.CharField(max_length=2000, blank=True, default='')
+    messages = models.JSONField(default=list, help_text='[[level, message, extra_tags], …] to replay.')
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = _('Submission Record')
+        verbose_name_plural = _('Submission Records')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_submission_key'),
+        ]
+        indexes = [
+            # File imports are also matched on content under a new key
+            models.Index(fields=['user', 'scope', 'content_hash'], name='submission_content_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key[:12]} ({'done' if self.completed else 'pending'})"
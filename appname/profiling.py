@@ -0,0 +1,160 @@
+"""
+Single-request profiling for staff (ProfilerMiddleware in
+appname/middleware.py).
+
+A profiled request runs under cProfile and tracemalloc with every SQL
+statement logged; the result is stored as a ProfileCapture. Only one
+request per process is profiled at a time: cProfile cannot nest, and
+tracemalloc is process-wide, so a second concurrent capture would only
+muddle both. Requests arriving while a capture is running are served
+normally.
+
+tracemalloc sees allocations from every thread in the process, so on a
+busy worker the allocation list includes other requests' work; the
+cProfile stats and SQL log are this request's only.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+
+from django.db import DatabaseError, connections, transaction
+
+STATS_LIMIT = 60          # functions in the stored text report
+ALLOCATION_LIMIT = 25     # allocation sites kept
+EXPLAIN_LIMIT = 3         # slowest SELECTs explained
+SQL_LOG_LIMIT = 2000      # statements kept in the log
+
+_capture_lock = threading.Lock()
+
+
+class Capture:
+    """What one profiled request produced, before it is saved."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.queries = []  # (alias, sql, params, seconds)
+        self.duration = 0.0
+        self.allocations = ''
+        self.peak_memory = 0
+
+    def _log_query(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append((alias, sql, params, time.perf_counter() - start))
+        return wrapper
+
+    def stats_report(self):
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(STATS_LIMIT)
+        return stream.getvalue()
+
+    def stats_data(self):
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+    def sql_log(self):
+        return [
+            {'sql': sql, 'params': _jsonable(params), 'ms': round(seconds * 1000, 3)}
+            for alias, sql, params, seconds in self.queries[:SQL_LOG_LIMIT]
+        ]
+
+    def explain(self):
+        """EXPLAIN the slowest SELECT statements, run after the request."""
+        selects = [q for q in self.queries if q[1].lstrip().upper().startswith('SELECT')]
+        selects.sort(key=lambda q: q[3], reverse=True)
+        sections = []
+        for alias, sql, params, seconds in selects[:EXPLAIN_LIMIT]:
+            connection = connections[alias]
+            prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+            try:
+                # Savepoint so a failing EXPLAIN cannot break an open transaction
+                with transaction.atomic(using=alias), connection.cursor() as cursor:
+                    cursor.execute(prefix + sql, params)
+                    plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+            except DatabaseError as exc:
+                plan = f'EXPLAIN failed: {exc}'
+            sections.append(f'-- {seconds * 1000:.1f} ms\n{sql}\n{plan}')
+        return '\n\n'.join(sections)
+
+
+def _jsonable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: _jsonable(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_jsonable(p) if isinstance(p, (list, tuple, dict)) else _param(p) for p in params]
+    return _param(params)
+
+
+def _param(value):
+    return value if value is None or isinstance(value, (bool, int, float, str)) else str(value)
+
+
+@contextmanager
+def profiled():
+    """
+    Profile the enclosed block. Yields a Capture, or None when another
+    request in this process is already being profiled.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        yield None
+        return
+    capture = Capture()
+    started_tracing = not tracemalloc.is_tracing()
+    try:
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(capture._log_query(connection.alias)))
+            start = time.perf_counter()
+            capture.profiler.enable()
+            try:
+                yield capture
+            finally:
+                capture.profiler.disable()
+                capture.duration = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        capture.peak_memory = tracemalloc.get_traced_memory()[1]
+        top = after.compare_to(before, 'lineno')[:ALLOCATION_LIMIT]
+        capture.allocations = '\n'.join(str(stat) for stat in top)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _capture_lock.release()
+
+
+def save_capture(capture, request, response):
+    """Store a finished Capture as a ProfileCapture and return it."""
+    from .models import ProfileCapture
+
+    match = getattr(request, 'resolver_match', None)
+    user = getattr(request, 'user', None)
+    return ProfileCapture.objects.create(
+        user=user if user is not None and user.is_authenticated else None,
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        view_name=match.view_name if match else '',
+        status_code=response.status_code,
+        duration_ms=round(capture.duration * 1000, 3),
+        query_count=len(capture.queries),
+        sql_ms=round(sum(q[3] for q in capture.queries) * 1000, 3),
+        peak_memory_kb=capture.peak_memory // 1024,
+        stats_report=capture.stats_report(),
+        stats_data=capture.stats_data(),
+        allocations=capture.allocations,
+        sql_log=capture.sql_log(),
+        explain=capture.explain(),
+    )
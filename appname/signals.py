@@ -0,0 +1,404 @@
+"""
+Model signal receivers that keep derived per-facility state in step with
+writes to the source tables.
+
+Every write that changes a facility's numbers — emission records,
+intervention links, optimisation scenarios, or the facility row itself —
+funnels into facility_data_changed(). Emission record writes also go through
+refresh_latest_emission(), which maintains Facility.latest_emission,
+latest_tco2e and emissions_tco2e. Signals do not fire for QuerySet.update()
+or bulk_create(), so code using those must call these itself (see
+views._seed_facility_interventions).
+
+Writes to the intervention library itself — a custom intervention, an
+admin edit, a sync_interventions run — go through library_changed(), which
+rotates the library version mixed into every facility ETag (see
+views._facility_validators), since pages and charts list library entries.
+
+Writes that change a platform-wide total — a facility created or deleted,
+a facility's emission total moving, an active intervention linked or
+unlinked, a scenario optimised — apply their delta to PlatformStats through
+adjust_platform_stats() (see appname.stats).
+
+Writes that change who can see a facility — creating, deleting or
+reassigning it, or editing organisation membership — resync its
+FacilityAccess rows, which rotates the affected users' cached access sets
+(see appname.access).
+
+Connected in AppnameConfig.ready().
+"""
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .access import invalidate_facility_access, invalidate_facility_dashboards, sync_facility_access
+from .modeling import compute_tco2e
+from .models import (
+    EmissionData,
+    EmissionSource,
+    Facility,
+    FacilityAccess,
+    FacilityIntervention,
+    Intervention,
+    LibrarySyncState,
+    Organisation,
+    OptimizationScenario,
+    PlatformStats,
+)
+from .stats import facility_emission_totals
+
+_batch = threading.local()
+
+
+def facility_data_changed(facility_ids):
+    """Bump revision/updated_at on the given facilities and drop the cached
+    dashboards of their users (or queue both when inside
+    batched_facility_changes())."""
+    facility_ids = {fid for fid in facility_ids if fid is not None}
+    if not facility_ids:
+        return
+    pending = getattr(_batch, 'facility_ids', None)
+    if pending is not None:
+        pending.update(facility_ids)
+        return
+    Facility.objects.filter(id__in=facility_ids).update(
+        revision=F('revision') + 1, updated_at=timezone.now(),
+    )
+    invalidate_facility_dashboards(facility_ids)
+    # Again after commit, in case a dashboard was rebuilt from the old rows
+    # while this transaction was still open.
+    transaction.on_commit(lambda: invalidate_facility_dashboards(facility_ids))
+
+
+LIBRARY_VERSION_STATE = 'library_version'
+LIBRARY_VERSION_CACHE_KEY = 'carbomica:library-version'
+
+
+def library_version():
+    """Token that changes whenever any Intervention is created, edited or
+    deleted. Read from the shared cache; a LibrarySyncState row backs it."""
+    version = cache.get(LIBRARY_VERSION_CACHE_KEY)
+    if version is None:
+        state, _ = LibrarySyncState.objects.get_or_create(
+            name=LIBRARY_VERSION_STATE, defaults={'content_hash': uuid.uuid4().hex},
+        )
+        version = state.content_hash
+        cache.set(LIBRARY_VERSION_CACHE_KEY, version, None)
+    return version
+
+
+def library_changed():
+    """Rotate library_version(), so every facility ETag (and the chart
+    payloads cached under them) moves on."""
+    version = uuid.uuid4().hex
+    if not LibrarySyncState.objects.filter(name=LIBRARY_VERSION_STATE).update(content_hash=version):
+        LibrarySyncState.objects.get_or_create(
+            name=LIBRARY_VERSION_STATE, defaults={'content_hash': version},
+        )
+    cache.delete(LIBRARY_VERSION_CACHE_KEY)
+    # Again after commit, in case a request cached the old row meanwhile
+    transaction.on_commit(lambda: cache.delete(LIBRARY_VERSION_CACHE_KEY))
+
+
+def adjust_platform_stats(**deltas):
+    """Add the given deltas to PlatformStats (or queue them when inside
+    batched_facility_changes()). A no-op until the row has first been
+    counted by appname.stats.platform_stats()."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    pending = getattr(_batch, 'stat_deltas', None)
+    if pending is not None:
+        for name, delta in deltas.items():
+            pending[name] = pending.get(name, 0) + delta
+        return
+    PlatformStats.objects.filter(pk=PlatformStats.SINGLETON_ID).update(
+        updated_at=timezone.now(),
+        **{name: F(name) + delta for name, delta in deltas.items()},
+    )
+
+
+def refresh_latest_emission(facility_ids):
+    """Re-point Facility.latest_emission / latest_tco2e at each facility's
+    newest record and recount its emissions_tco2e (or queue it when inside
+    batched_facility_changes())."""
+    facility_ids = {fid for fid in facility_ids if fid is not None}
+    if not facility_ids:
+        return
+    pending = getattr(_batch, 'emission_facility_ids', None)
+    if pending is not None:
+        pending.update(facility_ids)
+        return
+    Facility.objects.filter(id__in=facility_ids).update(latest_emission_id=Subquery(
+        EmissionData.objects
+        .filter(emission_source__facility=OuterRef('pk'))
+        .order_by('-date', '-id')
+        .values('id')[:1]
+    ))
+    facilities = list(
+        Facility.objects.filter(id__in=facility_ids).select_related('latest_emission')
+    )
+    totals = facility_emission_totals([facility.id for facility in facilities])
+    change = 0
+    for facility in facilities:
+        latest = facility.latest_emission
+        facility.latest_tco2e = compute_tco2e(latest, facility.country)['total'] if latest else None
+        change += totals[facility.id] - facility.emissions_tco2e
+        facility.emissions_tco2e = totals[facility.id]
+    Facility.objects.bulk_update(facilities, ['latest_tco2e', 'emissions_tco2e'])
+    adjust_platform_stats(total_tco2e=change)
+
+
+@contextmanager
+def batched_facility_changes():
+    """
+    Collapse the per-row signal work of a multi-row write (CSV import,
+    cascade delete) into one latest-record refresh and one bump per
+    facility at the end of the block. Nested blocks join the outermost one.
+    """
+    if getattr(_batch, 'facility_ids', None) is not None:
+        yield
+        return
+    _batch.facility_ids = set()
+    _batch.emission_facility_ids = set()
+    _batch.source_facility = {}
+    _batch.intervention_status = {}
+    _batch.stat_deltas = {}
+    try:
+        yield
+    finally:
+        _batch.source_facility = _batch.intervention_status = None
+        facility_ids, _batch.facility_ids = _batch.facility_ids, None
+        emission_facility_ids, _batch.emission_facility_ids = _batch.emission_facility_ids, None
+        stat_deltas, _batch.stat_deltas = _batch.stat_deltas, None
+        adjust_platform_stats(**stat_deltas)
+        # Pointer first, so dashboards dropped by the bump rebuild from it
+        refresh_latest_emission(emission_facility_ids)
+        facility_data_changed(facility_ids)
+
+
+def _facility_id_for_source(emission_source_id):
+    # Inside a batch (CSV import, cascade delete) many rows share a source,
+    # so remember each lookup until the batch ends.
+    memo = getattr(_batch, 'source_facility', None)
+    if memo is not None and emission_source_id in memo:
+        return memo[emission_source_id]
+    facility_id = (
+        EmissionSource.objects
+        .filter(id=emission_source_id)
+        .values_list('facility_id', flat=True)
+        .first()
+    )
+    if memo is not None:
+        memo[emission_source_id] = facility_id
+    return facility_id
+
+
+@receiver(post_save, sender=EmissionData)
+@receiver(post_delete, sender=EmissionData)
+def _emission_data_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    facility_id = _facility_id_for_source(instance.emission_source_id)
+    refresh_latest_emission([facility_id])
+    facility_data_changed([facility_id])
+
+
+@receiver(post_save, sender=FacilityIntervention)
+@receiver(post_delete, sender=FacilityIntervention)
+@receiver(post_save, sender=OptimizationScenario)
+@receiver(post_delete, sender=OptimizationScenario)
+def _facility_child_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    facility_data_changed([instance.facility_id])
+
+
+def _intervention_is_active(intervention_id):
+    # Memoised per batch: a cascade delete unlinks every intervention in turn
+    memo = getattr(_batch, 'intervention_status', None)
+    if memo is not None and intervention_id in memo:
+        return memo[intervention_id]
+    status = Intervention.objects.filter(pk=intervention_id).values_list('status', flat=True).first()
+    active = status in Intervention.ACTIVE_STATUSES
+    if memo is not None:
+        memo[intervention_id] = active
+    return active
+
+
+@receiver(post_save, sender=FacilityIntervention)
+def _link_saved(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw and _intervention_is_active(instance.intervention_id):
+        adjust_platform_stats(active_interventions=1)
+
+
+@receiver(post_delete, sender=FacilityIntervention)
+def _link_deleted(sender, instance, **kwargs):
+    if _intervention_is_active(instance.intervention_id):
+        adjust_platform_stats(active_interventions=-1)
+
+
+@receiver(pre_save, sender=Intervention)
+def _intervention_remember_status(sender, instance, raw=False, **kwargs):
+    instance._status_before = None if raw or instance.pk is None else (
+        Intervention.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Intervention)
+def _intervention_saved(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_status_before', None)
+    if before is None:
+        return
+    was_active = before in Intervention.ACTIVE_STATUSES
+    if was_active != (instance.status in Intervention.ACTIVE_STATUSES):
+        links = FacilityIntervention.objects.filter(intervention=instance).count()
+        adjust_platform_stats(active_interventions=-links if was_active else links)
+
+
+@receiver(post_save, sender=Intervention)
+@receiver(post_delete, sender=Intervention)
+def _library_entry_changed(sender, instance, **kwargs):
+    library_changed()
+
+
+@receiver(pre_save, sender=OptimizationScenario)
+def _scenario_remember_status(sender, instance, raw=False, **kwargs):
+    instance._status_before = None if raw or instance.pk is None else (
+        OptimizationScenario.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=OptimizationScenario)
+def _scenario_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_status_before', None)
+    adjust_platform_stats(
+        optimized_scenarios=(instance.status == 'Optimized') - (before == 'Optimized'),
+    )
+
+
+@receiver(post_delete, sender=OptimizationScenario)
+def _scenario_deleted(sender, instance, **kwargs):
+    if instance.status == 'Optimized':
+        adjust_platform_stats(optimized_scenarios=-1)
+
+
+def _organisation_facility_ids(organisation_ids):
+    return list(
+        Facility.objects
+        .filter(organisation_id__in=organisation_ids)
+        .values_list('id', flat=True)
+    )
+
+
+@receiver(pre_save, sender=Facility)
+def _facility_remember_owners(sender, instance, raw=False, **kwargs):
+    # Stash the stored owner/organisation/country so post_save can tell
+    # whether access or the stored latest tCO₂e changed.
+    instance._access_before = None
+    if raw or instance.pk is None:
+        return
+    stored = (
+        Facility.objects
+        .filter(pk=instance.pk)
+        .values_list(
+            'created_by_id', 'organisation_id', 'country',
+            'latest_emission_id', 'latest_tco2e', 'emissions_tco2e',
+        )
+        .first()
+    )
+    if stored is None:
+        return
+    instance._access_before = stored[:3]
+    # The latest-record pointer is owned by refresh_latest_emission(); never
+    # let a full save() of a stale in-memory instance write it back.
+    instance.latest_emission_id, instance.latest_tco2e, instance.emissions_tco2e = stored[3:]
+
+
+@receiver(post_save, sender=Facility)
+def _facility_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_access_before', None)
+    if created or before is None or before[:2] != (instance.created_by_id, instance.organisation_id):
+        sync_facility_access([instance.id])
+    if before is not None and before[2] != instance.country:
+        # Electricity factors are per country, so the stored total moves too
+        refresh_latest_emission([instance.id])
+        if getattr(_batch, 'emission_facility_ids', None) is None:
+            instance.refresh_from_db(fields=['latest_emission', 'latest_tco2e', 'emissions_tco2e'])
+    # A brand-new facility already starts at revision 1; edits to an
+    # existing one (name, country, organisation) change what it reports.
+    if created:
+        adjust_platform_stats(facility_count=1)
+    else:
+        facility_data_changed([instance.id])
+
+
+@receiver(pre_delete, sender=Facility)
+def _facility_remember_grantees(sender, instance, **kwargs):
+    # The FacilityAccess rows go with the facility (CASCADE), so capture
+    # who could see it while they still exist.
+    instance._grantees = list(
+        FacilityAccess.objects.filter(facility=instance).values_list('user_id', flat=True)
+    )
+    # Take the facility's emissions out of the platform total now and zero
+    # the stored figure, so the refresh its cascaded records trigger
+    # (immediately, or never when batched) has nothing left to subtract.
+    stored = Facility.objects.filter(pk=instance.pk).values_list('emissions_tco2e', flat=True).first()
+    if stored:
+        Facility.objects.filter(pk=instance.pk).update(emissions_tco2e=0)
+        adjust_platform_stats(total_tco2e=-stored)
+
+
+@receiver(post_delete, sender=Facility)
+def _facility_deleted(sender, instance, **kwargs):
+    invalidate_facility_access(getattr(instance, '_grantees', []))
+    adjust_platform_stats(facility_count=-1)
+
+
+@receiver(m2m_changed, sender=Organisation.members.through)
+def _membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=True means user.organisations.add(...): instance is the user
+    # and pk_set holds organisation IDs.
+    if action in ('post_add', 'post_remove'):
+        organisation_ids = (pk_set or []) if reverse else [instance.pk]
+        sync_facility_access(_organisation_facility_ids(organisation_ids))
+    elif action == 'pre_clear':
+        instance._organisations_before_clear = (
+            list(instance.organisations.values_list('id', flat=True)) if reverse else [instance.pk]
+        )
+    elif action == 'post_clear':
+        sync_facility_access(
+            _organisation_facility_ids(getattr(instance, '_organisations_before_clear', []))
+        )
+
+
+@receiver(post_save, sender=User)
+def _user_created(sender, instance, created=False, raw=False, **kwargs):
+    # Start every account with a fresh token so nothing cached under a
+    # recycled primary key (e.g. after a database restore) is ever served.
+    if created and not raw:
+        invalidate_facility_access([instance.pk])
+
+
+@receiver(pre_delete, sender=Organisation)
+def _organisation_remember_facilities(sender, instance, **kwargs):
+    instance._facility_ids = list(instance.facilities.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Organisation)
+def _organisation_deleted(sender, instance, **kwargs):
+    # Facilities are detached with SET_NULL (a bulk UPDATE, no signals),
+    # so their organisation grants are dropped here.
+    sync_facility_access(getattr(instance, '_facility_ids', []))
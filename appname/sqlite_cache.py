@@ -0,0 +1,287 @@
+"""
+Django cache backend on a local SQLite file, shared by every gunicorn
+worker in the container (settings.CACHES).
+
+LocMemCache keeps one copy per worker, so an invalidation in one worker
+(a rotated access token, a dropped dashboard) never reaches the others.
+This backend keeps one copy per container instead, with no Redis or
+Memcached to run:
+
+  * WAL journal: readers never block the writer or each other.
+  * Every write runs in a BEGIN IMMEDIATE transaction, which holds the
+    file's single write lock. That makes add() and incr()/decr() atomic
+    across processes, so incr() can back version counters.
+  * Bounded size: triggers keep an entry count and byte total. When
+    either goes over MAX_ENTRIES / MAX_BYTES, the least recently read
+    entries are dropped down to CULL_TO (default 90%) of the limits.
+    Expired entries go first.
+  * Read recency is written at most once per ACCESS_RESOLUTION seconds per
+    entry, so a hot key does not turn every read into a write.
+
+Values are pickled, as in Django's own database and file caches. Each
+thread has its own connection, which is reopened after a fork.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+ACCESS_RESOLUTION = 1.0
+# SQLite's default limit on host parameters is far above this
+KEYS_PER_STATEMENT = 500
+
+# Connections inherited from a parent process. Closing one in the child
+# would release the parent's POSIX locks on the file, so they are kept
+# referenced and never touched again.
+_inherited = []
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    '''CREATE TABLE IF NOT EXISTS cache_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        entries INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    )''',
+    'INSERT OR IGNORE INTO cache_stats (id, entries, bytes) VALUES (1, 0, 0)',
+    '''CREATE TRIGGER IF NOT EXISTS cache_stats_insert AFTER INSERT ON cache BEGIN
+        UPDATE cache_stats SET entries = entries + 1, bytes = bytes + NEW.size;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS cache_stats_delete AFTER DELETE ON cache BEGIN
+        UPDATE cache_stats SET entries = entries - 1, bytes = bytes - OLD.size;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS cache_stats_update AFTER UPDATE OF size ON cache BEGIN
+        UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size;
+    END''',
+)
+
+# Keep the most recently read entries that fit in both budgets; drop the rest
+CULL_SQL = '''
+    DELETE FROM cache WHERE key IN (
+        SELECT key FROM (
+            SELECT key,
+                   ROW_NUMBER() OVER recent AS position,
+                   SUM(size) OVER recent AS kept_bytes
+            FROM cache
+            WINDOW recent AS (ORDER BY accessed DESC, key)
+        )
+        WHERE position > ? OR kept_bytes > ?
+    )
+'''
+
+UPSERT_SQL = '''
+    INSERT INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        value = excluded.value, expires = excluded.expires,
+        accessed = excluded.accessed, size = excluded.size
+'''
+
+
+def _live(expires, now):
+    return expires is None or expires > now
+
+
+class SQLiteCache(BaseCache):
+    """
+    LOCATION is the database file path (its directory is created if
+    needed). OPTIONS: MAX_ENTRIES, MAX_BYTES, CULL_TO (fraction of both
+    limits kept after a cull), BUSY_TIMEOUT (seconds to wait for the
+    write lock).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_bytes = int(options.get('MAX_BYTES', DEFAULT_MAX_BYTES))
+        self._cull_to = float(options.get('CULL_TO', 0.9))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    # ── Connections and transactions ─────────────────────────────────────
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            if conn is not None:
+                _inherited.append(conn)
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit; writes open their own transaction in _write()
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+            finally:
+                conn.execute('COMMIT')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """A transaction holding the file's write lock from the start."""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        """Absolute expiry time for `timeout` seconds from now; None never expires."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        elif timeout == 0:
+            timeout = -1  # Django: 0 means "expire immediately"
+        return None if timeout is None else time.time() + timeout
+
+    def _store(self, db, key, value, timeout, now):
+        expires = self.get_backend_timeout(timeout)
+        if not _live(expires, now):
+            # timeout <= 0: expire straight away rather than store a dead row
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        db.execute(UPSERT_SQL, (key, blob, expires, now, len(blob)))
+
+    def _cull(self, db, now):
+        entries, size = db.execute('SELECT entries, bytes FROM cache_stats').fetchone()
+        if entries <= self._max_entries and size <= self._max_bytes:
+            return
+        db.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (now,))
+        entries, size = db.execute('SELECT entries, bytes FROM cache_stats').fetchone()
+        if entries > self._max_entries or size > self._max_bytes:
+            db.execute(CULL_SQL, (int(self._max_entries * self._cull_to), int(self._max_bytes * self._cull_to)))
+
+    def _read(self, db, key, row, now):
+        """Unpickle a fetched (value, expires, accessed) row, or None if expired."""
+        value, expires, accessed = row
+        live = _live(expires, now)
+        try:
+            if not live:
+                db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            elif now - accessed > ACCESS_RESOLUTION:
+                db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        except sqlite3.OperationalError:
+            pass  # write lock busy past the timeout; both writes are housekeeping
+        return (pickle.loads(value),) if live else None
+
+    # ── Cache API ────────────────────────────────────────────────────────
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._db()
+        row = db.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        found = row and self._read(db, key, row, time.time())
+        return found[0] if found else default
+
+    def get_many(self, keys, version=None):
+        keyed = {self.make_and_validate_key(key, version=version): key for key in keys}
+        db, now, result = self._db(), time.time(), {}
+        names = list(keyed)
+        for start in range(0, len(names), KEYS_PER_STATEMENT):
+            chunk = names[start:start + KEYS_PER_STATEMENT]
+            rows = db.execute(
+                f'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk,
+            ).fetchall()
+            for key, *row in rows:
+                found = self._read(db, key, row, now)
+                if found:
+                    result[keyed[key]] = found[0]
+        return result
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db().execute('SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None and _live(row[0], time.time())
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as db:
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as db:
+            for key, value in data.items():
+                self._store(db, self.make_and_validate_key(key, version=version), value, timeout, now)
+            self._cull(db, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute('SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is not None and _live(row[0], now):
+                return False
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic across threads and processes: read and write share one write lock."""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None or not _live(row[1], now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? WHERE key = ?',
+                (blob, len(blob), now, key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as db:
+            updated = db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, now),
+            ).rowcount
+        return updated > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as db:
+            return db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        names = [self.make_and_validate_key(key, version=version) for key in keys]
+        with self._write() as db:
+            for start in range(0, len(names), KEYS_PER_STATEMENT):
+                chunk = names[start:start + KEYS_PER_STATEMENT]
+                db.execute(f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(chunk))})', chunk)
+
+    def clear(self):
+        with self._write() as db:
+            db.execute('DELETE FROM cache')
+
+    def stats(self):
+        """{'entries': …, 'bytes': …} currently stored (expired entries included)."""
+        entries, size = self._db().execute('SELECT entries, bytes FROM cache_stats').fetchone()
+        return {'entries': entries, 'bytes': size}
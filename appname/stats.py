@@ -0,0 +1,114 @@
+"""
+Platform-wide statistics.
+
+PlatformStats holds the anonymous home page's totals. appname.signals keeps
+it current by applying each write's delta (a facility added, a scenario
+optimised, a facility's emission total moving), so reading it is one
+primary-key lookup however large the platform grows.
+
+Emission totals are maintained per facility (Facility.emissions_tco2e,
+rounded to 4 dp) and the platform total is exactly their sum, so a full
+recount and the running total agree to the last digit. Every path that
+reads emission records in bulk streams them with values_list().iterator(),
+so memory stays flat as the table grows.
+"""
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from .modeling import EMISSION_FACTORS, compute_tco2e
+from .models import (
+    EmissionData,
+    Facility,
+    FacilityIntervention,
+    Intervention,
+    OptimizationScenario,
+    PlatformStats,
+)
+
+STREAM_CHUNK_SIZE = 2000
+RECOUNT_CHUNK_SIZE = 500
+TCO2E_PLACES = Decimal('0.0001')
+STAT_FIELDS = ('facility_count', 'total_tco2e', 'active_interventions', 'optimized_scenarios')
+
+
+def emission_rows(records, *extra):
+    """
+    Stream `records` as named rows carrying the facility ID, its country,
+    every emission field and any `extra` fields. compute_tco2e() reads the
+    rows like model instances.
+    """
+    return records.values_list(
+        'emission_source__facility_id', 'emission_source__facility__country',
+        *extra, *EMISSION_FACTORS, named=True,
+    ).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+
+def facility_emission_totals(facility_ids):
+    """{facility_id: all-records tCO₂e, rounded as stored} for the given facilities."""
+    totals = dict.fromkeys(facility_ids, Decimal('0'))
+    records = EmissionData.objects.filter(emission_source__facility_id__in=facility_ids).order_by()
+    for row in emission_rows(records):
+        totals[row.emission_source__facility_id] += compute_tco2e(
+            row, row.emission_source__facility__country,
+        )['total']
+    return {fid: total.quantize(TCO2E_PLACES) for fid, total in totals.items()}
+
+
+def compute_platform_stats(fields=STAT_FIELDS):
+    """Count the given statistics from the source tables."""
+    counts = {
+        'facility_count': lambda: Facility.objects.count(),
+        'total_tco2e': lambda: (
+            Facility.objects.aggregate(total=Sum('emissions_tco2e'))['total'] or Decimal('0')
+        ),
+        'active_interventions': lambda: FacilityIntervention.objects.filter(
+            intervention__status__in=Intervention.ACTIVE_STATUSES,
+        ).count(),
+        'optimized_scenarios': lambda: OptimizationScenario.objects.filter(status='Optimized').count(),
+    }
+    return {name: counts[name]() for name in fields}
+
+
+def rebuild_platform_stats():
+    """Recount every statistic and store it. Returns the PlatformStats row."""
+    stats, _ = PlatformStats.objects.update_or_create(
+        pk=PlatformStats.SINGLETON_ID, defaults=compute_platform_stats(),
+    )
+    return stats
+
+
+def recount_platform_stats(*fields):
+    """
+    Recount only the given statistics, for the rare writes whose delta is
+    awkward to work out (e.g. a library sync changing intervention status).
+    Leaves a missing row for platform_stats() to count in full.
+    """
+    PlatformStats.objects.filter(pk=PlatformStats.SINGLETON_ID).update(**compute_platform_stats(fields))
+
+
+def platform_stats():
+    """The PlatformStats row, counted from scratch the first time it is read."""
+    stats = PlatformStats.objects.filter(pk=PlatformStats.SINGLETON_ID).first()
+    return stats if stats is not None else rebuild_platform_stats()
+
+
+def recount_facility_emissions(facility_ids=None):
+    """
+    Recompute the stored per-facility tCO₂e totals from the records
+    (all facilities when facility_ids is None), in chunks so no IN list
+    outgrows the database's parameter limit. Returns {facility_id:
+    (stored, recounted)} for every facility whose stored total was wrong.
+    Used by `rebuild_platform_stats`; normal writes never need it.
+    """
+    if facility_ids is None:
+        facility_ids = list(Facility.objects.values_list('id', flat=True))
+    wrong = {}
+    for start in range(0, len(facility_ids), RECOUNT_CHUNK_SIZE):
+        chunk = facility_ids[start:start + RECOUNT_CHUNK_SIZE]
+        recounted = facility_emission_totals(chunk)
+        stored = Facility.objects.filter(id__in=chunk).values_list('id', 'emissions_tco2e')
+        wrong.update({
+            fid: (value, recounted[fid]) for fid, value in stored if value != recounted[fid]
+        })
+    return wrong
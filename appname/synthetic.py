@@ -0,0 +1,242 @@
+"""
+Synthetic portfolio generator — production-scale data for performance work.
+
+Builds organisations (each with an owner and members), facilities spread
+across countries and facility types, seasonal monthly EmissionData per
+country profile, and intervention links whose library default costs are
+jittered per facility. Everything goes in as batched inserts inside one
+transaction: bulk_create for rows whose primary keys are needed later
+(users, organisations, facilities, sources), and a batched executemany of
+the model's own INSERT for the high-volume emission records and
+intervention links. That skips the ORM's per-value preparation, which is
+about 10× faster: a million rows take seconds rather than minutes. The
+derived state that signals would normally maintain (FacilityAccess rows,
+the latest-emission pointer) is rebuilt once at the end. The same seed
+always produces the same portfolio.
+
+Used by the generate_synthetic_portfolio command and the benchmark harness.
+"""
+import math
+import random
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from .access import sync_facility_access
+from .modeling import intervention_financials
+from .models import (
+    EmissionData,
+    EmissionSource,
+    Facility,
+    FacilityIntervention,
+    Intervention,
+    Organisation,
+)
+from .signals import adjust_platform_stats, refresh_latest_emission
+
+BATCH_SIZE = 5000
+
+# Monthly raw usage of a district hospital, in each field's physical unit
+# (kWh, m³, kg, litres, km, pMDI units, tonnes).
+BASE_MONTHLY_USAGE = {
+    'grid_electricity': 40000, 'grid_gas': 800, 'bottled_gas': 300, 'liquid_fuel': 1500,
+    'vehicle_fuel_owned': 900, 'business_travel': 5000, 'anaesthetic_gases': 4,
+    'refrigeration_gases': 2, 'waste_management': 3, 'medical_inhalers': 40,
+    'contractor_logistics': 1200,
+}
+
+# Per-country multipliers and seasonality. Electricity and fuel peak with
+# cooling load (southern-hemisphere summer for ZA/ZW); Kenya is equatorial
+# and nearly flat; piped gas is rare outside South Africa.
+COUNTRY_PROFILES = {
+    'ZA': {'scale': 1.3, 'peak_month': 1, 'amplitude': 0.25, 'grid_gas': 1.0},
+    'ZW': {'scale': 0.8, 'peak_month': 11, 'amplitude': 0.20, 'grid_gas': 0.0},
+    'KE': {'scale': 0.9, 'peak_month': 3, 'amplitude': 0.06, 'grid_gas': 0.0},
+    'OTHER': {'scale': 1.0, 'peak_month': 1, 'amplitude': 0.15, 'grid_gas': 0.3},
+}
+SEASONAL_FIELDS = ('grid_electricity', 'liquid_fuel', 'refrigeration_gases')
+
+FACILITY_TYPE_SCALE = {
+    'central_hospital': 6.0,
+    'provincial_hospital': 3.0,
+    'district_hospital': 1.0,
+    'maternity_unit': 0.5,
+    'health_centre': 0.25,
+    'other': 0.4,
+}
+
+COST_JITTER = 0.25     # ± fraction applied to library default costs
+USAGE_NOISE = 0.10     # ± month-to-month noise on every field
+
+
+def _month_starts(months, end=None):
+    """The first day of each of the last `months` months, oldest first."""
+    end = end or date.today().replace(day=1)
+    index = end.year * 12 + end.month - 1
+    return [date((index - m) // 12, (index - m) % 12 + 1, 1) for m in range(months - 1, -1, -1)]
+
+
+def _insert_rows(model, rows):
+    """Batched executemany of `model` rows given as {attname: value} dicts."""
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(model._meta.db_table),
+        ', '.join(qn(f.column) for f in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    defaults = {f.attname: f.get_default() for f in fields}
+    params = [tuple(row.get(f.attname, defaults[f.attname]) for f in fields) for row in rows]
+    with connection.cursor() as cursor:
+        for start in range(0, len(params), BATCH_SIZE):
+            cursor.executemany(sql, params[start:start + BATCH_SIZE])
+
+
+def _jitter(rng, value, spread):
+    return round(float(value) * rng.uniform(1 - spread, 1 + spread), 2)
+
+
+def generate_portfolio(
+    organisations, facilities_per_org, months=36, interventions_per_facility=None,
+    members_per_org=2, seed=0, prefix='SYN', owner=None, end_month=None,
+    cost_jitter=COST_JITTER, stdout=None,
+):
+    """
+    Create the portfolio and return counts of what was written.
+
+    interventions_per_facility=None links the whole library. `owner`, when
+    given, owns every organisation and facility instead of one generated
+    owner per organisation (the benchmark harness uses this so a single
+    login sees everything). cost_jitter=0 links every intervention at its
+    exact library default costs.
+    """
+    from .views import _intervention_default_costs
+
+    rng = random.Random(seed)
+    countries = list(COUNTRY_PROFILES)
+    facility_types = list(FACILITY_TYPE_SCALE)
+    month_starts = _month_starts(months, end_month)
+    log = stdout.write if stdout else (lambda msg: None)
+    counts = {}
+
+    library = [
+        (iv, _intervention_default_costs(iv)) for iv in Intervention.objects.order_by('id')
+    ]
+    per_facility = len(library) if interventions_per_facility is None else min(
+        interventions_per_facility, len(library),
+    )
+
+    with transaction.atomic():
+        # ── Users and organisations ────────────────────────────────────
+        unusable = make_password(None)
+        users = User.objects.bulk_create([
+            User(username=f'{prefix.lower()}_user_{i:05d}', email=f'{prefix.lower()}_{i:05d}@example.com',
+                 password=unusable)
+            for i in range(organisations * (members_per_org + (owner is None)))
+        ], batch_size=BATCH_SIZE)
+        counts['users'] = len(users)
+        user_iter = iter(users)
+        orgs, org_members = [], []
+        for o in range(organisations):
+            org_owner = owner or next(user_iter)
+            orgs.append(Organisation(name=f'{prefix} Organisation {o:04d}', created_by=org_owner))
+            org_members.append([org_owner] + [next(user_iter) for _ in range(members_per_org)])
+        orgs = Organisation.objects.bulk_create(orgs, batch_size=BATCH_SIZE)
+        Membership = Organisation.members.through
+        Membership.objects.bulk_create([
+            Membership(organisation_id=org.id, user_id=member.id)
+            for org, members in zip(orgs, org_members) for member in members
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+        counts['organisations'] = len(orgs)
+        log(f'  {len(orgs)} organisations, {len(users)} users')
+
+        # ── Facilities and their baseline sources ──────────────────────
+        facilities = []
+        for org in orgs:
+            for f in range(facilities_per_org):
+                n = len(facilities)
+                facilities.append(Facility(
+                    code_name=f'{prefix}_{n:06d}',
+                    display_name=f'{prefix} Facility {n:06d}',
+                    country=rng.choice(countries),
+                    facility_type=rng.choice(facility_types),
+                    created_by_id=org.created_by_id,
+                    organisation=org,
+                ))
+        facilities = Facility.objects.bulk_create(facilities, batch_size=BATCH_SIZE)
+        sources = EmissionSource.objects.bulk_create([
+            EmissionSource(
+                facility=facility, code_name=f'{facility.code_name}_BASELINE',
+                display_name=f'{facility.display_name} — Baseline',
+            )
+            for facility in facilities
+        ], batch_size=BATCH_SIZE)
+        counts['facilities'] = len(facilities)
+        log(f'  {len(facilities)} facilities')
+
+        # ── Monthly emission records ───────────────────────────────────
+        written = 0
+        batch = []
+        for facility, source in zip(facilities, sources):
+            profile = COUNTRY_PROFILES[facility.country]
+            size = FACILITY_TYPE_SCALE[facility.facility_type] * profile['scale'] * rng.uniform(0.7, 1.3)
+            base = {field: usage * size for field, usage in BASE_MONTHLY_USAGE.items()}
+            base['grid_gas'] *= profile['grid_gas']
+            for month in month_starts:
+                season = 1 + profile['amplitude'] * math.cos(
+                    2 * math.pi * (month.month - profile['peak_month']) / 12
+                )
+                row = {'emission_source_id': source.id, 'date': month}
+                for field, amount in base.items():
+                    if field in SEASONAL_FIELDS:
+                        amount *= season
+                    row[field] = round(amount * rng.uniform(1 - USAGE_NOISE, 1 + USAGE_NOISE), 2)
+                batch.append(row)
+            if len(batch) >= BATCH_SIZE * 20:
+                _insert_rows(EmissionData, batch)
+                written += len(batch)
+                batch = []
+                log(f'  … {written} emission records')
+        _insert_rows(EmissionData, batch)
+        counts['emission_records'] = written + len(batch)
+        log(f'  {counts["emission_records"]} emission records')
+
+        # ── Intervention links with jittered costs ─────────────────────
+        links = active_links = 0
+        batch = []
+        for facility in facilities:
+            chosen = library if per_facility == len(library) else rng.sample(library, per_facility)
+            for intervention, (costs, cost_source) in chosen:
+                active_links += intervention.status in Intervention.ACTIVE_STATUSES
+                link_costs = {
+                    'implementation_cost': _jitter(rng, costs['impl'], cost_jitter),
+                    'maintenance_cost': _jitter(rng, costs['maint'], cost_jitter),
+                    'annual_savings': _jitter(rng, costs['savings'], cost_jitter),
+                }
+                batch.append({
+                    'facility_id': facility.id, 'intervention_id': intervention.id,
+                    'cost_source': cost_source, **link_costs,
+                    **intervention_financials(*link_costs.values()),
+                })
+            if len(batch) >= BATCH_SIZE * 20:
+                _insert_rows(FacilityIntervention, batch)
+                links += len(batch)
+                batch = []
+        _insert_rows(FacilityIntervention, batch)
+        counts['intervention_links'] = links + len(batch)
+        log(f'  {counts["intervention_links"]} intervention links')
+
+        # ── Derived state that bulk_create's missing signals would keep ─
+        # Chunked so no IN list outgrows the database's parameter limit.
+        facility_ids = [facility.id for facility in facilities]
+        for start in range(0, len(facility_ids), BATCH_SIZE):
+            chunk = facility_ids[start:start + BATCH_SIZE]
+            sync_facility_access(chunk)
+            refresh_latest_emission(chunk)
+        adjust_platform_stats(facility_count=len(facilities), active_interventions=active_links)
+        log('  access grants, latest-record pointers and platform stats updated')
+
+    counts['facility_ids'] = facility_ids
+    return counts
@@ -1,10 +1,15 @@
 """
-Template filters used across CARBOMICA templates.
+Template filters and tags used across CARBOMICA templates.
 
 Registered via {% load carbomica_extras %} at the top of any template
 that needs them.
 """
+import uuid
+
 from django import template
+from django.utils.html import format_html
+
+from appname.idempotency import KEY_FIELD
 
 register = template.Library()
 
@@ -23,3 +28,13 @@ def split_filter(value, separator=','):
     if value in (None, ''):
         return []
     return [token.strip() for token in str(value).split(separator) if token.strip()]
+
+
+@register.simple_tag
+def idempotency_key():
+    """
+    Hidden input carrying a fresh idempotency key, placed next to
+    {% csrf_token %} in forms whose view is @idempotent (appname.idempotency).
+    A retried or double-clicked submission resends the same key.
+    """
+    return format_html('<input type="hidden" name="{}" value="{}">', KEY_FIELD, uuid.uuid4().hex)
@@ -0,0 +1,32 @@
+"""
+Template backend that reports rendering time to appname.instrumentation.
+
+Configured as the project's "django" engine in settings.TEMPLATES; behaves
+exactly like Django's own backend otherwise.
+"""
+from django.template.backends.django import DjangoTemplates
+
+from .instrumentation import stage
+
+
+class TimedTemplate:
+    """Wraps a backend template so render() counts towards the 'template' stage."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with stage('template'):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
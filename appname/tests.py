@@ -11,7 +11,7 @@ from decimal import Decimal
 
 from django.contrib.auth.models import User
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from io import StringIO
 
 from appname.models import (
@@ -872,7 +872,7 @@ class OptimizationResultsRenderTest(TestCase):
         )
 
     def test_results_page_renders_with_db_fallback_path(self):
-        """No session data — view falls back to persisted OptimizationResult rows."""
+        """No snapshot — view falls back to persisted OptimizationResult rows."""
         self.client.login(username='jay', password='pw')
         response = self.client.get(f'/optimization-results/{self.scenario.id}/')
         self.assertEqual(
@@ -1668,3 +1668,2182 @@ class SplitFilterTest(TestCase):
     def test_custom_separator(self):
         from appname.templatetags.carbomica_extras import split_filter
         self.assertEqual(split_filter('7|13|17', '|'), ['7', '13', '17'])
+
+
+class StreamingExportTest(TestCase):
+    """CSV / NDJSON exports stream only the requesting user's data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('exp', 'exp@example.com', 'pw')
+        cls.other = User.objects.create_user('exp2', 'exp2@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='EXP_1', display_name='Export Hospital', country='ZA',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        foreign = Facility.objects.create(
+            code_name='EXP_2', display_name='Someone Else', country='KE',
+            facility_type='district_hospital', created_by=cls.other,
+        )
+        for fac in (cls.facility, foreign):
+            source = EmissionSource.objects.create(
+                facility=fac, code_name=f'{fac.code_name}_SRC', display_name='Src',
+            )
+            EmissionData.objects.create(
+                emission_source=source, date='2026-01-01', grid_electricity=Decimal('1000'),
+            )
+            EmissionData.objects.create(
+                emission_source=source, date='2026-02-01', grid_electricity=Decimal('2000'),
+            )
+        from appname.views import _seed_facility_interventions
+        _seed_facility_interventions(cls.facility)
+
+    def setUp(self):
+        self.client.login(username='exp', password='pw')
+
+    def _body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_emissions_csv_is_scoped_to_user(self):
+        response = self.client.get('/export/emissions.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        lines = self._body(response).strip().splitlines()
+        self.assertEqual(len(lines), 3)  # header + 2 records
+        self.assertTrue(lines[0].startswith('facility_id,facility,country,date,grid_electricity'))
+        self.assertNotIn('Someone Else', '\n'.join(lines))
+
+    def test_tco2e_ndjson_carries_breakdown(self):
+        import json
+        response = self.client.get('/export/tco2e.ndjson')
+        rows = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual(len(rows), 2)
+        expected = Decimal('1000') * ELECTRICITY_EF['ZA']
+        self.assertEqual(Decimal(rows[0]['grid_electricity_tco2e']), expected)
+        self.assertEqual(Decimal(rows[0]['total_tco2e']), expected)
+
+    def test_interventions_export_lists_every_link(self):
+        response = self.client.get('/export/interventions.csv')
+        lines = self._body(response).strip().splitlines()
+        self.assertEqual(len(lines) - 1, FacilityIntervention.objects.filter(facility=self.facility).count())
+
+    async def test_asgi_export_streams_in_chunks(self):
+        import warnings
+        from unittest import mock
+        from appname import views
+        await self.async_client.alogin(username='exp', password='pw')
+        with warnings.catch_warnings():
+            # Django warns when it has to buffer a sync iterator under ASGI
+            warnings.simplefilter('error')
+            with mock.patch.object(views, 'EXPORT_CHUNK_SIZE', 1):
+                response = await self.async_client.get('/export/emissions.csv')
+                self.assertTrue(response.is_async)
+                chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)  # header + 2 records, one pull each
+        self.assertTrue(chunks[0].startswith(b'facility_id,facility,country,date'))
+        self.assertNotIn(b'Someone Else', b''.join(chunks))
+
+    def test_unknown_dataset_or_format_404s(self):
+        self.assertEqual(self.client.get('/export/secrets.csv').status_code, 404)
+        self.assertEqual(self.client.get('/export/emissions.xlsx').status_code, 404)
+
+    def test_foreign_facility_filter_404s(self):
+        foreign = Facility.objects.get(code_name='EXP_2')
+        response = self.client.get(f'/export/emissions.csv?facility={foreign.id}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_facility_filter_404s(self):
+        for value in ('abc', '-1', '1.5', '²', ' 1'):
+            response = self.client.get('/export/emissions.csv', {'facility': value})
+            self.assertEqual(response.status_code, 404, value)
+
+
+class JsonApiConditionalGetTest(TestCase):
+    """API responses are access-scoped and revalidate cheaply via ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('api', 'api@example.com', 'pw')
+        cls.other = User.objects.create_user('api2', 'api2@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='API_1', display_name='API Hospital', country='ZW',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.foreign = Facility.objects.create(
+            code_name='API_2', display_name='Foreign', country='KE',
+            facility_type='district_hospital', created_by=cls.other,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='API_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=cls.source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+
+    def setUp(self):
+        self.client.login(username='api', password='pw')
+
+    def test_anonymous_gets_401_json(self):
+        self.client.logout()
+        response = self.client.get('/api/v1/facilities/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_is_scoped_and_carries_validators(self):
+        response = self.client.get('/api/v1/facilities/')
+        self.assertEqual(response.status_code, 200)
+        ids = [f['id'] for f in response.json()['facilities']]
+        self.assertEqual(ids, [self.facility.id])
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_matching_etag_returns_304(self):
+        first = self.client.get(f'/api/v1/facilities/{self.facility.id}/')
+        again = self.client.get(
+            f'/api/v1/facilities/{self.facility.id}/', HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_new_emission_record_bumps_revision_and_etag(self):
+        url = f'/api/v1/facilities/{self.facility.id}/emissions/'
+        first = self.client.get(url)
+        before = Facility.objects.get(pk=self.facility.pk).revision
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-02-01', grid_electricity=Decimal('5'),
+        )
+        self.assertGreater(Facility.objects.get(pk=self.facility.pk).revision, before)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(len(again.json()['records']), 2)
+
+    def test_tco2e_breakdown_on_request(self):
+        response = self.client.get(f'/api/v1/facilities/{self.facility.id}/emissions/?tco2e=1')
+        record = response.json()['records'][0]
+        self.assertEqual(
+            Decimal(record['total_tco2e']), Decimal('1000') * ELECTRICITY_EF['ZW'],
+        )
+
+    def test_tco2e_variant_has_its_own_etag(self):
+        url = f'/api/v1/facilities/{self.facility.id}/emissions/'
+        plain = self.client.get(url)
+        detailed = self.client.get(url, {'tco2e': '1'}, HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(detailed.status_code, 200)
+        self.assertIn('total_tco2e', detailed.json()['records'][0])
+        self.assertNotEqual(detailed['ETag'], plain['ETag'])
+        again = self.client.get(url, {'tco2e': '1'}, HTTP_IF_NONE_MATCH=detailed['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_foreign_facility_is_404(self):
+        for suffix in ('', 'emissions/', 'interventions/', 'scenarios/'):
+            response = self.client.get(f'/api/v1/facilities/{self.foreign.id}/{suffix}')
+            self.assertEqual(response.status_code, 404, suffix)
+
+    def test_scenario_endpoint(self):
+        scenario = OptimizationScenario.objects.create(
+            facility=self.facility, name='Plan A', budget=Decimal('1000'),
+        )
+        response = self.client.get(f'/api/v1/scenarios/{scenario.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['scenario']['name'], 'Plan A')
+
+
+class LazyChartEndpointTest(TestCase):
+    """Chart payloads moved off the pages onto cacheable JSON endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('chart', 'chart@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='CH_1', display_name='Chart Hospital', country='ZA',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='CH_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=cls.source, date='2026-01-01',
+            grid_electricity=Decimal('1000'), waste_management=Decimal('2'),
+        )
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client.login(username='chart', password='pw')
+
+    def test_pages_no_longer_inline_chart_payloads(self):
+        response = self.client.get('/dashboard/')
+        self.assertNotIn('source_chart_data', response.context)
+        self.assertContains(response, '/dashboard/charts/')
+        response = self.client.get(f'/facilities/{self.facility.id}/')
+        self.assertNotIn('bar_chart_data', response.context)
+        self.assertContains(response, f'/facilities/{self.facility.id}/charts/')
+
+    def test_dashboard_charts(self):
+        sources = self.client.get('/dashboard/charts/sources/').json()
+        self.assertEqual(set(sources['labels']), {'Grid Electricity', 'Waste Management'})
+        facilities = self.client.get('/dashboard/charts/facilities/').json()
+        self.assertEqual(facilities['labels'], ['Chart Hospital'])
+        monthly = self.client.get('/dashboard/charts/monthly/').json()
+        self.assertEqual(monthly['labels'], ['Jan 2026'])
+        self.assertEqual(self.client.get('/dashboard/charts/nope/').status_code, 404)
+
+    def test_facility_and_district_charts(self):
+        bar = self.client.get(f'/facilities/{self.facility.id}/charts/bar/').json()
+        self.assertEqual(len(bar['labels']), 11)
+        pie = self.client.get(f'/facilities/{self.facility.id}/charts/categories/').json()
+        self.assertEqual(len(pie['labels']), 2)
+        district = self.client.get('/district-planning/chart/').json()
+        self.assertEqual(district['labels'], ['Chart Hospital'])
+
+    def test_chart_revalidates_and_follows_new_data(self):
+        url = '/dashboard/charts/monthly/'
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-02-01', grid_electricity=Decimal('10'),
+        )
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['labels'], ['Jan 2026', 'Feb 2026'])
+
+    def test_dashboard_aggregates_once_across_page_and_charts(self):
+        from unittest import mock
+        from appname import views
+        with mock.patch.object(
+            views, '_aggregate_tco2e_all', wraps=views._aggregate_tco2e_all,
+        ) as aggregate:
+            page = self.client.get('/dashboard/')
+            self.assertEqual(aggregate.call_count, 0)
+            self.assertEqual(
+                page.context['total_emissions'],
+                Facility.objects.get(pk=self.facility.pk).emissions_tco2e,
+            )
+            for chart in ('sources', 'facilities', 'monthly'):
+                self.assertEqual(self.client.get(f'/dashboard/charts/{chart}/').status_code, 200)
+            self.assertEqual(aggregate.call_count, 1)
+
+    def test_district_page_and_chart_share_one_roll_up(self):
+        from unittest import mock
+        from appname import views
+        with mock.patch.object(views, '_district_rollup', wraps=views._district_rollup) as roll_up:
+            self.client.get('/district-planning/')
+            self.client.get('/district-planning/chart/')
+            self.assertEqual(roll_up.call_count, 1)
+
+    def test_foreign_facility_chart_is_404(self):
+        other = User.objects.create_user('chart2', 'chart2@example.com', 'pw')
+        foreign = Facility.objects.create(
+            code_name='CH_2', display_name='Foreign', country='KE', created_by=other,
+        )
+        self.assertEqual(
+            self.client.get(f'/facilities/{foreign.id}/charts/bar/').status_code, 404,
+        )
+
+
+class FacilityAccessCacheTest(TestCase):
+    """Access sets are cached per user and rotated by membership signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('own', 'own@example.com', 'pw')
+        cls.member = User.objects.create_user('mem', 'mem@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='ACC_1', display_name='Access Hospital', country='ZA',
+            created_by=cls.owner,
+        )
+        from appname.models import Organisation
+        cls.org = Organisation.objects.create(name='Access Org', created_by=cls.owner)
+
+    def _ids(self, user):
+        from appname.access import accessible_facility_ids
+        return accessible_facility_ids(User.objects.get(pk=user.pk))
+
+    def test_cached_across_requests_without_queries(self):
+        self.assertEqual(self._ids(self.owner), [self.facility.id])
+        fresh = User.objects.get(pk=self.owner.pk)
+        from appname.access import accessible_facility_ids
+        with self.assertNumQueries(0):
+            self.assertEqual(accessible_facility_ids(fresh), [self.facility.id])
+            # Memoised on the user object for the rest of the request
+            accessible_facility_ids(fresh)
+
+    def test_membership_and_assignment_rotate_access(self):
+        self.assertEqual(self._ids(self.member), [])
+        self.org.members.add(self.member)
+        self.facility.organisation = self.org
+        self.facility.save(update_fields=['organisation'])
+        self.assertEqual(self._ids(self.member), [self.facility.id])
+        self.org.members.remove(self.member)
+        self.assertEqual(self._ids(self.member), [])
+
+    def test_unassign_and_clear_rotate_access(self):
+        self.org.members.add(self.member)
+        self.facility.organisation = self.org
+        self.facility.save()
+        self.assertEqual(self._ids(self.member), [self.facility.id])
+        self.org.members.clear()
+        self.assertEqual(self._ids(self.member), [])
+
+    def test_new_facility_appears_and_deleted_one_disappears(self):
+        self.assertEqual(self._ids(self.owner), [self.facility.id])
+        extra = Facility.objects.create(
+            code_name='ACC_2', display_name='Extra', country='KE', created_by=self.owner,
+        )
+        self.assertEqual(self._ids(self.owner), sorted([self.facility.id, extra.id]))
+        extra.delete()
+        self.assertEqual(self._ids(self.owner), [self.facility.id])
+
+
+class FacilityAccessTableTest(TestCase):
+    """FacilityAccess mirrors ownership + membership and can be rebuilt."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from appname.models import Organisation
+        cls.owner = User.objects.create_user('tab_own', 'tab_own@example.com', 'pw')
+        cls.member = User.objects.create_user('tab_mem', 'tab_mem@example.com', 'pw')
+        cls.org = Organisation.objects.create(name='Table Org', created_by=cls.owner)
+        cls.facility = Facility.objects.create(
+            code_name='TAB_1', display_name='Table Hospital', country='ZA',
+            created_by=cls.owner,
+        )
+
+    def _grants(self):
+        from appname.models import FacilityAccess
+        return set(FacilityAccess.objects.values_list('user_id', 'facility_id', 'via_org'))
+
+    def test_owner_grant_created_with_facility(self):
+        self.assertEqual(self._grants(), {(self.owner.id, self.facility.id, False)})
+
+    def test_membership_from_either_side_and_reassignment(self):
+        self.facility.organisation = self.org
+        self.facility.save(update_fields=['organisation'])
+        self.member.organisations.add(self.org)
+        self.assertIn((self.member.id, self.facility.id, True), self._grants())
+        self.member.organisations.clear()
+        self.assertNotIn((self.member.id, self.facility.id, True), self._grants())
+        self.org.members.add(self.member)
+        self.facility.organisation = None
+        self.facility.save(update_fields=['organisation'])
+        self.assertEqual(self._grants(), {(self.owner.id, self.facility.id, False)})
+
+    def test_organisation_delete_drops_org_grants(self):
+        self.org.members.add(self.member)
+        self.facility.organisation = self.org
+        self.facility.save()
+        self.org.delete()
+        self.assertEqual(self._grants(), {(self.owner.id, self.facility.id, False)})
+
+    def test_user_facilities_is_single_semi_join(self):
+        from appname.views import _user_facilities
+        qs = _user_facilities(self.owner)
+        with self.assertNumQueries(1):
+            self.assertEqual(list(qs), [self.facility])
+        sql = str(qs.query).upper()
+        self.assertIn('APPNAME_FACILITYACCESS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_rebuild_command_check_and_repair(self):
+        from io import StringIO
+        from django.core.management import CommandError, call_command
+        from appname.models import FacilityAccess
+        call_command('rebuild_facility_access', '--check', stdout=StringIO())
+        FacilityAccess.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_facility_access', '--check', stdout=StringIO())
+        self.assertEqual(self._grants(), set())
+        call_command('rebuild_facility_access', stdout=StringIO())
+        self.assertEqual(self._grants(), {(self.owner.id, self.facility.id, False)})
+        call_command('rebuild_facility_access', '--check', stdout=StringIO())
+
+
+class DashboardContextCacheTest(TestCase):
+    """The assembled dashboard context is cached and dropped by data signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dash', 'dash@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='DC_1', display_name='Dash Hospital', country='ZA',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='DC_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=cls.source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client.login(username='dash', password='pw')
+
+    def _total(self):
+        return self.client.get('/dashboard/').context['total_emissions']
+
+    def test_repeat_load_skips_aggregate_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get('/dashboard/')
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get('/dashboard/')
+        self.assertLess(len(warm), len(cold))
+        self.assertFalse(any('appname_emissiondata' in q['sql'] for q in warm.captured_queries))
+        self.assertFalse(any('appname_facilityintervention' in q['sql'] for q in warm.captured_queries))
+
+    def test_emission_write_drops_cached_context(self):
+        before = self._total()
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-02-01', grid_electricity=Decimal('5000'),
+        )
+        self.assertNotEqual(self._total(), before)
+
+    def test_library_change_moves_the_cached_context_on(self):
+        from unittest import mock
+        from appname import views
+        from appname.signals import library_changed
+        self.client.get('/dashboard/')
+        with mock.patch.object(views, '_dashboard_context', wraps=views._dashboard_context) as build:
+            self.client.get('/dashboard/')
+            self.assertEqual(build.call_count, 0)
+            library_changed()
+            self.client.get('/dashboard/')
+            self.assertEqual(build.call_count, 1)
+
+    def test_batched_import_drops_cached_context_once_flushed(self):
+        from appname.signals import batched_facility_changes
+        before = self._total()
+        with batched_facility_changes():
+            EmissionData.objects.create(
+                emission_source=self.source, date='2026-03-01', grid_electricity=Decimal('7000'),
+            )
+        self.assertNotEqual(self._total(), before)
+
+    def test_membership_change_drops_cached_context(self):
+        from appname.models import Organisation
+        other = User.objects.create_user('dash2', 'dash2@example.com', 'pw')
+        org = Organisation.objects.create(name='Dash Org', created_by=self.user)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/dashboard/').context['facilities'], [])
+        self.facility.organisation = org
+        self.facility.save(update_fields=['organisation'])
+        org.members.add(other)
+        names = [f['name'] for f in self.client.get('/dashboard/').context['facilities']]
+        self.assertEqual(names, ['Dash Hospital'])
+
+
+class ScenarioSnapshotTest(TestCase):
+    """All three scenarios persist in a compressed snapshot, not the session."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from appname.views import _seed_facility_interventions
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('snap', 'snap@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='SNAP_FAC', display_name='Snapshot Hospital', country='KE',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='SNAP_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=cls.source, date='2026-01-01', grid_electricity=Decimal('500000'),
+        )
+        _seed_facility_interventions(cls.facility)
+
+    def setUp(self):
+        self.client.login(username='snap', password='pw')
+
+    def _optimise(self):
+        payload = {
+            'name': 'Snapshot run', 'mode': 'budget', 'budget': '50000', 'date': '2026-01-01',
+            'grid_electricity': '500000', 'grid_gas': '0', 'bottled_gas': '0',
+            'liquid_fuel': '0', 'vehicle_fuel_owned': '0', 'business_travel': '0',
+            'anaesthetic_gases': '0', 'refrigeration_gases': '0',
+            'waste_management': '0', 'medical_inhalers': '0', 'contractor_logistics': '0',
+        }
+        self.client.post(f'/optimize/{self.facility.id}/', payload)
+        return OptimizationScenario.objects.get(name='Snapshot run')
+
+    def test_snapshot_holds_all_scenarios_and_inputs(self):
+        scenario = self._optimise()
+        data = scenario.snapshot.data
+        self.assertEqual(
+            set(data['scenarios']), {'full_coverage', 'fixed_budget', 'optimised'},
+        )
+        self.assertGreater(len(data['scenarios']['full_coverage']['results']), 0)
+        self.assertEqual(data['inputs']['budget'], 50000.0)
+        self.assertGreater(data['inputs']['baseline'], 0)
+        # Stored compressed, well under the size of the plain JSON
+        import json
+        raw = json.dumps(data, separators=(',', ':')).encode()
+        self.assertLess(len(bytes(scenario.snapshot.payload)), len(raw))
+
+    def test_session_no_longer_carries_scenarios(self):
+        scenario = self._optimise()
+        self.assertFalse(any(k.startswith('scenarios_') for k in self.client.session.keys()))
+        self.assertEqual(scenario.status, 'Optimized')
+
+    def test_results_rows_match_optimised_ranking(self):
+        scenario = self._optimise()
+        optimised = scenario.snapshot.data['scenarios']['optimised']['results']
+        self.assertEqual(
+            list(scenario.results.order_by('priority').values_list('intervention_id', flat=True)),
+            [item['intervention_id'] for item in optimised],
+        )
+
+    def test_results_page_renders_full_coverage_from_snapshot(self):
+        scenario = self._optimise()
+        self.client.logout()
+        self.client.login(username='snap', password='pw')   # fresh session
+        response = self.client.get(f'/optimization-results/{scenario.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.context['scenarios']['full_coverage']['results']), 0)
+
+
+class LatestEmissionResolverTest(TestCase):
+    """Facility.latest_emission resolves N facilities in one query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('latest', 'latest@example.com', 'pw')
+        cls.facilities = []
+        for i in range(3):
+            facility = Facility.objects.create(
+                code_name=f'LAT_{i}', display_name=f'Latest {i}', country='ZA',
+                facility_type='district_hospital', created_by=cls.user,
+            )
+            cls.facilities.append(facility)
+        cls.a, cls.b, cls.empty = cls.facilities
+        src_a1 = EmissionSource.objects.create(facility=cls.a, code_name='LA1', display_name='A1')
+        src_a2 = EmissionSource.objects.create(facility=cls.a, code_name='LA2', display_name='A2')
+        src_b = EmissionSource.objects.create(facility=cls.b, code_name='LB', display_name='B')
+        EmissionData.objects.create(emission_source=src_a1, date='2026-01-01', grid_electricity=Decimal('1'))
+        cls.a_latest = EmissionData.objects.create(
+            emission_source=src_a2, date='2026-03-01', grid_electricity=Decimal('3'),
+        )
+        EmissionData.objects.create(emission_source=src_b, date='2026-02-01', grid_electricity=Decimal('4'))
+        # Same date: the newer row wins
+        cls.b_latest = EmissionData.objects.create(
+            emission_source=src_b, date='2026-02-01', grid_electricity=Decimal('5'),
+        )
+
+    def test_one_query_across_sources_with_tie_break(self):
+        with self.assertNumQueries(1):
+            latest = {
+                f.id: f.latest_emission
+                for f in Facility.objects
+                .filter(id__in=[f.id for f in self.facilities], latest_emission__isnull=False)
+                .select_related('latest_emission')
+            }
+        self.assertEqual(latest[self.a.id].id, self.a_latest.id)
+        self.assertEqual(latest[self.b.id].id, self.b_latest.id)
+        self.assertNotIn(self.empty.id, latest)
+
+    def test_facilities_page_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.login(username='latest', password='pw')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/facilities/')
+        for i in range(3, 8):
+            facility = Facility.objects.create(
+                code_name=f'LAT_{i}', display_name=f'Latest {i}', country='KE', created_by=self.user,
+            )
+            source = EmissionSource.objects.create(facility=facility, code_name=f'LS{i}', display_name='S')
+            EmissionData.objects.create(emission_source=source, date='2026-01-01', grid_electricity=Decimal('2'))
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get('/facilities/')
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(len(response.context['facilities']), 8)
+
+    def test_facilities_page_shows_latest_record(self):
+        self.client.login(username='latest', password='pw')
+        rows = {f.id: f for f in self.client.get('/facilities/').context['facilities']}
+        self.assertEqual(str(rows[self.a.id].latest_date), '2026-03-01')
+        self.assertFalse(rows[self.empty.id].has_emission_data)
+
+
+class LatestEmissionPointerTest(TestCase):
+    """Facility.latest_emission / latest_tco2e follow every write path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ptr', 'ptr@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='PTR_1', display_name='Pointer Hospital', country='ZA',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='PTR_SRC', display_name='Src',
+        )
+
+    def _stored(self):
+        return Facility.objects.values_list('latest_emission_id', 'latest_tco2e').get(pk=self.facility.pk)
+
+    def _expected_total(self, record, country='ZA'):
+        from appname.modeling import compute_tco2e
+        return compute_tco2e(record, country)['total'].quantize(Decimal('0.0001'))
+
+    def test_create_newer_older_and_delete(self):
+        self.assertEqual(self._stored(), (None, None))
+        newer = EmissionData.objects.create(
+            emission_source=self.source, date='2026-03-01', grid_electricity=Decimal('1000'),
+        )
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-01-01', grid_electricity=Decimal('9000'),
+        )
+        self.assertEqual(self._stored(), (newer.id, self._expected_total(newer)))
+        newer.delete()
+        latest_id, _ = self._stored()
+        self.assertEqual(EmissionData.objects.get(pk=latest_id).date.isoformat(), '2026-01-01')
+        EmissionData.objects.all().delete()
+        self.assertEqual(self._stored(), (None, None))
+
+    def test_batched_import_refreshes_once_at_flush(self):
+        from appname.signals import batched_facility_changes
+        with batched_facility_changes():
+            for month in range(1, 4):
+                last = EmissionData.objects.create(
+                    emission_source=self.source, date=f'2026-0{month}-01',
+                    grid_electricity=Decimal(month * 100),
+                )
+            self.assertEqual(self._stored(), (None, None))
+        self.assertEqual(self._stored()[0], last.id)
+
+    def test_country_change_recomputes_total(self):
+        record = EmissionData.objects.create(
+            emission_source=self.source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+        facility = Facility.objects.get(pk=self.facility.pk)
+        facility.country = 'KE'
+        facility.save()
+        self.assertEqual(self._stored(), (record.id, self._expected_total(record, 'KE')))
+        self.assertEqual(facility.latest_tco2e, self._expected_total(record, 'KE'))
+
+    def test_stale_instance_save_keeps_pointer(self):
+        record = EmissionData.objects.create(
+            emission_source=self.source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+        self.facility.display_name = 'Renamed'
+        self.facility.save()    # in-memory instance predates the record
+        self.assertEqual(self._stored()[0], record.id)
+
+    def test_list_and_rollup_need_no_emission_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+        self.client.login(username='ptr', password='pw')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/facilities/')
+        self.assertEqual(response.status_code, 200)
+        emission_queries = [
+            q['sql'] for q in ctx.captured_queries
+            if 'FROM "appname_emissiondata"' in q['sql']
+        ]
+        self.assertEqual(emission_queries, [])
+
+
+class SetBasedDistrictRollupTest(TestCase):
+    """_district_rollup matches the per-link computation in bulk queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from appname.views import _seed_facility_interventions
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('roll', 'roll@example.com', 'pw')
+        cls.facilities = []
+        for i, (country, kwh, waste) in enumerate((('ZW', '500000', '80'), ('KE', '20000', '5'))):
+            facility = Facility.objects.create(
+                code_name=f'ROLL_{i}', display_name=f'Rollup {i}', country=country,
+                created_by=cls.user,
+            )
+            source = EmissionSource.objects.create(
+                facility=facility, code_name=f'ROLL_SRC_{i}', display_name='Src',
+            )
+            EmissionData.objects.create(
+                emission_source=source, date='2026-01-01',
+                grid_electricity=Decimal(kwh), waste_management=Decimal(waste),
+            )
+            _seed_facility_interventions(facility)
+            cls.facilities.append(facility)
+        cls.no_data = Facility.objects.create(
+            code_name='ROLL_EMPTY', display_name='Rollup empty', country='ZA', created_by=cls.user,
+        )
+
+    def _reference(self, facility):
+        """The original per-facility, per-link computation."""
+        from collections import defaultdict
+        from appname.modeling import compute_tco2e
+        latest = facility.latest_emission
+        cat = compute_tco2e(latest, facility.country) if latest else {}
+        reduction = defaultdict(Decimal)
+        investment = Decimal('0')
+        fis = list(FacilityIntervention.objects.select_related('intervention').filter(facility=facility))
+        for fi in fis:
+            investment += (fi.implementation_cost or 0) + (fi.maintenance_cost or 0)
+            pct = fi.intervention.emission_reduction_percentage or Decimal('0')
+            for t in (fi.intervention.target_category or '').split(','):
+                if t.strip():
+                    reduction[t.strip()] += (pct / 100) * Decimal(str(cat.get(t.strip(), 0)))
+        potential = sum(
+            (min(r, Decimal(str(cat.get(t, 0)))) for t, r in reduction.items()), Decimal('0'),
+        )
+        return cat.get('total', Decimal('0')), potential, investment, len(fis)
+
+    def test_rows_match_reference_computation(self):
+        from appname.views import _district_rollup
+        facilities = Facility.objects.filter(created_by=self.user).select_related('latest_emission')
+        for row, facility in zip(_district_rollup(facilities), facilities):
+            baseline, potential, investment, n = self._reference(facility)
+            self.assertEqual(row['baseline'], baseline)
+            self.assertAlmostEqual(float(row['potential_reduction']), float(potential), places=6)
+            self.assertEqual(row['investment'], investment)
+            self.assertEqual(row['n_interventions'], n)
+            self.assertLessEqual(row['potential_reduction'], row['baseline'])
+
+    def test_facility_without_data_has_zero_rollup(self):
+        from appname.views import _district_rollup
+        [row] = _district_rollup(Facility.objects.filter(pk=self.no_data.pk).select_related('latest_emission'))
+        self.assertFalse(row['has_data'])
+        self.assertEqual(row['potential_reduction'], Decimal('0'))
+
+    def test_rollup_query_count_independent_of_portfolio_size(self):
+        from appname.views import _district_rollup
+        facilities = Facility.objects.filter(created_by=self.user).select_related('latest_emission')
+        with self.assertNumQueries(2):
+            _district_rollup(facilities)
+        for i in range(5):
+            Facility.objects.create(code_name=f'ROLL_X{i}', display_name=f'X{i}', created_by=self.user)
+        with self.assertNumQueries(2):
+            rows = _district_rollup(facilities.all())
+        self.assertEqual(len(rows), 8)
+
+
+class ViewQueryCountRegressionTest(TestCase):
+    """
+    Every route runs the same number of queries whatever the portfolio size
+    — guards against the N+1 regressions recorded in views.py comments.
+    Uses the benchmark_views harness at toy sizes.
+    """
+
+    def _run(self, n_facilities):
+        from appname.benchmarking import BENCH_USERNAME, run_benchmark
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        Facility.objects.all().delete()
+        return run_benchmark(self.client, n_facilities, months=2, repeat=0, trace_memory=False)
+
+    def test_no_view_query_count_grows_with_portfolio(self):
+        from appname.benchmarking import query_growth
+        results = {'2': self._run(2), '6': self._run(6)}
+        for name, result in results['6'].items():
+            self.assertLess(result['status'], 400, f'{name} returned {result["status"]}')
+        self.assertEqual(query_growth(results), {})
+
+    def test_latency_regression_detection(self):
+        from appname.benchmarking import latency_regressions
+        baseline = {'10': {'dashboard': {'total_ms': 20.0}, 'home': {'total_ms': 1.0}}}
+        current = {'10': {'dashboard': {'total_ms': 45.0}, 'home': {'total_ms': 3.0}}}
+        self.assertEqual(latency_regressions(current, baseline), {'10/dashboard': (20.0, 45.0)})
+
+
+class SyntheticPortfolioTest(TestCase):
+    """generate_synthetic_portfolio: deterministic, complete and clearable."""
+
+    def setUp(self):
+        call_command('sync_interventions', stdout=StringIO())
+
+    def _generate(self, **kwargs):
+        from datetime import date
+        from appname.synthetic import generate_portfolio
+        options = dict(organisations=2, facilities_per_org=3, months=4,
+                       interventions_per_facility=2, seed=5, end_month=date(2026, 6, 1))
+        options.update(kwargs)
+        return generate_portfolio(**options)
+
+    def _snapshot(self):
+        return (
+            list(Facility.objects.order_by('code_name').values_list('code_name', 'country', 'facility_type')),
+            list(EmissionData.objects.order_by('emission_source__facility__code_name', 'date')
+                 .values_list('date', 'grid_electricity', 'liquid_fuel')),
+            list(FacilityIntervention.objects.order_by('facility__code_name', 'intervention_id')
+                 .values_list('intervention_id', 'implementation_cost')),
+        )
+
+    def test_counts_and_derived_state(self):
+        from datetime import date
+        from appname.models import FacilityAccess
+        counts = self._generate()
+        self.assertEqual(counts['facilities'], 6)
+        self.assertEqual(counts['emission_records'], 24)
+        self.assertEqual(counts['intervention_links'], 12)
+        self.assertEqual(EmissionData.objects.count(), 24)
+        self.assertEqual(
+            sorted(set(EmissionData.objects.values_list('date', flat=True))),
+            [date(2026, m, 1) for m in (3, 4, 5, 6)],
+        )
+        # per facility: the creator grant, plus owner + 2 members via the org
+        self.assertEqual(FacilityAccess.objects.count(), 6 * (1 + 3))
+        for facility in Facility.objects.all():
+            self.assertEqual(facility.latest_emission.date, date(2026, 6, 1))
+            self.assertGreater(facility.latest_tco2e, 0)
+
+    def test_same_seed_same_portfolio(self):
+        self._generate()
+        first = self._snapshot()
+        call_command('generate_synthetic_portfolio', '--clear', '--organisations', '0', stdout=StringIO())
+        self.assertFalse(Facility.objects.exists())
+        self._generate()
+        self.assertEqual(self._snapshot(), first)
+
+    def test_owner_sees_whole_portfolio(self):
+        from appname.access import accessible_facilities
+        owner = User.objects.create_user('syn_owner', password='pw')
+        self._generate(owner=owner, members_per_org=0)
+        self.assertEqual(accessible_facilities(owner).count(), 6)
+        self.assertEqual(User.objects.filter(username__startswith='syn_user_').count(), 0)
+
+    def test_command_reports_and_clear_removes_everything(self):
+        from appname.models import Organisation
+        out = StringIO()
+        call_command('generate_synthetic_portfolio', '--organisations', '1', '--facilities-per-org', '2',
+                     '--months', '3', '--end-month', '2026-06', stdout=out)
+        self.assertIn('6 emission records', out.getvalue())
+        call_command('generate_synthetic_portfolio', '--clear', '--organisations', '0', stdout=StringIO())
+        self.assertFalse(Facility.objects.filter(code_name__startswith='SYN_').exists())
+        self.assertFalse(Organisation.objects.filter(name__startswith='SYN ').exists())
+        self.assertFalse(User.objects.filter(username__startswith='syn_user_').exists())
+
+
+class ColdStartSyncTest(TestCase):
+    """sync_interventions skips an unchanged library; backfill is one INSERT … SELECT."""
+
+    def setUp(self):
+        call_command('sync_interventions', stdout=StringIO())
+        self.user = User.objects.create_user('coldstart', password='pw')
+
+    def test_unchanged_library_is_skipped(self):
+        out = StringIO()
+        with self.assertNumQueries(2):
+            call_command('sync_interventions', stdout=out)
+        self.assertIn('skipped', out.getvalue())
+
+    def test_changed_hash_or_missing_entry_resyncs(self):
+        from appname.models import LibrarySyncState
+        Intervention.objects.filter(code_name='SOLAR_PV').delete()
+        call_command('sync_interventions', stdout=StringIO())
+        self.assertTrue(Intervention.objects.filter(code_name='SOLAR_PV').exists())
+
+        LibrarySyncState.objects.update(content_hash='stale')
+        Intervention.objects.filter(code_name='SOLAR_PV').update(display_name='Edited')
+        call_command('sync_interventions', stdout=StringIO())
+        self.assertNotEqual(Intervention.objects.get(code_name='SOLAR_PV').display_name, 'Edited')
+
+    def test_force_resyncs_unchanged_library(self):
+        Intervention.objects.filter(code_name='SOLAR_PV').update(display_name='Edited')
+        call_command('sync_interventions', '--force', stdout=StringIO())
+        self.assertNotEqual(Intervention.objects.get(code_name='SOLAR_PV').display_name, 'Edited')
+
+    def test_backfill_costs_match_seed_helper(self):
+        from appname.views import _seed_facility_interventions
+        seeded = Facility.objects.create(code_name='CS_SEED', display_name='Seeded', created_by=self.user)
+        backfilled = Facility.objects.create(code_name='CS_FILL', display_name='Filled', created_by=self.user)
+        _seed_facility_interventions(seeded)
+        Intervention.objects.create(code_name='CS_UNLISTED', display_name='Not in DEFAULT_COSTS',
+                                    emission_reduction_percentage=5, energy_savings=0)
+        call_command('backfill_facility_interventions', stdout=StringIO())
+
+        fields = ('intervention__code_name', 'implementation_cost', 'maintenance_cost',
+                  'annual_savings', 'cost_source')
+        rows = lambda f: {r[0]: r[1:] for r in FacilityIntervention.objects.filter(facility=f).values_list(*fields)}
+        filled, seeded_rows = rows(backfilled), rows(seeded)
+        self.assertEqual(len(filled), Intervention.objects.count())
+        for code, values in seeded_rows.items():
+            self.assertEqual(filled[code], values, code)
+        self.assertEqual(filled['CS_UNLISTED'][-1], 'PLACEHOLDER')
+        self.assertEqual(rows(seeded)['CS_UNLISTED'][-1], 'PLACEHOLDER')
+
+    def test_backfill_bumps_revision_and_noop_is_one_query(self):
+        facility = Facility.objects.create(code_name='CS_REV', display_name='Rev', created_by=self.user)
+        revision = facility.revision
+        out = StringIO()
+        call_command('backfill_facility_interventions', '--dry-run', stdout=out)
+        self.assertIn(f'{Intervention.objects.count()} missing links across 1 facilities', out.getvalue())
+        self.assertFalse(FacilityIntervention.objects.filter(facility=facility).exists())
+
+        call_command('backfill_facility_interventions', stdout=StringIO())
+        facility.refresh_from_db()
+        self.assertGreater(facility.revision, revision)
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('backfill_facility_interventions', stdout=StringIO())
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 1, statements)
+
+
+class BulkLibrarySyncTest(TestCase):
+    """sync_interventions diffs in memory and writes with one bulk_create / bulk_update."""
+
+    def _sync(self, *args):
+        out = StringIO()
+        call_command('sync_interventions', *args, stdout=out)
+        return out.getvalue()
+
+    def test_query_count_does_not_grow_with_library(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            self._sync()
+        # hash check (2) + diff load + bulk_create + sync-state upsert + library
+        # version rotation, not one per entry
+        self.assertLess(len(ctx.captured_queries), 18)
+        self.assertEqual(Intervention.objects.count(), len(INTERVENTION_LIBRARY))
+
+        Intervention.objects.filter(code_name__in=['SOLAR_PV', 'LED_LIGHTING']).update(description='x')
+        Intervention.objects.filter(code_name='TREE_PLANTING').delete()
+        with CaptureQueriesContext(connection) as ctx:
+            output = self._sync('--force')
+        self.assertLess(len(ctx.captured_queries), 12)
+        self.assertIn('1 created, 2 updated', output)
+        self.assertIn('(description)', output)
+        self.assertEqual(Intervention.objects.count(), len(INTERVENTION_LIBRARY))
+        self.assertFalse(Intervention.objects.filter(description='x').exists())
+
+    def test_check_reports_diff_without_writing(self):
+        from django.core.management.base import CommandError
+        self._sync()
+        Intervention.objects.filter(code_name='SOLAR_PV').update(emission_reduction_percentage=1)
+        Intervention.objects.filter(code_name='TREE_PLANTING').delete()
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 missing, 1 changed'):
+            call_command('sync_interventions', '--check', stdout=out)
+        self.assertIn('Would update', out.getvalue())
+        self.assertIn('emission_reduction_percentage', out.getvalue())
+        self.assertFalse(Intervention.objects.filter(code_name='TREE_PLANTING').exists())
+        self.assertEqual(
+            Intervention.objects.get(code_name='SOLAR_PV').emission_reduction_percentage, Decimal('1'),
+        )
+
+    def test_check_passes_when_in_sync(self):
+        self._sync()
+        self.assertIn('matches the library', self._sync('--check'))
+
+
+# Pool threads have their own DB connections: they cannot see the
+# TestCase's uncommitted rows, and under SQLite they would hit its lock
+@override_settings(ASYNC_QUERY_CONCURRENCY=False)
+class AsyncViewsTest(TestCase):
+    """ASGI home/dashboard: same context as the sync views, parts run concurrently."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('asyncer', password='pw')
+        cls.facility = Facility.objects.create(
+            code_name='ASYNC_F', display_name='Async Facility', country='KE', created_by=cls.user,
+        )
+        source = EmissionSource.objects.create(facility=cls.facility, code_name='S', display_name='S')
+        EmissionData.objects.create(emission_source=source, date='2026-01-01', grid_electricity=1000)
+
+    def _request(self, path, user):
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory
+        request = AsyncRequestFactory().get(path)
+        request.user = user or AnonymousUser()
+
+        async def auser():
+            return request.user
+        request.auser = auser
+        return request
+
+    async def test_parts_match_sync_context(self):
+        from asgiref.sync import sync_to_async
+        from appname import views
+        from appname.async_views import gather_parts
+
+        def sync_results(queries):
+            return {name: run() for name, run in queries(self.user).items()}
+
+        for queries in (views._home_queries, views._dashboard_queries):
+            expected = await sync_to_async(sync_results)(queries)
+            parts = await sync_to_async(queries)(self.user)
+            self.assertEqual(await gather_parts(parts), expected)
+
+    async def test_views_render(self):
+        from appname import async_views
+        response = await async_views.home(self._request('/', self.user))
+        self.assertEqual(response.status_code, 200)
+        response = await async_views.dashboard(self._request('/dashboard/', self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Async Facility')
+
+    async def test_dashboard_requires_login(self):
+        from appname import async_views
+        response = await async_views.dashboard(self._request('/dashboard/', None))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_parts_run_concurrently_in_query_pool(self):
+        import threading
+        import time as _time
+        from appname.async_views import gather_parts
+
+        def part():
+            _time.sleep(0.2)
+            return threading.current_thread().name
+
+        with override_settings(ASYNC_QUERY_CONCURRENCY=True):
+            started = _time.perf_counter()
+            results = await gather_parts({f'p{i}': part for i in range(4)})
+            elapsed = _time.perf_counter() - started
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(all(name.startswith('carbomica-query') for name in results.values()))
+
+
+class RequestMetricsTest(TestCase):
+    """Server-Timing header, per-view histograms and the staff /metrics endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('timer', password='pw')
+        cls.staff = User.objects.create_user('ops', password='pw', is_staff=True)
+        cls.facility = Facility.objects.create(
+            code_name='TIMED', display_name='Timed', country='ZA', created_by=cls.user,
+        )
+        source = EmissionSource.objects.create(facility=cls.facility, code_name='S', display_name='S')
+        EmissionData.objects.create(emission_source=source, date='2026-01-01', grid_electricity=1000)
+
+    def setUp(self):
+        from appname.instrumentation import HISTOGRAMS
+        HISTOGRAMS.reset()
+
+    @staticmethod
+    def _timing(response):
+        entries = {}
+        for part in response['Server-Timing'].split(', '):
+            name, *params = part.split(';')
+            entries[name] = dict(p.split('=', 1) for p in params)
+        return entries
+
+    def test_server_timing_counts_queries_and_stages(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/dashboard/')
+        timing = self._timing(response)
+        self.assertIn('total', timing)
+        self.assertIn('template', timing)
+        # every statement the view ran (the test client's own login lookups included)
+        self.assertEqual(timing['db']['desc'], f'"{len(ctx.captured_queries)} queries"')
+        # The page shows stored totals; its charts run the aggregation
+        self.assertNotIn('tco2e', timing)
+        self.assertIn('tco2e', self._timing(self.client.get('/dashboard/charts/sources/')))
+
+    def test_nested_stage_counts_once(self):
+        import time as _time
+        from appname.instrumentation import collect, stage
+        with collect() as timings:
+            with stage('tco2e'):
+                with stage('tco2e'):
+                    _time.sleep(0.05)
+        self.assertGreaterEqual(timings.seconds['tco2e'], 0.05)
+        self.assertLess(timings.seconds['tco2e'], 0.09)
+
+    def test_histograms_per_view_and_metrics_is_staff_only(self):
+        self.client.force_login(self.user)
+        self.client.get('/facilities/')
+        self.client.get('/facilities/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE carbomica_request_seconds histogram', body)
+        self.assertIn('carbomica_request_seconds_count{view="facilities"} 2', body)
+        self.assertIn('carbomica_stage_seconds_count{stage="template",view="facilities"} 2', body)
+        self.assertIn('carbomica_request_queries_bucket{view="facilities",le="+Inf"} 2', body)
+
+    def test_engine_functions_untimed_outside_requests(self):
+        from appname.instrumentation import current
+        self.assertIsNone(current())
+        self.assertGreater(compute_tco2e(EmissionData.objects.get(), 'ZA')['total'], 0)
+
+
+class ProfilerMiddlewareTest(TestCase):
+    """Staff-only single-request profiling into ProfileCapture."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('slow-org', password='pw')
+        cls.staff = User.objects.create_user('support', password='pw', is_staff=True)
+        cls.facility = Facility.objects.create(
+            code_name='PROF', display_name='Profiled', country='KE', created_by=cls.user,
+        )
+        source = EmissionSource.objects.create(facility=cls.facility, code_name='S', display_name='S')
+        EmissionData.objects.create(emission_source=source, date='2026-01-01', grid_electricity=500)
+
+    def test_staff_query_parameter_stores_capture(self):
+        from appname.models import ProfileCapture
+        self.client.force_login(self.staff)
+        response = self.client.get('/district-planning/?_profile=1')
+        self.assertEqual(response.status_code, 200)
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(response['X-Carbomica-Profile'], f'/admin/appname/profilecapture/{capture.pk}/change/')
+        self.assertEqual(capture.view_name, 'district_planning')
+        self.assertEqual(capture.user, self.staff)
+        self.assertIn('district_planning', capture.stats_report)
+        self.assertGreater(capture.query_count, 0)
+        self.assertEqual(len(capture.sql_log), capture.query_count)
+        self.assertIn('-- ', capture.explain)
+        self.assertNotIn('EXPLAIN failed', capture.explain)
+        self.assertTrue(capture.allocations)
+
+    def test_header_switch_and_pstats_round_trip(self):
+        import pstats
+        import tempfile
+        from appname.models import ProfileCapture
+        self.client.force_login(self.staff)
+        self.client.get(f'/facilities/{self.facility.id}/', headers={'X-Carbomica-Profile': '1'})
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(capture.view_name, 'facility_detail')
+        with tempfile.NamedTemporaryFile(suffix='.pstats') as f:
+            f.write(bytes(capture.stats_data))
+            f.flush()
+            stats = pstats.Stats(f.name)
+        self.assertTrue(any(func[2] == 'facility_detail' for func in stats.stats))
+
+    def test_non_staff_and_unflagged_requests_are_not_profiled(self):
+        from appname.models import ProfileCapture
+        self.client.force_login(self.user)
+        response = self.client.get('/district-planning/?_profile=1')
+        self.assertNotIn('X-Carbomica-Profile', response)
+        self.client.force_login(self.staff)
+        self.client.get('/district-planning/')
+        for value in ('0', 'false', 'no', ''):
+            response = self.client.get('/district-planning/', {'_profile': value})
+            self.assertNotIn('X-Carbomica-Profile', response, value)
+            response = self.client.get('/district-planning/', headers={'X-Carbomica-Profile': value})
+            self.assertNotIn('X-Carbomica-Profile', response, value)
+        self.assertFalse(ProfileCapture.objects.exists())
+        self.client.get('/district-planning/', {'_profile': 'true'})
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+    async def test_profiles_under_asgi(self):
+        from asgiref.sync import iscoroutinefunction
+        from appname.middleware import ProfilerMiddleware
+        from appname.models import ProfileCapture
+
+        async def get_response(request):
+            return None
+        self.assertTrue(iscoroutinefunction(ProfilerMiddleware(get_response)))
+
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get('/district-planning/', {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        capture = await ProfileCapture.objects.aget()
+        self.assertEqual(response['X-Carbomica-Profile'], f'/admin/appname/profilecapture/{capture.pk}/change/')
+        # The sync view ran on the profiled thread
+        self.assertIn('district_planning', capture.stats_report)
+        self.assertGreater(capture.query_count, 0)
+
+    def test_admin_change_page_renders_capture(self):
+        from appname.models import ProfileCapture
+        admin_user = User.objects.create_superuser('root-admin', password='pw')
+        self.client.force_login(admin_user)
+        url = self.client.get('/district-planning/?_profile=1')['X-Carbomica-Profile']
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'EXPLAIN (slowest SELECTs)')
+        self.assertEqual(ProfileCapture.objects.count(), 1)
+
+
+class PlatformStatsTest(TestCase):
+    """Anonymous home reads PlatformStats, which every write path keeps in step."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('stats-owner', password='pw')
+
+    def _assert_consistent(self):
+        from appname.stats import STAT_FIELDS, compute_platform_stats, platform_stats
+        call_command('rebuild_platform_stats', check=True, stdout=StringIO())
+        stats = platform_stats()
+        self.assertEqual({name: getattr(stats, name) for name in STAT_FIELDS}, compute_platform_stats())
+        return stats
+
+    def _facility(self, code, country='KE', usage=(1000, 2000)):
+        facility = Facility.objects.create(
+            code_name=code, display_name=code, country=country, created_by=self.user,
+        )
+        source = EmissionSource.objects.create(facility=facility, code_name=f'{code}_S', display_name='S')
+        for month, kwh in enumerate(usage, start=1):
+            EmissionData.objects.create(emission_source=source, date=f'2026-0{month}-01', grid_electricity=kwh)
+        return facility
+
+    def test_anonymous_home_reads_stats_without_scanning_records(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from appname.stats import platform_stats
+        platform_stats()  # first count
+        self._facility('A')
+        self._facility('B', country='ZA', usage=(500,))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/')
+        self.assertFalse(any('appname_emissiondata' in q['sql'] for q in ctx.captured_queries))
+        stats = self._assert_consistent()
+        self.assertEqual(response.context['facility_count'], 2)
+        self.assertEqual(stats.facility_count, 2)
+        self.assertEqual(response.context['total_emissions'], stats.total_tco2e)
+        self.assertGreater(stats.total_tco2e, 0)
+
+    def test_edits_links_scenarios_and_deletes_apply_deltas(self):
+        from appname.stats import platform_stats
+        platform_stats()
+        facility = self._facility('EDIT')
+        record = EmissionData.objects.filter(emission_source__facility=facility).first()
+        record.grid_electricity = 9000
+        record.save()
+        facility.country = 'ZW'
+        facility.save()
+        FacilityIntervention.objects.create(
+            facility=facility, intervention=Intervention.objects.first(),
+            implementation_cost=1, maintenance_cost=1, annual_savings=1,
+        )
+        scenario = OptimizationScenario.objects.create(
+            facility=facility, name='S', budget=1000, target_reduction=10, status='Optimized',
+        )
+        self.assertEqual(self._assert_consistent().optimized_scenarios, 1)
+        scenario.status = 'Draft'
+        scenario.save()
+        intervention = Intervention.objects.first()
+        intervention.status = 'Completed'
+        intervention.save()
+        self.assertEqual(self._assert_consistent().active_interventions, 0)
+
+        self._facility('KEEP')
+        self.client.force_login(self.user)
+        self.client.post(f'/facilities/{facility.id}/delete/', {'confirm_name': 'EDIT'})
+        self.assertFalse(Facility.objects.filter(pk=facility.pk).exists())
+        stats = self._assert_consistent()
+        self.assertEqual(stats.facility_count, 1)
+
+    def test_bulk_paths_keep_stats_in_step(self):
+        from appname.stats import platform_stats
+        from appname.synthetic import generate_portfolio
+        platform_stats()
+        generate_portfolio(organisations=2, facilities_per_org=3, months=4, seed=3)
+        self.assertEqual(self._assert_consistent().facility_count, 6)
+        call_command('generate_synthetic_portfolio', clear=True, organisations=0, stdout=StringIO())
+        stats = self._assert_consistent()
+        self.assertEqual((stats.facility_count, stats.total_tco2e), (0, 0))
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        from django.core.management.base import CommandError
+        from appname.models import PlatformStats
+        from appname.stats import platform_stats
+        self._facility('DRIFT')
+        platform_stats()
+        # Neither update fires signals
+        Facility.objects.update(emissions_tco2e=0)
+        PlatformStats.objects.update(facility_count=99)
+        with self.assertRaisesMessage(CommandError, '1 facility totals and 1 platform figures'):
+            call_command('rebuild_platform_stats', check=True, stdout=StringIO())
+        call_command('rebuild_platform_stats', stdout=StringIO())
+        self.assertGreater(self._assert_consistent().total_tco2e, 0)
+
+
+class HealthEndpointsTest(TestCase):
+    """/healthz is I/O-free liveness; /readyz needs the database and a finished warm-up."""
+
+    def setUp(self):
+        from appname import warmup
+        self._saved_state = dict(warmup.STATE)
+        warmup.STATE.update(done=False, ms=None, templates=0, error=None, attempts=0)
+        self.addCleanup(warmup.STATE.update, self._saved_state)
+        self.addCleanup(setattr, warmup, '_next_retry', warmup._next_retry)
+
+    def test_healthz_touches_nothing(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'ok')
+
+    def test_readyz_waits_for_warm_up(self):
+        from appname.warmup import warm_up
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['database'], 'ok')
+        self.assertFalse(response.json()['warmup']['done'])
+
+        state = warm_up()
+        self.assertTrue(state['done'])
+        self.assertGreater(state['templates'], 0)
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['ready'])
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_readyz_reports_database_failure(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from appname import views
+        views.WARMUP['done'] = True
+        with mock.patch.object(views.connection, 'cursor', side_effect=OperationalError('down')):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['database'], 'error: down')
+
+    def test_warm_up_compiles_templates_and_survives_failure(self):
+        from unittest import mock
+        from django.template import engines
+        from appname import warmup
+        with mock.patch.object(warmup, '_touch_library', side_effect=RuntimeError('boom')), \
+                self.assertLogs('appname.warmup', level='ERROR'):
+            state = warmup.warm_up()
+        self.assertFalse(state['done'])
+        self.assertEqual(state['error'], 'RuntimeError: boom')
+
+        warmup.warm_up()
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('appname/home.html', loader.get_template_cache)
+
+    def test_readyz_retries_a_failed_warm_up_with_backoff(self):
+        import time
+        from unittest import mock
+        from appname import warmup
+        with mock.patch.object(warmup, '_touch_library', side_effect=RuntimeError('boom')), \
+                self.assertLogs('appname.warmup', level='ERROR'):
+            warmup.warm_up()
+            # Backing off: the probe does not retry yet
+            response = self.client.get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['warmup']['attempts'], 1)
+            # Backoff over: the probe retries, fails again and doubles the wait
+            warmup._next_retry = 0.0
+            self.assertEqual(self.client.get('/readyz').json()['warmup']['attempts'], 2)
+            self.assertGreater(warmup._next_retry - time.monotonic(), warmup.RETRY_START)
+        warmup._next_retry = 0.0
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['warmup'], {
+            'done': True, 'ms': warmup.STATE['ms'], 'error': None, 'attempts': 3,
+        })
+
+
+def _incr_in_child(location, times):
+    from appname.sqlite_cache import SQLiteCache
+    backend = SQLiteCache(location, {})
+    for _ in range(times):
+        backend.incr('counter')
+
+
+class SQLiteCacheTest(TestCase):
+    """The shared cache backend: Django cache API, cross-process atomicity, bounded LRU."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.location = f'{directory}/cache.sqlite3'
+
+    def test_plain_test_runs_get_a_private_cache_file(self):
+        import os
+        import subprocess
+        import sys
+        import tempfile
+        script = (
+            'import sys; sys.argv = sys.argv[1:]; '
+            'from django.conf import settings; print(settings.CACHE_PATH)'
+        )
+        env = {k: v for k, v in os.environ.items() if k not in ('DJANGO_TESTING', 'DJANGO_CACHE_PATH')}
+        env['DJANGO_SETTINGS_MODULE'] = 'Carbomica_app.settings'
+
+        def cache_path(*argv):
+            return subprocess.run(
+                [sys.executable, '-c', script, *argv], env=env, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+
+        shared = os.path.join(tempfile.gettempdir(), 'carbomica-cache.sqlite3')
+        self.assertEqual(cache_path('manage.py', 'runserver'), shared)
+        private = cache_path('manage.py', 'test')
+        self.assertNotEqual(private, shared)
+        self.assertTrue(os.path.basename(os.path.dirname(private)).startswith('carbomica-cache-'))
+
+    def _backend(self, **options):
+        from appname.sqlite_cache import SQLiteCache
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def _clock(self, backend_module_time):
+        from unittest import mock
+        from appname import sqlite_cache
+        return mock.patch.object(sqlite_cache, 'time', backend_module_time)
+
+    def test_django_cache_api(self):
+        backend = self._backend()
+        backend.set('a', {'x': Decimal('1.5')})
+        self.assertEqual(backend.get('a'), {'x': Decimal('1.5')})
+        self.assertFalse(backend.add('a', 'other'))
+        self.assertTrue(backend.add('b', 2))
+        backend.set_many({'c': 3, 'd': 4})
+        self.assertEqual(backend.get_many(['a', 'c', 'd', 'missing']), {'a': {'x': Decimal('1.5')}, 'c': 3, 'd': 4})
+        self.assertTrue(backend.delete('c'))
+        backend.delete_many(['d', 'b'])
+        self.assertEqual(backend.get_many(['b', 'c', 'd']), {})
+        self.assertTrue(backend.add('n', 0))
+        self.assertEqual(backend.incr('n', 5), 5)
+        self.assertEqual(backend.decr('n'), 4)
+        with self.assertRaises(ValueError):
+            backend.incr('never-set')
+        backend.set('gone', 1, timeout=0)
+        self.assertFalse(backend.has_key('gone'))
+        self.assertEqual(backend.stats()['entries'], 2)
+        backend.clear()
+        self.assertEqual(backend.stats(), {'entries': 0, 'bytes': 0})
+
+    def test_expiry_and_touch(self):
+        from types import SimpleNamespace
+        now = SimpleNamespace(value=1000.0)
+        clock = SimpleNamespace(time=lambda: now.value)
+        backend = self._backend()
+        with self._clock(clock):
+            backend.set('k', 'v', timeout=10)
+            now.value = 1005
+            self.assertTrue(backend.touch('k', timeout=10))
+            now.value = 1012
+            self.assertEqual(backend.get('k'), 'v')
+            now.value = 1016
+            self.assertIsNone(backend.get('k'))
+            self.assertEqual(backend.stats()['entries'], 0)
+
+    def test_incr_is_atomic_across_processes(self):
+        import multiprocessing
+        backend = self._backend()
+        backend.set('counter', 0, timeout=None)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_incr_in_child, args=(self.location, 100)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(backend.get('counter'), 400)
+
+    def test_least_recently_read_entries_are_culled(self):
+        from types import SimpleNamespace
+        now = SimpleNamespace(value=0.0)
+        clock = SimpleNamespace(time=lambda: now.value)
+        backend = self._backend(MAX_ENTRIES=10)
+        with self._clock(clock):
+            for i in range(10):
+                now.value = float(i)
+                backend.set(f'k{i}', i, timeout=None)
+            now.value = 20
+            self.assertEqual(backend.get('k0'), 0)     # k0 becomes the most recently read
+            now.value = 21
+            backend.set('k10', 10, timeout=None)        # 11 > 10: keep the 9 most recent
+        kept = backend.get_many([f'k{i}' for i in range(11)])
+        self.assertEqual(sorted(kept), sorted(['k0', 'k10'] + [f'k{i}' for i in range(3, 10)]))
+        self.assertEqual(backend.stats()['entries'], 9)
+
+    def test_byte_budget_bounds_the_file(self):
+        backend = self._backend(MAX_BYTES=10_000)
+        for i in range(6):
+            backend.set(f'blob{i}', b'x' * 3000)
+        self.assertLessEqual(backend.stats()['bytes'], 10_000)
+        self.assertTrue(backend.has_key('blob5'))
+        self.assertFalse(backend.has_key('blob0'))
+
+
+class ConditionalPageTest(TestCase):
+    """facility_detail / optimization_results answer 304 until the facility's revision moves."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('etag', 'etag@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='ETAG_FAC', display_name='ETag Hospital', country='ZW',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='ETAG_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=cls.source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+        cls.url = f'/facilities/{cls.facility.id}/'
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client.login(username='etag', password='pw')
+
+    def _emission_queries(self, response_for):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = response_for()
+        return response, [q['sql'] for q in ctx.captured_queries if 'appname_emissiondata' in q['sql']]
+
+    def test_unchanged_facility_is_304_without_reading_records(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertNotIn('Last-Modified', first)
+        again, queries = self._emission_queries(
+            lambda: self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']),
+        )
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(queries, [])
+
+    def test_link_and_emission_writes_change_the_etag(self):
+        first = self.client.get(self.url)
+        FacilityIntervention.objects.create(
+            facility=self.facility, intervention=Intervention.objects.first(),
+            implementation_cost=1, maintenance_cost=1, annual_savings=1,
+        )
+        linked = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(linked.status_code, 200)
+        self.assertEqual(linked.context['attached_count'], 1)
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-02-01', grid_electricity=Decimal('5'),
+        )
+        recorded = self.client.get(self.url, HTTP_IF_NONE_MATCH=linked['ETag'])
+        self.assertEqual(recorded.status_code, 200)
+        self.assertEqual(recorded.context['record_count'], 2)
+
+    def test_etag_is_per_user_session_and_pending_messages_render(self):
+        from django.contrib.messages import constants
+        from django.contrib.messages.storage.base import Message
+        from django.contrib.messages.storage.cookie import CookieStorage
+        from django.test import RequestFactory
+        first = self.client.get(self.url)
+        # A new CSRF cookie: the cached page's form tokens would be stale
+        self.client.cookies['csrftoken'] = 'x' * 32
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        current = self.client.get(self.url)
+        storage = CookieStorage(RequestFactory().get('/'))
+        self.client.cookies['messages'] = storage._encode([Message(constants.SUCCESS, 'Saved')])
+        flashed = self.client.get(self.url, HTTP_IF_NONE_MATCH=current['ETag'])
+        self.assertEqual(flashed.status_code, 200)
+        self.assertContains(flashed, 'Saved')
+
+    def test_optimization_results_revalidates_on_scenario_write(self):
+        scenario = OptimizationScenario.objects.create(
+            facility=self.facility, name='Plan A', budget=Decimal('1000'),
+        )
+        url = f'/optimization-results/{scenario.id}/'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        scenario.name = 'Plan B'
+        scenario.save()
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertContains(again, 'Plan B')
+
+    def test_library_changes_change_the_etag(self):
+        first = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.client.post('/upload/interventions/', {
+            'action': 'create_custom', 'custom_name': 'Biogas digester',
+        })
+        custom = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(custom.status_code, 200)
+        self.assertContains(custom, 'Biogas digester')
+        current = self.client.get(self.url)  # the flash message has been shown
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=current['ETag']).status_code, 304)
+        # sync_interventions writes in bulk, without model signals
+        Intervention.objects.filter(code_name='SOLAR_PV').update(description='stale')
+        call_command('sync_interventions', '--force', stdout=StringIO())
+        synced = self.client.get(self.url, HTTP_IF_NONE_MATCH=current['ETag'])
+        self.assertEqual(synced.status_code, 200)
+
+    def test_release_id_is_the_same_in_every_worker(self):
+        import os
+        import subprocess
+        import sys
+        script = 'from django.conf import settings; print(settings.RELEASE_ID)'
+        env = {k: v for k, v in os.environ.items() if k not in ('K_REVISION', 'DJANGO_RELEASE_ID')}
+        env['DJANGO_SETTINGS_MODULE'] = 'Carbomica_app.settings'
+        ids = {
+            subprocess.run(
+                [sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+            for _ in range(2)
+        }
+        self.assertEqual(len(ids), 1)
+        self.assertNotIn('', ids)
+
+
+class EmissionFactorSyncTest(TestCase):
+    """sync_emission_factors turns a factor change into recomputed totals and new revisions."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('factors', password='pw')
+        self.facility = Facility.objects.create(
+            code_name='EF_FAC', display_name='Factor Hospital', country='ZW', created_by=self.user,
+        )
+        source = EmissionSource.objects.create(
+            facility=self.facility, code_name='EF_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=source, date='2026-01-01', grid_electricity=Decimal('1000'),
+        )
+
+    def test_first_run_records_then_skips(self):
+        out = StringIO()
+        call_command('sync_emission_factors', stdout=out)
+        self.assertIn('Recorded', out.getvalue())
+        revision = Facility.objects.get(pk=self.facility.pk).revision
+        out = StringIO()
+        call_command('sync_emission_factors', stdout=out)
+        self.assertIn('skipped', out.getvalue())
+        self.assertEqual(Facility.objects.get(pk=self.facility.pk).revision, revision)
+
+    def test_changed_factor_recomputes_and_bumps_revision(self):
+        from unittest import mock
+        from django.core.management.base import CommandError
+        call_command('sync_emission_factors', stdout=StringIO())
+        before = Facility.objects.get(pk=self.facility.pk)
+        doubled = ELECTRICITY_EF['ZW'] * 2
+        with mock.patch.dict(ELECTRICITY_EF, {'ZW': doubled}):
+            with self.assertRaises(CommandError):
+                call_command('sync_emission_factors', '--check', stdout=StringIO())
+            call_command('sync_emission_factors', stdout=StringIO())
+            call_command('sync_emission_factors', '--check', stdout=StringIO())
+        after = Facility.objects.get(pk=self.facility.pk)
+        self.assertGreater(after.revision, before.revision)
+        self.assertEqual(after.latest_tco2e, Decimal('1000') * doubled)
+        self.assertEqual(after.emissions_tco2e, Decimal('1000') * doubled)
+
+
+class EmissionHistoryPaginationTest(TestCase):
+    """facility_detail renders the latest record; the history table pages in by (date, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('history', 'history@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='HIST_FAC', display_name='History Hospital', country='KE',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        cls.source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='HIST_SRC', display_name='Src',
+        )
+        # 30 monthly records, plus a second record on the newest date to
+        # exercise the id tie-break
+        for month in range(30):
+            EmissionData.objects.create(
+                emission_source=cls.source, date=f'{2024 + month // 12}-{month % 12 + 1:02d}-01',
+                grid_electricity=Decimal(100 + month),
+            )
+        cls.tied = EmissionData.objects.create(
+            emission_source=cls.source, date='2026-06-01', grid_electricity=Decimal('999'),
+        )
+        cls.url = f'/facilities/{cls.facility.id}/history/'
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client.login(username='history', password='pw')
+
+    def test_page_renders_only_the_latest_record(self):
+        response = self.client.get(f'/facilities/{self.facility.id}/')
+        self.assertEqual(response.context['record_count'], 31)
+        self.assertEqual(response.context['latest_breakdown']['id'], self.tied.id)
+        self.assertNotIn('records_with_tco2e', response.context)
+        self.assertContains(response, 'Show older records')
+
+    def test_pages_walk_every_record_once_newest_first(self):
+        from appname.views import HISTORY_PAGE_SIZE
+        first = self.client.get(self.url).json()
+        self.assertEqual(len(first['records']), HISTORY_PAGE_SIZE)
+        self.assertEqual(first['records'][0]['id'], self.tied.id)
+        self.assertEqual(
+            Decimal(first['records'][0]['total_tco2e']), Decimal('999') * ELECTRICITY_EF['KE'],
+        )
+        second = self.client.get(self.url, {'after': first['next']}).json()
+        self.assertIsNone(second['next'])
+        records = first['records'] + second['records']
+        self.assertEqual(len({r['id'] for r in records}), 31)
+        keys = [(r['date'], r['id']) for r in records]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_new_record_does_not_shift_a_later_page(self):
+        first = self.client.get(self.url).json()
+        second = self.client.get(self.url, {'after': first['next']})
+        EmissionData.objects.create(
+            emission_source=self.source, date='2026-07-01', grid_electricity=Decimal('1'),
+        )
+        again = self.client.get(self.url, {'after': first['next']}, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['records'], second.json()['records'])
+
+    def test_pages_revalidate_and_reject_bad_cursors(self):
+        first = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.url, {'after': 'nope'}).status_code, 400)
+        other = User.objects.create_user('history2', 'history2@example.com', 'pw')
+        foreign = Facility.objects.create(
+            code_name='HIST_2', display_name='Foreign', country='KE', created_by=other,
+        )
+        self.assertEqual(self.client.get(f'/facilities/{foreign.id}/history/').status_code, 404)
+
+
+class InterventionPortfolioPaginationTest(TestCase):
+    """Financial metrics are stored on each link; the portfolio pages through them by keyset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from appname.views import _seed_facility_interventions
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('portfolio', 'portfolio@example.com', 'pw')
+        cls.facilities = []
+        for code in ('A', 'B'):
+            facility = Facility.objects.create(
+                code_name=f'PORT_{code}', display_name=f'Portfolio {code}', country='KE',
+                facility_type='district_hospital', created_by=cls.user,
+            )
+            _seed_facility_interventions(facility)
+            cls.facilities.append(facility)
+        cls.link_count = FacilityIntervention.objects.count()
+
+    def setUp(self):
+        self.client.login(username='portfolio', password='pw')
+
+    def _walk(self, **params):
+        """Every card of every page, following the Next links 7 cards at a time."""
+        from unittest import mock
+        from urllib.parse import parse_qsl
+        cards, query = [], params
+        with mock.patch('appname.views.INTERVENTIONS_PAGE_SIZE', 7):
+            while query:
+                response = self.client.get('/interventions/', query)
+                cards += response.context['intervention_cards']
+                query = dict(parse_qsl(response.context['next_page_query'] or ''))
+        return cards
+
+    def test_links_store_their_metrics_on_every_write_path(self):
+        from appname.modeling import intervention_financials
+        link = FacilityIntervention.objects.filter(annual_savings__gt=0).first()
+        expected = intervention_financials(
+            link.implementation_cost, link.maintenance_cost, link.annual_savings,
+        )
+        self.assertEqual({name: getattr(link, name) for name in expected}, expected)
+        link.annual_savings = Decimal('0')
+        link.save(update_fields=['annual_savings'])
+        link.refresh_from_db()
+        self.assertIsNone(link.payback_years)
+        self.assertEqual(link.roi_pct, Decimal('0'))
+
+    def test_backfill_computes_the_same_metrics(self):
+        from appname.management.commands.backfill_facility_interventions import insert_missing_links
+        from appname.modeling import intervention_financials
+        bare = Facility.objects.create(
+            code_name='PORT_C', display_name='Portfolio C', country='KE', created_by=self.user,
+        )
+        insert_missing_links()
+        for link in FacilityIntervention.objects.filter(facility=bare):
+            expected = intervention_financials(
+                link.implementation_cost, link.maintenance_cost, link.annual_savings,
+            )
+            self.assertEqual({name: getattr(link, name) for name in expected}, expected, link.id)
+
+    def test_every_sort_walks_each_link_once_in_order(self):
+        for sort in ('facility', 'status', 'roi', 'npv'):
+            cards = self._walk(sort=sort)
+            self.assertEqual(len(cards), self.link_count, sort)
+            self.assertEqual(len({card['id'] for card in cards}), self.link_count, sort)
+        cards = self._walk(sort='npv')
+        npvs = [FacilityIntervention.objects.get(pk=card['id']).npv for card in cards]
+        self.assertEqual(npvs, sorted(npvs, reverse=True))
+        cards = self._walk(sort='facility')
+        self.assertEqual(
+            [(card['facility'], card['name']) for card in cards],
+            sorted((card['facility'], card['name']) for card in cards),
+        )
+
+    def test_filters_scope_cards_and_summary(self):
+        facility = self.facilities[0]
+        Intervention.objects.filter(
+            id__in=Intervention.objects.values_list('id', flat=True)[:2],
+        ).update(status='Completed')
+        response = self.client.get('/interventions/', {'facility': facility.id, 'status': 'Completed'})
+        summary = response.context['summary']
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(
+            summary['total_investment'],
+            sum(card['financial']['total_cost'] for card in response.context['intervention_cards']),
+        )
+        self.assertEqual({card['facility_id'] for card in response.context['intervention_cards']}, {facility.id})
+        self.assertEqual(self.client.get('/interventions/', {'after': '!!'}).status_code, 200)
+
+    def test_cursor_values_of_the_wrong_type_start_from_the_first_page(self):
+        from appname.views import _encode_cursor
+        first = self.client.get('/interventions/', {'sort': 'roi'}).context['intervention_cards']
+        for values in (['abc', 1], [1, 'x'], [None, 1], [{'a': 1}, 1], [[1], 2]):
+            response = self.client.get('/interventions/', {'sort': 'roi', 'after': _encode_cursor(values)})
+            self.assertEqual(response.status_code, 200, values)
+            self.assertEqual(response.context['intervention_cards'], first, values)
+
+    def test_refresh_command_repairs_drift(self):
+        from django.core.management.base import CommandError
+        FacilityIntervention.objects.filter(facility=self.facilities[0]).update(npv=0, roi_pct=0)
+        with self.assertRaises(CommandError):
+            call_command('refresh_intervention_financials', '--check', stdout=StringIO())
+        call_command('refresh_intervention_financials', stdout=StringIO())
+        call_command('refresh_intervention_financials', '--check', stdout=StringIO())
+
+
+class AdmissionControlTest(TestCase):
+    """Expensive views are capped per worker and container-wide; identical requests run once."""
+
+    SLOT = 'carbomica:admission:analysis:0'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admit', 'admit@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='ADMIT_1', display_name='Admission 1', country='KE', created_by=cls.user,
+        )
+
+    def setUp(self):
+        from django.core.cache import cache
+        self.cache = cache
+        self.client.login(username='admit', password='pw')
+
+    def tearDown(self):
+        self.cache.delete(self.SLOT)
+
+    def _fingerprint(self, path):
+        from django.test import RequestFactory
+        from appname.admission import request_fingerprint
+        request = RequestFactory().get(path)
+        request.user, request.session = self.user, self.client.session
+        return request_fingerprint('analysis', request)
+
+    def test_view_runs_and_releases_its_slot_and_flight(self):
+        response = self.client.get('/district-planning/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Carbomica-Coalesced', response)
+        self.assertIsNone(self.cache.get(self.SLOT))
+        self.assertIsNone(self.cache.get(f'carbomica:flight:{self._fingerprint("/district-planning/")}'))
+
+    def test_full_pool_answers_busy_within_the_queue_deadline(self):
+        import time
+        from django.test import override_settings
+        self.cache.add(self.SLOT, 'another-worker', 60)
+        with override_settings(ADMISSION_QUEUE_SECONDS=0.1):
+            started = time.monotonic()
+            response = self.client.get('/district-planning/')
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '5')
+            self.assertEqual(self.cache.get(self.SLOT), 'another-worker')
+            # Only the optimisation submission is held; the form is not
+            self.assertEqual(self.client.get(f'/optimize/{self.facility.id}/').status_code, 200)
+            self.assertEqual(
+                self.client.post(f'/optimize/{self.facility.id}/', {'budget': '1000'}).status_code, 503,
+            )
+
+    def test_district_chart_is_admission_controlled(self):
+        from django.test import override_settings
+        self.cache.add(self.SLOT, 'another-worker', 60)
+        with override_settings(ADMISSION_QUEUE_SECONDS=0.05):
+            self.assertEqual(self.client.get('/district-planning/chart/').status_code, 503)
+
+    def test_per_worker_cap(self):
+        from django.test import override_settings
+        from appname.admission import _worker_semaphore
+        semaphore = _worker_semaphore('analysis')
+        semaphore.acquire()
+        try:
+            with override_settings(ADMISSION_QUEUE_SECONDS=0.05):
+                self.assertEqual(self.client.get('/district-planning/').status_code, 503)
+        finally:
+            semaphore.release()
+        self.assertEqual(self.client.get('/district-planning/').status_code, 200)
+
+    def test_waiter_returns_the_flight_in_progress(self):
+        from django.http import HttpResponse
+        lock = f'carbomica:flight:{self._fingerprint("/district-planning/")}'
+        self.cache.set(lock, 'leader', 60)
+        self.cache.set(f'{lock}:leader', HttpResponse('computed once'), 60)
+        try:
+            with self.assertNumQueries(2):  # session and user only
+                response = self.client.get('/district-planning/')
+        finally:
+            self.cache.delete_many([lock, f'{lock}:leader'])
+        self.assertEqual(response.content, b'computed once')
+        self.assertEqual(response['X-Carbomica-Coalesced'], '1')
+        # A different query string is a different request
+        lock = f'carbomica:flight:{self._fingerprint("/district-planning/?page=2")}'
+        self.assertNotEqual(lock, f'carbomica:flight:{self._fingerprint("/district-planning/")}')
+
+    def test_waiter_gives_up_on_a_slow_flight_after_the_queue_deadline(self):
+        import time
+        from django.test import override_settings
+        lock = f'carbomica:flight:{self._fingerprint("/district-planning/")}'
+        self.cache.set(lock, 'slow-leader', 60)
+        try:
+            with override_settings(ADMISSION_QUEUE_SECONDS=0.1, ADMISSION_COALESCE_SECONDS=60):
+                started = time.monotonic()
+                response = self.client.get('/district-planning/')
+                self.assertLess(time.monotonic() - started, 2)
+        finally:
+            self.cache.delete(lock)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_concurrent_identical_calls_run_once(self):
+        import threading
+        import time
+        from django.http import HttpResponse
+        from appname.admission import coalesced
+        calls, responses = [], []
+
+        def run():
+            calls.append(1)
+            time.sleep(0.3)
+            return HttpResponse(f'call {len(calls)}')
+
+        def request():
+            responses.append(coalesced('test-concurrent', run).content)
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(responses, [b'call 1'] * 3)
+        # Once finished, the same call runs again rather than replaying
+        self.assertEqual(coalesced('test-concurrent', run).content, b'call 2')
+
+
+class IdempotentSubmissionTest(TestCase):
+    """A retried or double-clicked POST replays the first result instead of running again."""
+
+    CSV = b'date,grid_electricity\n2026-01-01,1000\n2026-02-01,2000\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        from appname.views import _seed_facility_interventions
+        call_command('sync_interventions', stdout=StringIO())
+        cls.user = User.objects.create_user('idem', 'idem@example.com', 'pw')
+        cls.facility = Facility.objects.create(
+            code_name='IDEM_FAC', display_name='Idempotent Hospital', country='KE',
+            facility_type='district_hospital', created_by=cls.user,
+        )
+        source = EmissionSource.objects.create(
+            facility=cls.facility, code_name='IDEM_SRC', display_name='Src',
+        )
+        EmissionData.objects.create(
+            emission_source=source, date='2026-01-01', grid_electricity=Decimal('500000'),
+        )
+        _seed_facility_interventions(cls.facility)
+
+    def setUp(self):
+        self.client.login(username='idem', password='pw')
+
+    def _optimise(self, **extra):
+        payload = {
+            'name': 'Idempotent run', 'mode': 'budget', 'budget': '50000', 'date': '2026-01-01',
+            'grid_electricity': '500000', 'grid_gas': '0', 'bottled_gas': '0',
+            'liquid_fuel': '0', 'vehicle_fuel_owned': '0', 'business_travel': '0',
+            'anaesthetic_gases': '0', 'refrigeration_gases': '0',
+            'waste_management': '0', 'medical_inhalers': '0', 'contractor_logistics': '0',
+            **extra,
+        }
+        return self.client.post(f'/optimize/{self.facility.id}/', payload)
+
+    def _upload(self, content, **extra):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return self.client.post('/upload/emissions/', {
+            'facility': self.facility.id,
+            'csv_file': SimpleUploadedFile('emissions.csv', content, content_type='text/csv'),
+            **extra,
+        })
+
+    def _messages(self, response):
+        from django.contrib.messages import get_messages
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_forms_carry_a_fresh_key(self):
+        import re
+        keys = set()
+        for path in ('/upload/emissions/', '/upload/interventions/', f'/optimize/{self.facility.id}/'):
+            body = self.client.get(path).content.decode()
+            keys.update(re.findall(r'name="idempotency_key" value="([0-9a-f]{32})"', body))
+        self.assertGreaterEqual(len(keys), 4)
+
+    def test_resubmitted_optimisation_returns_the_same_scenario(self):
+        first = self._optimise(idempotency_key='k-optimise')
+        self.assertEqual(first.status_code, 302)
+        # Session, user, the key's sweep, the refused claim (in a savepoint here) and its read
+        with self.assertNumQueries(8):
+            again = self._optimise(idempotency_key='k-optimise')
+        self.assertEqual(again['Location'], first['Location'])
+        self.assertEqual(again['X-Carbomica-Replayed'], '1')
+        self.assertEqual(OptimizationScenario.objects.filter(name='Idempotent run').count(), 1)
+        # A new form (new key) is a new submission
+        self._optimise(idempotency_key='k-second')
+        self.assertEqual(OptimizationScenario.objects.filter(name='Idempotent run').count(), 2)
+
+    def test_replayed_upload_rewrites_nothing_and_repeats_its_messages(self):
+        first = self._upload(self.CSV)
+        self.assertIn('Imported 2 emission record(s) for Idempotent Hospital.', self._messages(first))
+        revision = Facility.objects.get(pk=self.facility.pk).revision
+        # No key: the file's content identifies the retry
+        again = self._upload(self.CSV)
+        self.assertEqual(again['X-Carbomica-Replayed'], '1')
+        self.assertIn('Imported 2 emission record(s) for Idempotent Hospital.', self._messages(again))
+        self.assertEqual(Facility.objects.get(pk=self.facility.pk).revision, revision)
+        # Different content is a different upload
+        changed = self._upload(self.CSV.replace(b'2000', b'2500'))
+        self.assertNotIn('X-Carbomica-Replayed', changed)
+        self.assertGreater(Facility.objects.get(pk=self.facility.pk).revision, revision)
+
+    def test_same_key_with_different_content_is_refused(self):
+        self._upload(self.CSV, idempotency_key='k-upload')
+        revision = Facility.objects.get(pk=self.facility.pk).revision
+        response = self._upload(self.CSV.replace(b'2000', b'2500'), idempotency_key='k-upload')
+        self.assertEqual(response['Location'], '/upload/emissions/')
+        self.assertIn('already submitted with different values', ' '.join(self._messages(response)))
+        self.assertEqual(Facility.objects.get(pk=self.facility.pk).revision, revision)
+
+    def test_same_file_from_a_new_form_is_not_imported_again(self):
+        first = self._upload(self.CSV, idempotency_key='k-form-1')
+        revision = Facility.objects.get(pk=self.facility.pk).revision
+        again = self._upload(self.CSV, idempotency_key='k-form-2')
+        self.assertEqual(again['Location'], first['Location'])
+        self.assertEqual(again['X-Carbomica-Replayed'], '1')
+        self.assertEqual(Facility.objects.get(pk=self.facility.pk).revision, revision)
+        # Outside the content window it is a new upload
+        from datetime import timedelta
+        from django.utils import timezone
+        from appname.models import SubmissionRecord
+        SubmissionRecord.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertNotIn('X-Carbomica-Replayed', self._upload(self.CSV, idempotency_key='k-form-3'))
+
+    def test_re_upload_after_a_detach_imports_again(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        name = Intervention.objects.order_by('id').first().display_name
+        csv_bytes = f'intervention_name,implementation_cost,annual_savings\n{name},1000,250\n'.encode()
+
+        def upload(key):
+            return self.client.post('/upload/interventions/', {
+                'facility': self.facility.id, 'idempotency_key': key,
+                'csv_file': SimpleUploadedFile('links.csv', csv_bytes, content_type='text/csv'),
+            })
+
+        upload('k-links-1')
+        self.assertEqual(upload('k-links-2')['X-Carbomica-Replayed'], '1')
+        self.client.post(f'/facilities/{self.facility.id}/interventions/detach-all/')
+        self.assertFalse(FacilityIntervention.objects.filter(facility=self.facility).exists())
+        again = upload('k-links-3')
+        self.assertNotIn('X-Carbomica-Replayed', again)
+        self.assertIn('Linked 1 intervention(s) to Idempotent Hospital.', self._messages(again))
+        self.assertEqual(FacilityIntervention.objects.filter(facility=self.facility).count(), 1)
+
+    def test_manual_entries_are_matched_on_their_key_only(self):
+        from appname.forms import EMISSION_FIELD_LABELS
+        entry = {
+            **dict.fromkeys(EMISSION_FIELD_LABELS, '0'),
+            'facility': self.facility.id, 'grid_electricity': '700',
+        }
+        manual = EmissionData.objects.filter(grid_electricity=Decimal('700'))
+        self.client.post('/upload/emissions/', {**entry, 'idempotency_key': 'k-manual-1'})
+        self.assertEqual(manual.count(), 1)
+        manual.delete()
+        response = self.client.post('/upload/emissions/', {**entry, 'idempotency_key': 'k-manual-2'})
+        self.assertNotIn('X-Carbomica-Replayed', response)
+        self.assertEqual(manual.count(), 1)
+
+    def test_expired_records_are_pruned_on_a_schedule(self):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        from appname.idempotency import PRUNE_KEY
+        from appname.models import SubmissionRecord
+        cache.delete(PRUNE_KEY)
+        self._optimise(idempotency_key='k-expiring')
+        SubmissionRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        other = User.objects.create_user('idem-other', password='pw')
+        SubmissionRecord.objects.create(
+            user=other, scope='optimize', key='old', request_hash='x',
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        # Swept already in this window: other users' expired rows stay for now,
+        # but an expired record never replays
+        again = self._optimise(idempotency_key='k-expiring')
+        self.assertNotIn('X-Carbomica-Replayed', again)
+        self.assertTrue(SubmissionRecord.objects.filter(user=other).exists())
+        cache.delete(PRUNE_KEY)
+        self._optimise(idempotency_key='k-next')
+        self.assertFalse(SubmissionRecord.objects.filter(user=other).exists())
+
+    def test_pending_and_failed_submissions(self):
+        from datetime import timedelta
+        from django.test import override_settings
+        from django.utils import timezone
+        from appname.models import SubmissionRecord
+        # An invalid form is re-rendered and releases its key
+        self.assertEqual(self._optimise(idempotency_key='k-bad', budget='', mode='budget').status_code, 200)
+        self.assertFalse(SubmissionRecord.objects.filter(key='k-bad').exists())
+        # A duplicate of a submission still running waits, then answers busy
+        self._upload(self.CSV, idempotency_key='k-pending')
+        record = SubmissionRecord.objects.get(key='k-pending')
+        SubmissionRecord.objects.filter(pk=record.pk).update(completed=False)
+        with override_settings(ADMISSION_QUEUE_SECONDS=0.1):
+            self.assertEqual(self._upload(self.CSV, idempotency_key='k-pending').status_code, 503)
+        # A claim left by a killed worker is taken over once past the lease
+        SubmissionRecord.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - timedelta(hours=1),
+        )
+        response = self._upload(self.CSV, idempotency_key='k-pending')
+        self.assertNotIn('X-Carbomica-Replayed', response)
+        self.assertTrue(SubmissionRecord.objects.get(key='k-pending').completed)
+
+
+class FrozenMigrationHelpersTest(TestCase):
+    """Data migrations carry their own copies of the helpers they were written against."""
+
+    def _migration(self, name):
+        from importlib import import_module
+        return import_module(f'appname.migrations.{name}')
+
+    def test_migrations_import_nothing_from_the_app(self):
+        from pathlib import Path
+        for path in Path(__file__).parent.joinpath('migrations').glob('0*.py'):
+            self.assertNotIn('from appname', path.read_text(), path.name)
+
+    def test_frozen_helpers_compute_the_figures_of_their_time(self):
+        from types import SimpleNamespace
+        record = SimpleNamespace(grid_electricity=Decimal('1000'), waste_management=Decimal('2'))
+        for name in ('0016_facility_latest_emission', '0019_platform_stats'):
+            tco2e_total = self._migration(name).tco2e_total
+            self.assertEqual(tco2e_total(record, 'ZA'), Decimal('1.862'), name)
+            self.assertEqual(tco2e_total(record, 'XX'), Decimal('1.334'), name)
+        financials = self._migration('0020_intervention_financials').intervention_financials
+        self.assertEqual(financials('1000', '0', '250'), {
+            'total_cost': Decimal('1000.00'), 'roi_pct': Decimal('25.00'),
+            'payback_years': Decimal('4.00'), 'npv': Decimal('677.52'),
+        })
+        self.assertEqual(financials('0', '0', '0', '12.5')['roi_pct'], Decimal('12.50'))
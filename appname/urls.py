@@ -1,11 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI (settings.ASYNC_VIEWS) the two query-heavy landing views run
+# their independent queries concurrently; the WSGI path keeps the sync ones.
+home, dashboard = (
+    (async_views.home, async_views.dashboard) if settings.ASYNC_VIEWS
+    else (views.home, views.dashboard)
+)
 
 urlpatterns = [
-    path('', views.home, name='home'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('', home, name='home'),
+    path('dashboard/', dashboard, name='dashboard'),
+    path('dashboard/charts/<slug:chart>/', views.dashboard_chart, name='dashboard_chart'),
     path('facilities/', views.facilities, name='facilities'),
     path('facilities/<int:facility_id>/', views.facility_detail, name='facility_detail'),
+    path('facilities/<int:facility_id>/history/', views.facility_emission_history,
+         name='facility_emission_history'),
+    path('facilities/<int:facility_id>/charts/<slug:chart>/',
+         views.facility_chart, name='facility_chart'),
     path('facilities/<int:facility_id>/interventions/<int:intervention_id>/attach/',
          views.attach_intervention, name='attach_intervention'),
     path('facilities/<int:facility_id>/interventions/<int:intervention_id>/detach/',
@@ -27,4 +40,21 @@ urlpatterns = [
     path('organisation/', views.my_organisation, name='my_organisation'),
     path('methodology/', views.methodology, name='methodology'),
     path('district-planning/', views.district_planning, name='district_planning'),
+    path('district-planning/chart/', views.district_chart, name='district_chart'),
+    path('export/<slug:dataset>.<slug:fmt>', views.export_data, name='export_data'),
+    # Read-only JSON API (versioned). Every response carries ETag/Last-Modified.
+    path('api/v1/facilities/', views.api_facilities, name='api_facilities'),
+    path('api/v1/facilities/<int:facility_id>/', views.api_facility, name='api_facility'),
+    path('api/v1/facilities/<int:facility_id>/emissions/',
+         views.api_facility_emissions, name='api_facility_emissions'),
+    path('api/v1/facilities/<int:facility_id>/interventions/',
+         views.api_facility_interventions, name='api_facility_interventions'),
+    path('api/v1/facilities/<int:facility_id>/scenarios/',
+         views.api_facility_scenarios, name='api_facility_scenarios'),
+    path('api/v1/scenarios/<int:scenario_id>/', views.api_scenario, name='api_scenario'),
+    # Staff-only Prometheus scrape target (appname.instrumentation histograms)
+    path('metrics/', views.metrics, name='metrics'),
+    # Container probes: liveness (no I/O) and readiness (DB + warm-up)
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
 ]
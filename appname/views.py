@@ -1,19 +1,34 @@
+import base64
 import csv
+import hashlib
 import io
 import json
+import operator
 from collections import defaultdict
+from functools import lru_cache, reduce, wraps
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db import transaction
-from django.db.models import Sum, F, Avg, Count
-from django.db.models.functions import TruncMonth
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum, F, Avg, Count, Q
+from django.db.models.functions import Coalesce, TruncMonth
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.middleware.csrf import get_token
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET, require_POST
 from decimal import Decimal, InvalidOperation
 from datetime import date
 
-from django.db.models import Q
 
 # Cost defaults for the 59 interventions, keyed by Intervention.code_name.
 # Sourced from CARBOMICA D3.7 Carbon Saving / Cost Saving calculators.
@@ -43,8 +58,23 @@ from .models import (
     FacilityIntervention,
     OptimizationScenario,
     OptimizationResult,
+    ScenarioSnapshot,
 )
 from .modeling import CarbomicaOptimizer, calculate_npv, compute_tco2e, sum_tco2e
+from .admission import expensive, shared_result
+from .idempotency import idempotent
+from .instrumentation import HISTOGRAMS
+from .warmup import STATE as WARMUP, retry_warm_up
+from .access import (
+    DASHBOARD_CACHE_TIMEOUT,
+    accessible_facilities,
+    accessible_facility_ids,
+    dashboard_cache_key,
+)
+from .signals import (
+    adjust_platform_stats, batched_facility_changes, facility_data_changed, library_version,
+)
+from .stats import emission_rows, platform_stats
 
 # ---------------------------------------------------------------------------
 # Shared constants
@@ -93,10 +123,11 @@ def _user_facilities(user):
     Return all Facility objects this user can access:
       - facilities they created directly, OR
       - facilities belonging to an organisation they are a member of.
+
+    Semi-joins the materialised FacilityAccess table rather than ORing the
+    ownership and membership joins together.
     """
-    return Facility.objects.filter(
-        Q(created_by=user) | Q(organisation__members=user)
-    ).distinct()
+    return accessible_facilities(user)
 
 
 def _aggregate_tco2e_all(user):
@@ -107,37 +138,130 @@ def _aggregate_tco2e_all(user):
       - monthly_tco2e:  [(date_obj, Decimal)] sorted ascending
       - total_tco2e:    Decimal
     """
-    user_facility_ids = _user_facilities(user).values_list('id', flat=True)
-    all_records = (
-        EmissionData.objects
-        .select_related('emission_source__facility')
-        .filter(emission_source__facility_id__in=user_facility_ids)
+    user_facility_ids = accessible_facility_ids(user)
+    # Streamed as plain value rows, so memory stays flat however many
+    # records the user's facilities hold
+    all_records = emission_rows(
+        EmissionData.objects.filter(emission_source__facility_id__in=user_facility_ids).order_by(),
+        'date',
     )
     category_tco2e = {f: Decimal('0') for f in EMISSION_FIELDS}
     facility_tco2e = defaultdict(Decimal)
     monthly_tco2e_map = defaultdict(Decimal)   # date → tCO₂e
     total_tco2e = Decimal('0')
 
-    for ed in all_records:
-        country = ed.emission_source.facility.country
-        tco2e = compute_tco2e(ed, country)
+    for row in all_records:
+        tco2e = compute_tco2e(row, row.emission_source__facility__country)
         for field in EMISSION_FIELDS:
             category_tco2e[field] += tco2e.get(field, Decimal('0'))
-        facility_tco2e[ed.emission_source.facility_id] += tco2e['total']
+        facility_tco2e[row.emission_source__facility_id] += tco2e['total']
         total_tco2e += tco2e['total']
-        if ed.date:
+        if row.date:
             # Group by year-month for the trend chart
-            month_key = date(ed.date.year, ed.date.month, 1)
+            month_key = date(row.date.year, row.date.month, 1)
             monthly_tco2e_map[month_key] += tco2e['total']
 
     monthly_tco2e = sorted(monthly_tco2e_map.items())  # [(date, Decimal), ...]
     return category_tco2e, dict(facility_tco2e), monthly_tco2e, total_tco2e
 
 
+def _source_breakdown(category_tco2e, total_tco2e):
+    """Non-zero emission categories, largest first, with % of total."""
+    return sorted(
+        [
+            {
+                'name': CATEGORY_LABELS.get(field, field),
+                'amount': amount,
+                'percentage': (amount / total_tco2e * 100) if total_tco2e > 0 else Decimal('0'),
+            }
+            for field, amount in category_tco2e.items()
+            if amount > 0
+        ],
+        key=lambda x: x['amount'],
+        reverse=True,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Home / landing
 # ---------------------------------------------------------------------------
 
+HOME_CALL_TO_ACTIONS = [
+    {
+        'title': 'Add a facility',
+        'description': 'Capture your site data and baseline emissions.',
+        'icon': 'hospital',
+        'url_name': 'add_facility',
+    },
+    {
+        'title': 'Review emissions',
+        'description': 'Track hotspots and progress from the dashboard.',
+        'icon': 'chart-line',
+        'url_name': 'dashboard',
+    },
+    {
+        'title': 'Plan interventions',
+        'description': 'Model ROI, SDG impact and policy alignment.',
+        'icon': 'tools',
+        'url_name': 'interventions',
+    },
+]
+
+
+def _home_queries(user):
+    """
+    The independent parts of the home context, as zero-argument callables
+    keyed by context name. Each one evaluates fully (lists, not lazy
+    querysets), so appname.async_views can run them concurrently in worker
+    threads; the sync view just calls them in turn.
+    """
+    if user.is_authenticated:
+        facility_ids = accessible_facility_ids(user)
+        facilities_qs = Facility.objects.filter(id__in=facility_ids)
+        interventions_qs = FacilityIntervention.objects.filter(facility_id__in=facility_ids)
+        scenarios_qs = OptimizationScenario.objects.filter(facility_id__in=facility_ids)
+        totals = {
+            'facility_count': facilities_qs.count,
+            # Per-facility totals are stored (Facility.emissions_tco2e), so
+            # this sums one column rather than converting every record
+            'total_emissions': lambda: (
+                facilities_qs.aggregate(total=Sum('emissions_tco2e'))['total'] or Decimal('0')
+            ),
+            'active_interventions': interventions_qs.filter(
+                intervention__status__in=Intervention.ACTIVE_STATUSES,
+            ).count,
+            'optimized_scenarios': scenarios_qs.filter(status='Optimized').count,
+        }
+    else:
+        # Platform-wide figures come from the PlatformStats row (one
+        # primary-key read, shared by the four parts) instead of scanning
+        # every tenant's tables on each visit.
+        facilities_qs = Facility.objects.all()
+        interventions_qs = FacilityIntervention.objects.all()
+        scenarios_qs = OptimizationScenario.objects.all()
+        stats = lru_cache(maxsize=None)(platform_stats)
+        totals = {
+            'facility_count': lambda: stats().facility_count,
+            'total_emissions': lambda: stats().total_tco2e,
+            'active_interventions': lambda: stats().active_interventions,
+            'optimized_scenarios': lambda: stats().optimized_scenarios,
+        }
+
+    return {
+        **totals,
+        'recent_facilities': lambda: list(facilities_qs.order_by('-id')[:3]),
+        'recent_scenarios': lambda: list(
+            scenarios_qs.select_related('facility').order_by('-created_at')[:3]
+        ),
+        'upcoming_interventions': lambda: list(
+            interventions_qs
+            .select_related('facility', 'intervention')
+            .filter(implementation_date__isnull=False)
+            .order_by('implementation_date')[:3]
+        ),
+    }
+
+
 def home(request):
     """Landing page — guides health managers into the CARBOMICA tool.
 
@@ -147,93 +271,11 @@ def home(request):
     total that included every other tenant's data — which silently
     contradicted the user-scoped dashboard and undermined trust.
     """
-    if request.user.is_authenticated:
-        facilities_qs = _user_facilities(request.user)
-        ed_qs = EmissionData.objects.select_related('emission_source__facility').filter(
-            emission_source__facility__in=facilities_qs
-        )
-        active_interventions = FacilityIntervention.objects.filter(
-            facility__in=facilities_qs,
-            intervention__status__in=['Planned', 'In Progress'],
-        ).count()
-        optimized_scenarios = OptimizationScenario.objects.filter(
-            facility__in=facilities_qs, status='Optimized',
-        ).count()
-        recent_facilities = facilities_qs.order_by('-id')[:3]
-        recent_scenarios = (
-            OptimizationScenario.objects
-            .select_related('facility')
-            .filter(facility__in=facilities_qs)
-            .order_by('-created_at')[:3]
-        )
-        upcoming_interventions = (
-            FacilityIntervention.objects
-            .select_related('facility', 'intervention')
-            .filter(facility__in=facilities_qs, implementation_date__isnull=False)
-            .order_by('implementation_date')[:3]
-        )
-        is_user_scope = True
-    else:
-        facilities_qs = Facility.objects.all()
-        ed_qs = EmissionData.objects.select_related('emission_source__facility').all()
-        active_interventions = FacilityIntervention.objects.filter(
-            intervention__status__in=['Planned', 'In Progress'],
-        ).count()
-        optimized_scenarios = OptimizationScenario.objects.filter(status='Optimized').count()
-        recent_facilities = Facility.objects.order_by('-id')[:3]
-        recent_scenarios = (
-            OptimizationScenario.objects.select_related('facility').order_by('-created_at')[:3]
-        )
-        upcoming_interventions = (
-            FacilityIntervention.objects
-            .select_related('facility', 'intervention')
-            .filter(implementation_date__isnull=False)
-            .order_by('implementation_date')[:3]
-        )
-        is_user_scope = False
-
-    facility_count = facilities_qs.count()
-    total_emissions = sum(
-        compute_tco2e(
-            ed,
-            country=ed.emission_source.facility.country
-            if ed.emission_source and ed.emission_source.facility else 'OTHER',
-        )['total']
-        for ed in ed_qs
-    ) or Decimal('0')
-
-    call_to_actions = [
-        {
-            'title': 'Add a facility',
-            'description': 'Capture your site data and baseline emissions.',
-            'icon': 'hospital',
-            'url_name': 'add_facility',
-        },
-        {
-            'title': 'Review emissions',
-            'description': 'Track hotspots and progress from the dashboard.',
-            'icon': 'chart-line',
-            'url_name': 'dashboard',
-        },
-        {
-            'title': 'Plan interventions',
-            'description': 'Model ROI, SDG impact and policy alignment.',
-            'icon': 'tools',
-            'url_name': 'interventions',
-        },
-    ]
-
-    context = {
-        'facility_count': facility_count,
-        'total_emissions': total_emissions,
-        'active_interventions': active_interventions,
-        'optimized_scenarios': optimized_scenarios,
-        'recent_facilities': recent_facilities,
-        'recent_scenarios': recent_scenarios,
-        'upcoming_interventions': upcoming_interventions,
-        'call_to_actions': call_to_actions,
-        'is_user_scope': is_user_scope,
-    }
+    context = {name: run() for name, run in _home_queries(request.user).items()}
+    context.update({
+        'call_to_actions': HOME_CALL_TO_ACTIONS,
+        'is_user_scope': request.user.is_authenticated,
+    })
     return render(request, 'appname/home.html', context)
 
 
@@ -241,105 +283,98 @@ def home(request):
 # Dashboard
 # ---------------------------------------------------------------------------
 
-@login_required
-def dashboard(request):
-    """Overview of facilities, emissions, and optimisation scenarios."""
-    facilities_qs = _user_facilities(request.user)
-
-    # Compute tCO₂e only for this user's facilities
-    category_tco2e, facility_tco2e, monthly_tco2e, total_tco2e = _aggregate_tco2e_all(request.user)
-
-    user_facility_ids = facilities_qs.values_list('id', flat=True)
-
-    # "Linked interventions" means linked, full stop — same semantics as
-    # the Facilities list and the Interventions portfolio page. The previous
-    # status='In Progress' filter made this column always zero in practice,
-    # because seeded interventions get status='Planned' and nothing
-    # transitions them automatically. See QA report 2026-05-24.
-    active_interventions = (
-        FacilityIntervention.objects.filter(facility_id__in=user_facility_ids).count()
-    )
-
-    # Match the Interventions portfolio (line ~417): total investment is
-    # implementation + maintenance, not implementation alone. Previously
-    # the Dashboard understated investment by the maintenance portion.
-    total_investment = (
-        FacilityIntervention.objects
-        .filter(facility_id__in=user_facility_ids)
-        .aggregate(total=Sum(F('implementation_cost') + F('maintenance_cost')))['total']
-        or Decimal('0')
-    )
-
-    optimization_scenarios = (
-        OptimizationScenario.objects
-        .select_related('facility')
-        .filter(facility_id__in=user_facility_ids)
-        .order_by('-created_at')
-    )
+def _dashboard_queries(user):
+    """
+    The independent queries behind the dashboard, as zero-argument callables
+    (see _home_queries). _assemble_dashboard turns their results into the
+    cacheable context.
+    """
+    user_facility_ids = accessible_facility_ids(user)
+    linked = FacilityIntervention.objects.filter(facility_id__in=user_facility_ids)
+    return {
+        # "Linked interventions" means linked, full stop — same semantics as
+        # the Facilities list and the Interventions portfolio page. The previous
+        # status='In Progress' filter made this column always zero in practice,
+        # because seeded interventions get status='Planned' and nothing
+        # transitions them automatically. See QA report 2026-05-24.
+        'active_interventions': linked.count,
+        # Match the Interventions portfolio (line ~417): total investment is
+        # implementation + maintenance, not implementation alone. Previously
+        # the Dashboard understated investment by the maintenance portion.
+        'total_investment': lambda: (
+            linked.aggregate(total=Sum(F('implementation_cost') + F('maintenance_cost')))['total']
+            or Decimal('0')
+        ),
+        'intervention_counts': lambda: {
+            row['facility_id']: row['count']
+            for row in linked
+            .filter(intervention__status='In Progress')
+            .values('facility_id')
+            .annotate(count=Count('id'))
+        },
+        # All-records tCO₂e is stored per facility (Facility.emissions_tco2e);
+        # the per-category and monthly splits are left to the chart endpoints
+        'facilities': lambda: list(
+            _user_facilities(user).values_list('id', 'display_name', 'emissions_tco2e')
+        ),
+        # Global stat for community momentum — shown as "X facilities registered globally".
+        # Cached with the rest, so it can lag other users' new facilities by
+        # up to DASHBOARD_CACHE_TIMEOUT.
+        'global_facility_count': Facility.objects.count,
+    }
 
-    # Per-category tCO₂e breakdown (replaces old source-name grouping)
-    source_breakdown = sorted(
-        [
-            {
-                'name': CATEGORY_LABELS.get(field, field),
-                'amount': amount,
-                'percentage': (amount / total_tco2e * 100) if total_tco2e > 0 else Decimal('0'),
-            }
-            for field, amount in category_tco2e.items()
-            if amount > 0
-        ],
-        key=lambda x: x['amount'],
-        reverse=True,
-    )
 
-    intervention_counts = {
-        row['facility_id']: row['count']
-        for row in FacilityIntervention.objects
-        .filter(facility_id__in=user_facility_ids, intervention__status='In Progress')
-        .values('facility_id')
-        .annotate(count=Count('id'))
-    }
+def _assemble_dashboard(results):
+    """Build the cacheable dashboard context (plain values only) from _dashboard_queries results."""
+    intervention_counts = results['intervention_counts']
     facility_emissions = sorted(
         [
             {
-                'id': f.id,
-                'name': f.display_name,
-                'emissions': facility_tco2e.get(f.id, Decimal('0')),
-                'interventions_count': intervention_counts.get(f.id, 0),
+                'id': facility_id,
+                'name': name,
+                'emissions': emissions,
+                'interventions_count': intervention_counts.get(facility_id, 0),
             }
-            for f in facilities_qs
+            for facility_id, name, emissions in results['facilities']
         ],
         key=lambda x: x['emissions'],
         reverse=True,
     )
+    return {
+        'facilities': facility_emissions,
+        'total_emissions': sum((row['emissions'] for row in facility_emissions), Decimal('0')),
+        'active_interventions': results['active_interventions'],
+        'total_investment': results['total_investment'],
+        'global_facility_count': results['global_facility_count'],
+    }
 
-    # Plotly chart payloads (tCO₂e values throughout)
-    source_chart_data = json.dumps({
-        'labels': [s['name'] for s in source_breakdown],
-        'values': [float(s['amount'] or 0) for s in source_breakdown],
-    })
-    top_facilities = facility_emissions[:5]
-    facility_chart_data = json.dumps({
-        'labels': [f['name'] for f in top_facilities],
-        'values': [float(f['emissions']) for f in top_facilities],
-    })
-    monthly_chart_data = json.dumps({
-        'labels': [d.strftime('%b %Y') for d, _ in monthly_tco2e],
-        'values': [float(v) for _, v in monthly_tco2e],
-    })
+
+def _dashboard_context(user):
+    """Assemble the cacheable part of the dashboard context (plain values only)."""
+    return _assemble_dashboard({name: run() for name, run in _dashboard_queries(user).items()})
+
+
+@login_required
+def dashboard(request):
+    """Overview of facilities, emissions, and optimisation scenarios."""
+    # The assembled context is cached per user and dropped by appname.signals
+    # when the user's facilities, their data, or the user's access change;
+    # the key moves on with the intervention library version.
+    key = dashboard_cache_key(request.user.pk)
+    context = cache.get(key)
+    if context is None:
+        context = _dashboard_context(request.user)
+        cache.set(key, context, DASHBOARD_CACHE_TIMEOUT)
 
     context = {
-        'facilities': facility_emissions,
-        'total_emissions': total_tco2e,
-        'active_interventions': active_interventions,
-        'total_investment': total_investment,
-        'source_breakdown': source_breakdown,
-        'optimization_scenarios': optimization_scenarios,
-        'source_chart_data': source_chart_data,
-        'facility_chart_data': facility_chart_data,
-        'monthly_chart_data': monthly_chart_data,
-        # Global stat for community momentum — shown as "X facilities registered globally"
-        'global_facility_count': Facility.objects.count(),
+        **context,
+        # Lazy: only hits the database if a template iterates it
+        'optimization_scenarios': (
+            OptimizationScenario.objects
+            .select_related('facility')
+            .filter(facility__in=_user_facilities(request.user))
+            .order_by('-created_at')
+        ),
     }
     return render(request, 'appname/dashboard.html', context)
 
@@ -352,17 +387,12 @@ def dashboard(request):
 def facilities(request):
     all_facilities = list(
         _user_facilities(request.user)
-        .prefetch_related('emission_sources__emission_data', 'facility_interventions')
+        .select_related('latest_emission')
+        .prefetch_related('facility_interventions')
     )
-    # Attach computed tCO₂e and latest date directly to each facility object
+    # latest_tco2e is stored on the facility; attach the latest date too
     for facility in all_facilities:
-        source = facility.emission_sources.first()
-        latest = None
-        if source:
-            latest = source.emission_data.order_by('-date').first()
-        facility.latest_tco2e = (
-            compute_tco2e(latest, facility.country)['total'] if latest else None
-        )
+        latest = facility.latest_emission
         facility.latest_date = latest.date if latest else None
         facility.has_emission_data = latest is not None
     return render(request, 'appname/facilities.html', {'facilities': all_facilities})
@@ -379,24 +409,36 @@ def _seed_facility_interventions(facility):
     existing (facility, intervention) pair are skipped because of the
     unique constraint added in migration 0011.
     """
-    before = FacilityIntervention.objects.filter(facility=facility).count()
+    links = FacilityIntervention.objects.filter(facility=facility)
+    link_counts = {
+        'total': Count('id'),
+        'active': Count('id', filter=Q(intervention__status__in=Intervention.ACTIVE_STATUSES)),
+    }
+    before = links.aggregate(**link_counts)
     rows = []
     for intervention in Intervention.objects.all():
         costs, source = _intervention_default_costs(intervention)
-        rows.append(FacilityIntervention(
+        link = FacilityIntervention(
             facility=facility,
             intervention=intervention,
             implementation_cost=Decimal(costs['impl']),
             maintenance_cost=Decimal(costs['maint']),
             annual_savings=Decimal(costs['savings']),
             cost_source=source,
-        ))
+        )
+        link.refresh_financials()  # bulk_create skips save()
+        rows.append(link)
     # bulk_create(ignore_conflicts=True) returns the input list regardless of
     # how many rows actually hit the table, so query before/after for the
     # accurate count rather than trusting len(created).
     FacilityIntervention.objects.bulk_create(rows, ignore_conflicts=True)
-    after = FacilityIntervention.objects.filter(facility=facility).count()
-    inserted = after - before
+    after = links.aggregate(**link_counts)
+    inserted = after['total'] - before['total']
+    if inserted:
+        # bulk_create bypasses post_save, so bump the revision and the
+        # platform's active-intervention count ourselves.
+        facility_data_changed([facility.id])
+        adjust_platform_stats(active_interventions=after['active'] - before['active'])
     return inserted, len(rows) - inserted
 
 
@@ -529,7 +571,8 @@ def bulk_detach_interventions(request, facility_id):
     subset rather than pare down from the full library.
     """
     facility = get_object_or_404(_user_facilities(request.user), id=facility_id)
-    deleted, _ = FacilityIntervention.objects.filter(facility=facility).delete()
+    with batched_facility_changes():
+        deleted, _ = FacilityIntervention.objects.filter(facility=facility).delete()
     if deleted:
         messages.success(
             request,
@@ -565,7 +608,8 @@ def delete_facility(request, facility_id):
         return redirect('facility_detail', facility_id=facility.id)
 
     name = facility.display_name
-    _, per_model = facility.delete()
+    with batched_facility_changes():
+        _, per_model = facility.delete()
     n_records = per_model.get('appname.EmissionData', 0)
     n_links = per_model.get('appname.FacilityIntervention', 0)
     n_scenarios = per_model.get('appname.OptimizationScenario', 0)
@@ -583,7 +627,7 @@ def delete_facility(request, facility_id):
 def delete_scenario(request, scenario_id):
     """Delete a single optimisation scenario (and its persisted results).
     Re-running is cheap — scenarios are snapshots, not source data."""
-    user_facility_ids = _user_facilities(request.user).values_list('id', flat=True)
+    user_facility_ids = accessible_facility_ids(request.user)
     scenario = get_object_or_404(
         OptimizationScenario, id=scenario_id, facility_id__in=user_facility_ids,
     )
@@ -651,24 +695,92 @@ def add_facility(request):
 # Interventions portfolio
 # ---------------------------------------------------------------------------
 
+# Cards per page of the interventions portfolio
+INTERVENTIONS_PAGE_SIZE = 50
+
+# ?sort= choices: label and the full ordering, ending in a unique column so
+# every row has exactly one position for the keyset cursor
+INTERVENTION_SORTS = {
+    'facility': ('Facility', ('facility__display_name', 'intervention__display_name', 'id')),
+    'status': ('Status', ('intervention__status', 'facility__display_name', 'intervention__display_name', 'id')),
+    'roi': ('ROI (highest first)', ('-roi_pct', 'id')),
+    'npv': ('NPV (highest first)', ('-npv', 'id')),
+}
+
+
+def _keyset_after(ordering, values):
+    """Q for the rows strictly after `values` in `ordering` (e.g. ('-npv', 'id'))."""
+    clauses, equal = [], Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        clauses.append(equal & Q(**{f'{name}__{"lt" if field.startswith("-") else "gt"}': value}))
+        equal &= Q(**{name: value})
+    return reduce(operator.or_, clauses)
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def _ordering_fields(model, ordering):
+    """The model field behind each entry of `ordering`, following relations."""
+    fields = []
+    for path in ordering:
+        *relations, name = path.lstrip('-').split('__')
+        opts = model._meta
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        fields.append(opts.get_field(name))
+    return fields
+
+
+def _decode_cursor(raw, fields):
+    """
+    The values of an _encode_cursor string, converted to the type of the
+    matching field in `fields`; None if it is malformed or a value does not
+    fit its field (a hand-edited ?after= must not reach the query).
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(raw.encode()))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except ValidationError:
+        return None
+    return None if any(value is None for value in values) else values
+
+
 @login_required
 def interventions(request):
-    """Portfolio view — all facility interventions with financial and SDG metrics."""
-    user_facility_ids = _user_facilities(request.user).values_list('id', flat=True)
-    qs = (
-        FacilityIntervention.objects
-        .select_related('facility', 'intervention')
-        .filter(facility_id__in=user_facility_ids)
-        .order_by('facility__display_name', 'intervention__display_name')
-    )
+    """
+    Portfolio view — the facility interventions the user can access, with
+    financial and SDG metrics. Filtered by facility and status and sorted
+    in the database on the metrics stored on each link, one keyset page of
+    cards at a time (?after= is the previous page's last position); the
+    summary figures are aggregates over the whole filtered set.
+    """
+    user_facility_ids = accessible_facility_ids(request.user)
+    sort = request.GET.get('sort') if request.GET.get('sort') in INTERVENTION_SORTS else 'facility'
+    ordering = INTERVENTION_SORTS[sort][1]
+    qs = FacilityIntervention.objects.filter(facility_id__in=user_facility_ids)
+
+    facility_filter = request.GET.get('facility', '')
+    if facility_filter.isdigit():
+        qs = qs.filter(facility_id=int(facility_filter))
+    status_filter = request.GET.get('status', '')
+    if status_filter:
+        qs = qs.filter(intervention__status=status_filter)
 
     aggregates = qs.aggregate(
+        count=Count('id'),
         total_annual_savings=Sum('annual_savings'),
-        total_investment=Sum(F('implementation_cost') + F('maintenance_cost')),
-        average_roi=Avg('roi'),
+        total_investment=Sum('total_cost'),
+        average_roi=Avg('roi_pct'),
     )
-
-    total_count = qs.count()
+    total_count = aggregates['count']
 
     # CRITICAL: .order_by() must be cleared BEFORE .values().annotate() — Django
     # otherwise appends the inherited order_by columns to the GROUP BY clause,
@@ -681,16 +793,23 @@ def interventions(request):
         .annotate(count=Count('id'))
     )
 
+    page_qs = qs.select_related('facility', 'intervention').order_by(*ordering)
+    after = request.GET.get('after', '')
+    cursor = _decode_cursor(after, _ordering_fields(FacilityIntervention, ordering)) if after else None
+    if cursor is not None:
+        page_qs = page_qs.filter(_keyset_after(ordering, cursor))
+    page = list(page_qs[:INTERVENTIONS_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(page) > INTERVENTIONS_PAGE_SIZE:
+        page = page[:INTERVENTIONS_PAGE_SIZE]
+        last = page[-1]
+        next_cursor = _encode_cursor([
+            reduce(getattr, field.lstrip('-').split('__'), last) for field in ordering
+        ])
+
     cards = []
-    for record in qs:
-        impl_cost = record.implementation_cost or Decimal('0')
-        maint_cost = record.maintenance_cost or Decimal('0')
-        total_cost = impl_cost + maint_cost
+    for record in page:
         annual_savings = record.annual_savings or Decimal('0')
-        payback_years = (total_cost / annual_savings) if annual_savings > 0 else None
-        roi_value = record.calculate_roi()
-        npv_value = calculate_npv(annual_savings, impl_cost) if annual_savings else None
-
         cards.append({
             'id': record.id,
             'name': record.intervention.display_name,
@@ -700,13 +819,13 @@ def interventions(request):
             'implementation_date': record.implementation_date,
             'sdg_goals': record.intervention.sdg_goals,
             'financial': {
-                'implementation_cost': impl_cost,
-                'maintenance_cost': maint_cost,
+                'implementation_cost': record.implementation_cost or Decimal('0'),
+                'maintenance_cost': record.maintenance_cost or Decimal('0'),
                 'annual_savings': annual_savings,
-                'total_cost': total_cost,
-                'roi': roi_value,
-                'payback_years': payback_years,
-                'npv': npv_value,
+                'total_cost': record.total_cost,
+                'roi': record.roi_pct,
+                'payback_years': record.payback_years,
+                'npv': record.npv if annual_savings else None,
             },
             'environmental': {
                 'expected_reduction_pct': record.intervention.emission_reduction_percentage,
@@ -738,68 +857,118 @@ def interventions(request):
         for entry in status_qs
     ]
 
+    filters = {'sort': sort, 'facility': facility_filter, 'status': status_filter}
     return render(request, 'appname/interventions.html', {
         'intervention_cards': cards,
         'summary': summary,
         'status_breakdown': status_breakdown,
+        'filters': filters,
+        'sort_choices': [(key, label) for key, (label, _) in INTERVENTION_SORTS.items()],
+        'status_choices': Intervention._meta.get_field('status').choices,
+        'facility_choices': (
+            Facility.objects.filter(id__in=user_facility_ids)
+            .order_by('display_name').values_list('id', 'display_name')
+        ),
+        'is_first_page': cursor is None,
+        'next_page_query': urlencode({**filters, 'after': next_cursor}) if next_cursor else None,
+        'first_page_query': urlencode(filters),
     })
 
 
-def _facility_rollup(facility):
+def _district_rollup(facilities):
     """
-    Compute district-planning roll-up metrics for one facility:
+    Compute district-planning roll-up rows for many facilities at once:
       baseline tCO₂e (latest record), category-aware potential reduction
       (capped at each category's baseline so stacked interventions can't
       reduce a slice below zero), total investment, and intervention count.
-    Returns a dict; baseline/reduction are Decimal tCO₂e.
-    """
-    latest = (
-        EmissionData.objects
-        .filter(emission_source__facility=facility)
-        .order_by('-date')
-        .first()
-    )
-    cat = compute_tco2e(latest, facility.country) if latest else {}
-    baseline = cat.get('total', Decimal('0'))
 
-    # Sum each intervention's reduction into its target category, then cap
-    # each category's total reduction at that category's baseline.
-    reduction_by_cat = defaultdict(Decimal)
-    fis = list(
+    Baselines come from the stored Facility.latest_emission pointer (select it
+    with select_related). Intervention links are grouped by facility and
+    target_category in one aggregate query, so the reduction for a category
+    is (Σ pct of the links targeting it) × that category's baseline — the
+    same sum the per-link loop used to build. Returns one dict per facility
+    in input order; baseline/reduction are Decimal tCO₂e.
+    """
+    facilities = list(facilities)
+    links = defaultdict(list)
+    for row in (
         FacilityIntervention.objects
-        .select_related('intervention')
-        .filter(facility=facility)
-    )
-    investment = Decimal('0')
-    for fi in fis:
-        investment += (fi.implementation_cost or Decimal('0')) + (fi.maintenance_cost or Decimal('0'))
-        pct = fi.intervention.emission_reduction_percentage or Decimal('0')
-        targets = (fi.intervention.target_category or '').split(',')
-        for t in targets:
-            t = t.strip()
-            if t:
-                reduction_by_cat[t] += (pct / 100) * Decimal(str(cat.get(t, 0)))
-
-    potential = Decimal('0')
-    for t, red in reduction_by_cat.items():
-        potential += min(red, Decimal(str(cat.get(t, 0))))
+        .filter(facility__in=[f.id for f in facilities])
+        .values('facility_id', 'intervention__target_category')
+        .annotate(
+            pct=Sum(Coalesce('intervention__emission_reduction_percentage', Decimal('0'))),
+            investment=Sum(
+                Coalesce('implementation_cost', Decimal('0'))
+                + Coalesce('maintenance_cost', Decimal('0'))
+            ),
+            n=Count('id'),
+        )
+    ):
+        links[row['facility_id']].append(row)
+
+    targets_for = {}    # target_category string → parsed category list
+    rows = []
+    for facility in facilities:
+        latest = facility.latest_emission
+        cat = compute_tco2e(latest, facility.country) if latest else {}
+        baseline = cat.get('total', Decimal('0'))
+
+        # Sum reduction percentages into each target category, then cap each
+        # category's total reduction at that category's baseline.
+        pct_by_cat = defaultdict(Decimal)
+        investment = Decimal('0')
+        n_interventions = 0
+        for link in links.get(facility.id, ()):
+            investment += link['investment'] or Decimal('0')
+            n_interventions += link['n']
+            raw = link['intervention__target_category'] or ''
+            if raw not in targets_for:
+                targets_for[raw] = [t.strip() for t in raw.split(',') if t.strip()]
+            for t in targets_for[raw]:
+                pct_by_cat[t] += link['pct'] or Decimal('0')
+
+        potential = Decimal('0')
+        for t, pct in pct_by_cat.items():
+            cat_baseline = Decimal(str(cat.get(t, 0)))
+            potential += min(pct / 100 * cat_baseline, cat_baseline)
+
+        rows.append({
+            'id': facility.id,
+            'name': facility.display_name,
+            'country': facility.get_country_display(),
+            'country_code': facility.country,
+            'facility_type': facility.get_facility_type_display(),
+            'baseline': baseline,
+            'potential_reduction': potential,
+            'reduction_pct': (potential / baseline * 100) if baseline > 0 else Decimal('0'),
+            'investment': investment,
+            'n_interventions': n_interventions,
+            'has_data': latest is not None,
+        })
+    return rows
 
-    return {
-        'id': facility.id,
-        'name': facility.display_name,
-        'country': facility.get_country_display(),
-        'country_code': facility.country,
-        'facility_type': facility.get_facility_type_display(),
-        'baseline': baseline,
-        'potential_reduction': potential,
-        'reduction_pct': (potential / baseline * 100) if baseline > 0 else Decimal('0'),
-        'investment': investment,
-        'n_interventions': len(fis),
-        'has_data': latest is not None,
-    }
+
+def _district_rows(user, versions=None):
+    """
+    Roll-up rows for every accessible facility, largest baseline first.
+    Computed once per access set and data revision, and shared by the
+    district page and its chart.
+    """
+    def build():
+        rows = _district_rollup(
+            _user_facilities(user).select_related('latest_emission').order_by('display_name')
+        )
+        rows.sort(key=lambda r: r['baseline'], reverse=True)
+        return rows
+
+    etag, _ = _facility_validators(
+        _access_versions(user) if versions is None else versions, 'district-rows',
+    )
+    return shared_result(f'carbomica:district:{etag}', build, CHART_CACHE_TIMEOUT)
 
 
 @login_required
+@expensive('analysis')
 def district_planning(request):
     """
     District-level roll-up across all facilities the user can access. Ranks
@@ -808,9 +977,7 @@ def district_planning(request):
     country. Built for district health officers prioritising where carbon
     investment delivers the most tCO₂e per dollar across a portfolio.
     """
-    facilities = list(_user_facilities(request.user).order_by('display_name'))
-    rows = [_facility_rollup(f) for f in facilities]
-    rows.sort(key=lambda r: r['baseline'], reverse=True)
+    rows = _district_rows(request.user)
 
     totals = {
         'facilities': len(rows),
@@ -842,17 +1009,10 @@ def district_planning(request):
         key=lambda x: x['baseline'], reverse=True,
     )
 
-    chart_data = json.dumps({
-        'labels': [r['name'] for r in rows[:10]],
-        'baseline': [float(r['baseline']) for r in rows[:10]],
-        'reduction': [float(r['potential_reduction']) for r in rows[:10]],
-    })
-
     return render(request, 'appname/district_planning.html', {
         'rows': rows,
         'totals': totals,
         'country_rows': country_rows,
-        'chart_data': chart_data,
     })
 
 
@@ -985,6 +1145,8 @@ def methodology(request):
 # ---------------------------------------------------------------------------
 
 @login_required
+@idempotent('optimize')
+@expensive('analysis', methods=('POST',))
 def optimize_interventions(request, facility_id):
     """
     Run CARBOMICA's three-scenario optimisation for a facility:
@@ -999,12 +1161,7 @@ def optimize_interventions(request, facility_id):
         # has a real baseline to compare against. Without `instance=`, every
         # field looks "changed" (empty initial vs populated POST), which is
         # what caused the silent doubling bug.
-        latest_emission_for_diff = (
-            EmissionData.objects
-            .filter(emission_source__facility=facility)
-            .order_by('-date')
-            .first()
-        )
+        latest_emission_for_diff = facility.latest_emission
         scenario_form = OptimizationScenarioForm(request.POST)
         emission_form = EmissionDataUpdateForm(request.POST, instance=latest_emission_for_diff)
 
@@ -1025,11 +1182,15 @@ def optimize_interventions(request, facility_id):
                 )
 
             # Baseline in tCO₂e — convert raw usage using country-specific factors
-            emission_records = EmissionData.objects.filter(emission_source__facility=facility)
+            emission_records = emission_rows(
+                EmissionData.objects.filter(emission_source__facility=facility).order_by()
+            )
             baseline = sum_tco2e(emission_records, facility.country)
 
             # Per-category baseline for accurate intervention reduction calculation
-            latest_ed = emission_records.order_by('-date').first()
+            # (reloaded: the snapshot above may have moved the pointer)
+            facility.refresh_from_db(fields=['latest_emission'])
+            latest_ed = facility.latest_emission
             category_baselines = {}
             if latest_ed:
                 cat = compute_tco2e(latest_ed, facility.country)
@@ -1053,41 +1214,45 @@ def optimize_interventions(request, facility_id):
             )
             scenarios = optimizer.run_all_scenarios()
 
-            # Persist the optimised results for the results view
+            # Persist the optimised ranking, plus a compressed snapshot of all
+            # three scenarios and their inputs for the results view
             OptimizationResult.objects.filter(scenario=scenario).delete()
-            for rank, item in enumerate(scenarios['optimised']['results'], start=1):
-                intervention_obj = Intervention.objects.filter(
-                    display_name=item['intervention_name']
-                ).first()
-                if intervention_obj:
-                    OptimizationResult.objects.create(
-                        scenario=scenario,
-                        intervention=intervention_obj,
-                        priority=rank,
-                        expected_roi=item['roi'] or Decimal('0'),
-                        emission_reduction=item['emission_reduction'],
-                        implementation_cost=item['cost'],
-                        annual_savings=item['annual_savings'],
-                        payback_months=int(item['payback_years'] * 12)
-                        if item['payback_years']
-                        else 0,
-                    )
+            OptimizationResult.objects.bulk_create([
+                OptimizationResult(
+                    scenario=scenario,
+                    intervention_id=item['intervention_id'],
+                    priority=rank,
+                    expected_roi=item['roi'] or Decimal('0'),
+                    emission_reduction=item['emission_reduction'],
+                    implementation_cost=item['cost'],
+                    annual_savings=item['annual_savings'],
+                    payback_months=int(item['payback_years'] * 12)
+                    if item['payback_years']
+                    else 0,
+                )
+                for rank, item in enumerate(scenarios['optimised']['results'], start=1)
+            ])
+            ScenarioSnapshot.objects.update_or_create(
+                scenario=scenario,
+                defaults={'payload': ScenarioSnapshot.encode(_serialise_scenarios({
+                    'scenarios': scenarios,
+                    'inputs': {
+                        'baseline': baseline,
+                        'category_baselines': category_baselines,
+                        'budget': scenario.budget,
+                        'target_reduction': scenario.target_reduction,
+                    },
+                }))},
+            )
 
             scenario.status = 'Optimized'
             scenario.save()
 
-            # Store all three scenarios in session for the results view
-            request.session[f'scenarios_{scenario.id}'] = _serialise_scenarios(scenarios)
             return redirect('optimization_results', scenario_id=scenario.id)
 
     else:
         scenario_form = OptimizationScenarioForm()
-        latest_emission = (
-            EmissionData.objects
-            .filter(emission_source__facility=facility)
-            .order_by('-date')
-            .first()
-        )
+        latest_emission = facility.latest_emission
         emission_form = (
             EmissionDataUpdateForm(instance=latest_emission)
             if latest_emission
@@ -1102,7 +1267,7 @@ def optimize_interventions(request, facility_id):
 
 
 def _serialise_scenarios(scenarios):
-    """Convert Decimal values to float so the dict is JSON-serialisable for the session."""
+    """Convert Decimal values to float so the dict is JSON-serialisable."""
     def _fix(obj):
         if isinstance(obj, Decimal):
             return float(obj)
@@ -1116,14 +1281,28 @@ def _serialise_scenarios(scenarios):
 
 @login_required
 def optimization_results(request, scenario_id):
-    user_facility_ids = _user_facilities(request.user).values_list('id', flat=True)
-    scenario = get_object_or_404(OptimizationScenario, id=scenario_id, facility_id__in=user_facility_ids)
+    user_facility_ids = accessible_facility_ids(request.user)
+    scenario = get_object_or_404(
+        OptimizationScenario.objects.select_related('facility'),
+        id=scenario_id, facility_id__in=user_facility_ids,
+    )
+    # Saving or deleting a scenario bumps its facility's revision; an
+    # unchanged one answers 304 before the snapshot is loaded
+    return _conditional_page(
+        request, scenario.facility, lambda: _render_optimization_results(request, scenario),
+        namespace=f'scenario-{scenario.id}',
+    )
+
 
-    # Try to load the live three-scenario data from session
-    session_key = f'scenarios_{scenario.id}'
-    scenarios = request.session.get(session_key)
+def _render_optimization_results(request, scenario):
+    # All three scenarios come from the snapshot written by optimize_interventions
+    try:
+        scenarios = scenario.snapshot.data['scenarios']
+    except ScenarioSnapshot.DoesNotExist:
+        scenarios = None
 
-    # Fall back to the persisted OptimizationResult rows if session expired
+    # Scenarios optimised before snapshots existed: rebuild the optimised
+    # ranking from the persisted OptimizationResult rows
     if not scenarios:
         results = list(
             scenario.results.select_related('intervention').order_by('priority')
@@ -1203,6 +1382,7 @@ def _match_column(header):
 
 
 @login_required
+@idempotent('upload_emissions', by_content=True)
 def upload_emissions(request):
     """
     Upload emission data for a facility via CSV or manual form entry.
@@ -1232,30 +1412,31 @@ def upload_emissions(request):
                 rows_saved = 0
                 errors = []
 
-                for row_num, row in enumerate(reader, start=2):
-                    record_date = row.get('date', '').strip() or str(date.today())
-                    try:
-                        parsed_date = date.fromisoformat(record_date)
-                    except ValueError:
-                        errors.append(f'Row {row_num}: invalid date "{record_date}" — use YYYY-MM-DD.')
-                        continue
-
-                    kwargs = {'emission_source': emission_source, 'date': parsed_date}
-                    for header, value in row.items():
-                        field = _match_column(header or '')
-                        if field:
-                            try:
-                                kwargs[field] = Decimal(value.strip() or '0')
-                            except InvalidOperation:
-                                kwargs[field] = Decimal('0')
-
-                    EmissionData.objects.update_or_create(
-                        emission_source=emission_source,
-                        date=parsed_date,
-                        defaults={k: v for k, v in kwargs.items()
-                                  if k not in ('emission_source', 'date')},
-                    )
-                    rows_saved += 1
+                with batched_facility_changes():
+                    for row_num, row in enumerate(reader, start=2):
+                        record_date = row.get('date', '').strip() or str(date.today())
+                        try:
+                            parsed_date = date.fromisoformat(record_date)
+                        except ValueError:
+                            errors.append(f'Row {row_num}: invalid date "{record_date}" — use YYYY-MM-DD.')
+                            continue
+
+                        kwargs = {'emission_source': emission_source, 'date': parsed_date}
+                        for header, value in row.items():
+                            field = _match_column(header or '')
+                            if field:
+                                try:
+                                    kwargs[field] = Decimal(value.strip() or '0')
+                                except InvalidOperation:
+                                    kwargs[field] = Decimal('0')
+
+                        EmissionData.objects.update_or_create(
+                            emission_source=emission_source,
+                            date=parsed_date,
+                            defaults={k: v for k, v in kwargs.items()
+                                      if k not in ('emission_source', 'date')},
+                        )
+                        rows_saved += 1
 
                 if errors:
                     for e in errors:
@@ -1303,6 +1484,7 @@ def upload_emissions(request):
 
 
 @login_required
+@idempotent('upload_interventions', by_content=True)
 def upload_interventions(request):
     """
     Attach interventions to a facility with site-specific costs via form or CSV.
@@ -1354,45 +1536,46 @@ def upload_interventions(request):
                 reader = csv.DictReader(io.StringIO(decoded))
                 rows_saved, errors = 0, []
 
-                for row_num, row in enumerate(reader, start=2):
-                    name = (row.get('intervention_name') or row.get('intervention', '')).strip()
-                    intervention = Intervention.objects.filter(
-                        display_name__iexact=name
-                    ).first()
-                    if not intervention:
-                        errors.append(
-                            f'Row {row_num}: intervention "{name}" not found — '
-                            'create it in the admin or check spelling.'
-                        )
-                        continue
-
-                    def _dec(key):
-                        try:
-                            return Decimal(str(row.get(key, '0')).strip() or '0')
-                        except InvalidOperation:
-                            return Decimal('0')
+                with batched_facility_changes():
+                    for row_num, row in enumerate(reader, start=2):
+                        name = (row.get('intervention_name') or row.get('intervention', '')).strip()
+                        intervention = Intervention.objects.filter(
+                            display_name__iexact=name
+                        ).first()
+                        if not intervention:
+                            errors.append(
+                                f'Row {row_num}: intervention "{name}" not found — '
+                                'create it in the admin or check spelling.'
+                            )
+                            continue
+
+                        def _dec(key):
+                            try:
+                                return Decimal(str(row.get(key, '0')).strip() or '0')
+                            except InvalidOperation:
+                                return Decimal('0')
 
-                    impl_date_str = (row.get('implementation_date') or '').strip()
-                    impl_date = None
-                    if impl_date_str:
-                        try:
-                            impl_date = date.fromisoformat(impl_date_str)
-                        except ValueError:
-                            errors.append(f'Row {row_num}: invalid date "{impl_date_str}".')
-
-                    fi, _ = FacilityIntervention.objects.update_or_create(
-                        facility=facility,
-                        intervention=intervention,
-                        defaults={
-                            'implementation_cost': _dec('implementation_cost'),
-                            'maintenance_cost': _dec('maintenance_cost'),
-                            'annual_savings': _dec('annual_savings'),
-                            'implementation_date': impl_date,
-                        },
-                    )
-                    fi.roi = fi.calculate_roi()
-                    fi.save(update_fields=['roi'])
-                    rows_saved += 1
+                        impl_date_str = (row.get('implementation_date') or '').strip()
+                        impl_date = None
+                        if impl_date_str:
+                            try:
+                                impl_date = date.fromisoformat(impl_date_str)
+                            except ValueError:
+                                errors.append(f'Row {row_num}: invalid date "{impl_date_str}".')
+
+                        fi, _ = FacilityIntervention.objects.update_or_create(
+                            facility=facility,
+                            intervention=intervention,
+                            defaults={
+                                'implementation_cost': _dec('implementation_cost'),
+                                'maintenance_cost': _dec('maintenance_cost'),
+                                'annual_savings': _dec('annual_savings'),
+                                'implementation_date': impl_date,
+                            },
+                        )
+                        fi.roi = fi.calculate_roi()
+                        fi.save(update_fields=['roi'])
+                        rows_saved += 1
 
                 for e in errors:
                     messages.warning(request, e)
@@ -1474,56 +1657,59 @@ def my_organisation(request):
     if request.method == 'POST':
         action = request.POST.get('action')
 
-        # ── Create a new organisation ──────────────────────────────────
-        if action == 'create':
-            name = request.POST.get('org_name', '').strip()
-            if name:
-                org = Organisation.objects.create(name=name, created_by=request.user)
-                org.members.add(request.user)
-                messages.success(request, f'Organisation "{name}" created.')
-            else:
-                messages.error(request, 'Please enter an organisation name.')
+        # Membership and facility edits resync FacilityAccess from signals;
+        # keep each action and its access rows in one transaction.
+        with transaction.atomic():
+            # ── Create a new organisation ──────────────────────────────────
+            if action == 'create':
+                name = request.POST.get('org_name', '').strip()
+                if name:
+                    org = Organisation.objects.create(name=name, created_by=request.user)
+                    org.members.add(request.user)
+                    messages.success(request, f'Organisation "{name}" created.')
+                else:
+                    messages.error(request, 'Please enter an organisation name.')
 
-        # ── Add a member by email ──────────────────────────────────────
-        elif action == 'add_member':
-            org_id = request.POST.get('org_id')
-            email = request.POST.get('email', '').strip().lower()
-            org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
-            try:
-                new_member = AuthUser.objects.get(email__iexact=email)
-                org.members.add(new_member)
-                messages.success(request, f'{email} added to {org.name}.')
-            except AuthUser.DoesNotExist:
-                messages.error(request, f'No user with email {email}. They must sign in with Google first.')
-
-        # ── Remove a member ────────────────────────────────────────────
-        elif action == 'remove_member':
-            org_id = request.POST.get('org_id')
-            user_id = request.POST.get('user_id')
-            org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
-            if str(request.user.id) != user_id:  # can't remove yourself as owner
-                org.members.remove(user_id)
-                messages.success(request, 'Member removed.')
-
-        # ── Assign a facility to an org ────────────────────────────────
-        elif action == 'assign_facility':
-            org_id = request.POST.get('org_id')
-            facility_id = request.POST.get('facility_id')
-            org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
-            facility = get_object_or_404(Facility, id=facility_id, created_by=request.user)
-            facility.organisation = org
-            facility.save(update_fields=['organisation'])
-            messages.success(request, f'{facility.display_name} assigned to {org.name}.')
-
-        # ── Remove a facility from an org ──────────────────────────────
-        elif action == 'unassign_facility':
-            org_id = request.POST.get('org_id')
-            facility_id = request.POST.get('facility_id')
-            org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
-            facility = get_object_or_404(Facility, id=facility_id, organisation=org)
-            facility.organisation = None
-            facility.save(update_fields=['organisation'])
-            messages.success(request, f'{facility.display_name} removed from {org.name}.')
+            # ── Add a member by email ──────────────────────────────────────
+            elif action == 'add_member':
+                org_id = request.POST.get('org_id')
+                email = request.POST.get('email', '').strip().lower()
+                org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
+                try:
+                    new_member = AuthUser.objects.get(email__iexact=email)
+                    org.members.add(new_member)
+                    messages.success(request, f'{email} added to {org.name}.')
+                except AuthUser.DoesNotExist:
+                    messages.error(request, f'No user with email {email}. They must sign in with Google first.')
+
+            # ── Remove a member ────────────────────────────────────────────
+            elif action == 'remove_member':
+                org_id = request.POST.get('org_id')
+                user_id = request.POST.get('user_id')
+                org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
+                if str(request.user.id) != user_id:  # can't remove yourself as owner
+                    org.members.remove(user_id)
+                    messages.success(request, 'Member removed.')
+
+            # ── Assign a facility to an org ────────────────────────────────
+            elif action == 'assign_facility':
+                org_id = request.POST.get('org_id')
+                facility_id = request.POST.get('facility_id')
+                org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
+                facility = get_object_or_404(Facility, id=facility_id, created_by=request.user)
+                facility.organisation = org
+                facility.save(update_fields=['organisation'])
+                messages.success(request, f'{facility.display_name} assigned to {org.name}.')
+
+            # ── Remove a facility from an org ──────────────────────────────
+            elif action == 'unassign_facility':
+                org_id = request.POST.get('org_id')
+                facility_id = request.POST.get('facility_id')
+                org = get_object_or_404(Organisation, id=org_id, created_by=request.user)
+                facility = get_object_or_404(Facility, id=facility_id, organisation=org)
+                facility.organisation = None
+                facility.save(update_fields=['organisation'])
+                messages.success(request, f'{facility.display_name} removed from {org.name}.')
 
         return redirect('my_organisation')
 
@@ -1548,54 +1734,31 @@ def facility_detail(request, facility_id):
     Shows: tCO₂e breakdown by category, emission history, linked interventions,
     and a per-category Plotly chart — suitable for the May 2026 report demo.
     """
-    facility = get_object_or_404(
-        _user_facilities(request.user).prefetch_related(
-            'emission_sources__emission_data',
-            'facility_interventions__intervention',
-        ),
-        id=facility_id,
+    facility = get_object_or_404(_user_facilities(request.user), id=facility_id)
+    # An unchanged facility answers 304 before any record is read
+    return _conditional_page(
+        request, facility, lambda: _render_facility_detail(request, facility),
+        namespace='facility-detail',
     )
 
-    # All emission records for this facility, newest first
-    emission_records = list(
-        EmissionData.objects
-        .filter(emission_source__facility=facility)
-        .order_by('-date')
-    )
 
-    # tCO₂e per record (for history table) and per category (for latest)
-    records_with_tco2e = []
-    for ed in emission_records:
-        breakdown = compute_tco2e(ed, facility.country)
-        records_with_tco2e.append({
-            'date': ed.date,
-            'total_tco2e': breakdown['total'],
-            'breakdown': {CATEGORY_LABELS[f]: breakdown[f] for f in EMISSION_FIELDS},
-        })
+def _record_tco2e(record, country):
+    """One emission-history row: the record's total tCO₂e and its per-category breakdown."""
+    breakdown = compute_tco2e(record, country)
+    return {
+        'id': record.id,
+        'date': record.date,
+        'total_tco2e': breakdown['total'],
+        'breakdown': {CATEGORY_LABELS[f]: breakdown[f] for f in EMISSION_FIELDS},
+    }
 
-    # Latest record category breakdown for charts
-    latest_breakdown = records_with_tco2e[0] if records_with_tco2e else None
 
-    # Per-category chart data (latest record)
-    if latest_breakdown:
-        cat_items = sorted(
-            [(name, val) for name, val in latest_breakdown['breakdown'].items() if val > 0],
-            key=lambda x: x[1], reverse=True,
-        )
-        category_chart_data = json.dumps({
-            'labels': [c[0] for c in cat_items],
-            'values': [float(c[1]) for c in cat_items],
-        })
-        # Bar chart: all categories including zeros for completeness
-        all_cat_items = [(CATEGORY_LABELS[f], latest_breakdown['breakdown'][CATEGORY_LABELS[f]])
-                         for f in EMISSION_FIELDS]
-        bar_chart_data = json.dumps({
-            'labels': [c[0] for c in all_cat_items],
-            'values': [float(c[1]) for c in all_cat_items],
-        })
-    else:
-        category_chart_data = json.dumps({'labels': [], 'values': []})
-        bar_chart_data = json.dumps({'labels': [], 'values': []})
+def _render_facility_detail(request, facility):
+    # Only the latest record is rendered; the history table pages in the
+    # rest from facility_emission_history
+    latest = facility.latest_emission
+    latest_breakdown = _record_tco2e(latest, facility.country) if latest else None
+    record_count = EmissionData.objects.filter(emission_source__facility=facility).count()
 
     # Build a UNIFIED row-per-library-intervention list. Each row knows
     # whether it's currently attached to this facility and, if so, carries
@@ -1662,15 +1825,698 @@ def facility_detail(request, facility_id):
 
     return render(request, 'appname/facility_detail.html', {
         'facility': facility,
-        'records_with_tco2e': records_with_tco2e,
+        'record_count': record_count,
         'latest_breakdown': latest_breakdown,
         'facility_interventions': facility_interventions,
         'intervention_rows': intervention_rows,
         'attached_count': attached_count,
         'baseline_tco2e': baseline_tco2e,
         'potential_savings_tco2e': potential_savings_tco2e,
-        'category_chart_data': category_chart_data,
-        'bar_chart_data': bar_chart_data,
         'emission_fields': EMISSION_FIELDS,
         'category_labels': CATEGORY_LABELS,
     })
+
+
+# Records per page of the facility_detail history table
+HISTORY_PAGE_SIZE = 24
+
+
+def _history_cursor(record):
+    return f'{record.date.isoformat()}.{record.id}'
+
+
+def _parse_history_cursor(raw):
+    """(date, id) from a _history_cursor string; ValueError if malformed."""
+    day, _, record_id = raw.partition('.')
+    return date.fromisoformat(day), int(record_id)
+
+
+@login_required
+@require_GET
+def facility_emission_history(request, facility_id):
+    """
+    One page of a facility's emission history, newest first, each record
+    with its tCO₂e breakdown. Keyset-paginated on (date, id), the same
+    order as Facility.latest_emission: ?after=<next> continues from the
+    previous page, so deep pages skip no OFFSET rows and a record added
+    meanwhile never shifts a page. Pages revalidate on the facility's
+    revision.
+    """
+    facility = get_object_or_404(_user_facilities(request.user), id=facility_id)
+    after = request.GET.get('after') or None
+    try:
+        cursor = _parse_history_cursor(after) if after else None
+    except ValueError:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+
+    def build():
+        records = EmissionData.objects.filter(emission_source__facility=facility)
+        if cursor:
+            day, record_id = cursor
+            records = records.filter(Q(date__lt=day) | Q(date=day, id__lt=record_id))
+        page = list(records.order_by('-date', '-id')[:HISTORY_PAGE_SIZE + 1])
+        more = len(page) > HISTORY_PAGE_SIZE
+        page = page[:HISTORY_PAGE_SIZE]
+        return {
+            'records': [_record_tco2e(record, facility.country) for record in page],
+            'next': _history_cursor(page[-1]) if more else None,
+        }
+
+    return _conditional_json(
+        request, [(facility.id, facility.revision, facility.updated_at)], build,
+        namespace=f'history-{after or "latest"}', cache_timeout=CHART_CACHE_TIMEOUT,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Exports — streaming CSV / NDJSON of everything the user can access
+# ---------------------------------------------------------------------------
+
+# Rows fetched per round-trip while streaming. On PostgreSQL .iterator() uses
+# a server-side cursor, so worker memory stays flat no matter how many rows
+# the export contains; on SQLite the driver streams the result set itself.
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line straight back,
+    so csv.writer can be driven row-by-row inside a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _export_emission_rows(facility_ids, with_tco2e):
+    """
+    Yield (header, row dicts) for EmissionData in the given facilities,
+    ordered by facility then date. Raw usage values are always included;
+    with_tco2e adds the per-category tCO₂e breakdown and the record total.
+    """
+    header = ['facility_id', 'facility', 'country', 'date', *EMISSION_FIELDS]
+    if with_tco2e:
+        header += [f'{field}_tco2e' for field in EMISSION_FIELDS] + ['total_tco2e']
+    yield header
+
+    records = (
+        EmissionData.objects
+        .filter(emission_source__facility_id__in=facility_ids)
+        .annotate(
+            facility_id=F('emission_source__facility_id'),
+            facility_name=F('emission_source__facility__display_name'),
+            country=F('emission_source__facility__country'),
+        )
+        .order_by('emission_source__facility_id', 'date', 'id')
+    )
+    for ed in records.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = {
+            'facility_id': ed.facility_id,
+            'facility': ed.facility_name,
+            'country': ed.country,
+            'date': ed.date,
+        }
+        for field in EMISSION_FIELDS:
+            row[field] = getattr(ed, field)
+        if with_tco2e:
+            breakdown = compute_tco2e(ed, ed.country)
+            for field in EMISSION_FIELDS:
+                row[f'{field}_tco2e'] = breakdown[field]
+            row['total_tco2e'] = breakdown['total']
+        yield row
+
+
+def _export_intervention_rows(facility_ids):
+    """Yield (header, row dicts) for every FacilityIntervention link."""
+    header = [
+        'facility_id', 'facility', 'intervention_code', 'intervention',
+        'status', 'target_category', 'emission_reduction_percentage',
+        'implementation_cost', 'maintenance_cost', 'annual_savings',
+        'roi', 'implementation_date', 'cost_source',
+    ]
+    yield header
+
+    links = (
+        FacilityIntervention.objects
+        .filter(facility_id__in=facility_ids)
+        .values_list(
+            'facility_id', 'facility__display_name', 'intervention__code_name',
+            'intervention__display_name', 'intervention__status',
+            'intervention__target_category', 'intervention__emission_reduction_percentage',
+            'implementation_cost', 'maintenance_cost', 'annual_savings',
+            'roi', 'implementation_date', 'cost_source',
+        )
+        .order_by('facility_id', 'intervention__display_name', 'id')
+    )
+    for values in links.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield dict(zip(header, values))
+
+
+EXPORT_DATASETS = {
+    'emissions': lambda ids: _export_emission_rows(ids, with_tco2e=False),
+    'tco2e': lambda ids: _export_emission_rows(ids, with_tco2e=True),
+    'interventions': _export_intervention_rows,
+}
+
+
+def _stream_export(rows, fmt):
+    """
+    Serialise a header-first row generator as CSV or NDJSON, one line at a
+    time. The iteration runs inside atomic() because server-side cursors
+    only survive within a transaction when we sit behind the Supabase
+    transaction pooler (see DATABASES in settings.py).
+    """
+    with transaction.atomic():
+        header = next(rows)
+        if fmt == 'csv':
+            writer = csv.writer(_Echo())
+            yield writer.writerow(header)
+            for row in rows:
+                yield writer.writerow([row[col] for col in header])
+        else:
+            for row in rows:
+                yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def _take(lines, count):
+    """Up to `count` further lines of `lines`, joined; '' once it is exhausted."""
+    return ''.join(line for _, line in zip(range(count), lines))
+
+
+async def _stream_export_async(lines):
+    """
+    _stream_export() for the ASGI handler. Given a sync iterator, Django's
+    ASGI handler would read all of it with sync_to_async(list) before
+    sending a byte. Here each EXPORT_CHUNK_SIZE lines are pulled through
+    one sync_to_async call instead. thread_sensitive keeps every pull, and
+    the closing of the generator, on the request's one sync thread, which
+    holds its transaction and server-side cursor.
+    """
+    pull = sync_to_async(_take, thread_sensitive=True)
+    try:
+        while chunk := await pull(lines, EXPORT_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await sync_to_async(lines.close, thread_sensitive=True)()
+
+
+@login_required
+@require_GET
+def export_data(request, dataset, fmt):
+    """
+    Stream a dataset for every facility the user can access (optionally one
+    facility via ?facility=<id>) as CSV or NDJSON:
+
+      emissions      raw EmissionData usage values (physical units)
+      tco2e          the same records with per-category tCO₂e breakdowns
+      interventions  FacilityIntervention portfolio with costs and ROI
+
+    Rows are streamed straight from the database cursor, so exporting a
+    million records never materialises them in the worker, under WSGI and
+    ASGI alike.
+    """
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_FORMATS:
+        raise Http404('Unknown export')
+
+    facility_ids = accessible_facility_ids(request.user)
+    facility_filter = request.GET.get('facility')
+    if facility_filter:
+        if not facility_filter.isdecimal():
+            raise Http404('Unknown facility')
+        facility = get_object_or_404(_user_facilities(request.user), id=int(facility_filter))
+        facility_ids = [facility.id]
+
+    lines = _stream_export(EXPORT_DATASETS[dataset](facility_ids), fmt)
+    if isinstance(request, ASGIRequest):
+        lines = _stream_export_async(lines)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = (
+        f'attachment; filename="carbomica-{dataset}-{date.today().isoformat()}.{fmt}"'
+    )
+    return response
+
+
+# ---------------------------------------------------------------------------
+# JSON API (v1) — read-only, scoped by _user_facilities, conditional GET
+# ---------------------------------------------------------------------------
+
+def _api_login_required(view):
+    """Like @login_required, but answers 401 JSON instead of redirecting
+    polling clients to the Google sign-in page."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _facility_validators(versions, namespace='v1', salt=''):
+    """
+    Build (etag, last_modified) from an iterable of (id, revision, updated_at)
+    tuples. The ETag changes whenever any facility in the set is added,
+    removed or bumped, so one cheap values_list() query decides between a
+    304 and a full recomputation. `namespace` keeps validators of different
+    resources over the same facilities apart; `salt` mixes in anything else
+    the representation depends on without showing it in the ETag. The
+    intervention library's version is always mixed in: every facility
+    resource shows library names, reduction percentages or statuses.
+    """
+    versions = sorted(versions)
+    salt = f'{library_version()}:{salt}'
+    digest = hashlib.sha1(
+        (salt + ';'.join(f'{fid}:{rev}:{ts.timestamp()}' for fid, rev, ts in versions)).encode()
+    ).hexdigest()
+    last_modified = max((ts for _, _, ts in versions), default=None)
+    return quote_etag(f'{namespace}-{digest}'), last_modified
+
+
+def _conditional_json(request, versions, build_payload, namespace='v1', cache_timeout=None):
+    """
+    Answer 304 when the client's validators still match, otherwise build the
+    payload and stamp it with ETag / Last-Modified. With cache_timeout the
+    payload is also kept server-side under its ETag, so a different client
+    (or user with the same access set) skips the computation entirely.
+    """
+    etag, last_modified = _facility_validators(versions, namespace)
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        if cache_timeout:
+            cache_key = f'carbomica:json:{etag}'
+            payload = cache.get(cache_key)
+            if payload is None:
+                payload = build_payload()
+                cache.set(cache_key, payload, cache_timeout)
+        else:
+            payload = build_payload()
+        response = JsonResponse(payload, encoder=DjangoJSONEncoder)
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    # Per-user data: never shared caches, and always revalidate.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _conditional_page(request, facility, render_page, namespace):
+    """
+    Conditional GET for an HTML page about one facility. Besides the
+    facility's revision, the ETag covers the user, their CSRF secret (the
+    page's forms embed tokens derived from it) and settings.RELEASE_ID, so
+    a 304 never revalidates a page rendered for someone else or from an
+    older template. No Last-Modified: a date alone cannot tell those apart.
+    With flash messages waiting the page is always rendered, or a 304 would
+    leave them unseen.
+    """
+    if len(messages.get_messages(request)):
+        response = render_page()
+    else:
+        get_token(request)  # the secret this response's forms will use, new or not
+        salt = f'{request.user.pk}:{request.META["CSRF_COOKIE"]}:{settings.RELEASE_ID}:'
+        etag, _ = _facility_validators(
+            [(facility.id, facility.revision, facility.updated_at)], namespace, salt,
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = render_page()
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _api_facility(request, facility_id):
+    """Fetch one accessible facility with the fields the validators need."""
+    return get_object_or_404(_user_facilities(request.user), id=facility_id)
+
+
+def _facility_json(facility):
+    return {
+        'id': facility.id,
+        'code_name': facility.code_name,
+        'display_name': facility.display_name,
+        'country': facility.country,
+        'facility_type': facility.facility_type,
+        'organisation_id': facility.organisation_id,
+        'revision': facility.revision,
+        'updated_at': facility.updated_at,
+    }
+
+
+def _scenario_json(scenario, results):
+    return {
+        'id': scenario.id,
+        'facility_id': scenario.facility_id,
+        'name': scenario.name,
+        'status': scenario.status,
+        'budget': scenario.budget,
+        'target_reduction': scenario.target_reduction,
+        'created_at': scenario.created_at,
+        'results': [
+            {
+                'priority': r.priority,
+                'intervention_id': r.intervention_id,
+                'intervention': r.intervention.display_name,
+                'implementation_cost': r.implementation_cost,
+                'emission_reduction': r.emission_reduction,
+                'annual_savings': r.annual_savings,
+                'expected_roi': r.expected_roi,
+                'payback_months': r.payback_months,
+            }
+            for r in results
+        ],
+    }
+
+
+@_api_login_required
+@require_GET
+def api_facilities(request):
+    """GET /api/v1/facilities/ — every facility the user can access."""
+    facilities = list(_user_facilities(request.user).order_by('display_name'))
+    return _conditional_json(
+        request,
+        [(f.id, f.revision, f.updated_at) for f in facilities],
+        lambda: {'facilities': [_facility_json(f) for f in facilities]},
+    )
+
+
+@_api_login_required
+@require_GET
+def api_facility(request, facility_id):
+    """GET /api/v1/facilities/<id>/ — profile plus latest-record tCO₂e."""
+    facility = _api_facility(request, facility_id)
+
+    def build():
+        latest = facility.latest_emission
+        breakdown = compute_tco2e(latest, facility.country) if latest else None
+        return {
+            'facility': _facility_json(facility),
+            'latest_record': {
+                'date': latest.date,
+                'total_tco2e': breakdown['total'],
+                'tco2e': {field: breakdown[field] for field in EMISSION_FIELDS},
+            } if latest else None,
+            'linked_interventions': facility.facility_interventions.count(),
+        }
+
+    return _conditional_json(request, [(facility.id, facility.revision, facility.updated_at)], build)
+
+
+@_api_login_required
+@require_GET
+def api_facility_emissions(request, facility_id):
+    """GET /api/v1/facilities/<id>/emissions/ — raw usage time series;
+    ?tco2e=1 adds the per-category tCO₂e breakdown of every record."""
+    facility = _api_facility(request, facility_id)
+    with_tco2e = request.GET.get('tco2e') in ('1', 'true')
+
+    def build():
+        series = []
+        records = (
+            EmissionData.objects
+            .filter(emission_source__facility=facility)
+            .order_by('date', 'id')
+        )
+        for ed in records.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            point = {'id': ed.id, 'date': ed.date}
+            point.update({field: getattr(ed, field) for field in EMISSION_FIELDS})
+            if with_tco2e:
+                breakdown = compute_tco2e(ed, facility.country)
+                point['tco2e'] = {field: breakdown[field] for field in EMISSION_FIELDS}
+                point['total_tco2e'] = breakdown['total']
+            series.append(point)
+        return {'facility_id': facility.id, 'records': series}
+
+    # The two representations need different ETags, or one would revalidate the other
+    return _conditional_json(
+        request, [(facility.id, facility.revision, facility.updated_at)], build,
+        namespace='v1-tco2e' if with_tco2e else 'v1',
+    )
+
+
+@_api_login_required
+@require_GET
+def api_facility_interventions(request, facility_id):
+    """GET /api/v1/facilities/<id>/interventions/ — the linked portfolio."""
+    facility = _api_facility(request, facility_id)
+
+    def build():
+        links = (
+            FacilityIntervention.objects
+            .select_related('intervention')
+            .filter(facility=facility)
+            .order_by('intervention__display_name')
+        )
+        return {
+            'facility_id': facility.id,
+            'interventions': [
+                {
+                    'id': fi.id,
+                    'intervention_id': fi.intervention_id,
+                    'code_name': fi.intervention.code_name,
+                    'name': fi.intervention.display_name,
+                    'status': fi.intervention.status,
+                    'target_category': fi.intervention.target_category,
+                    'emission_reduction_percentage': fi.intervention.emission_reduction_percentage,
+                    'implementation_cost': fi.implementation_cost,
+                    'maintenance_cost': fi.maintenance_cost,
+                    'annual_savings': fi.annual_savings,
+                    'roi': fi.calculate_roi(),
+                    'implementation_date': fi.implementation_date,
+                    'cost_source': fi.cost_source,
+                }
+                for fi in links
+            ],
+        }
+
+    return _conditional_json(request, [(facility.id, facility.revision, facility.updated_at)], build)
+
+
+@_api_login_required
+@require_GET
+def api_facility_scenarios(request, facility_id):
+    """GET /api/v1/facilities/<id>/scenarios/ — saved optimisation results."""
+    facility = _api_facility(request, facility_id)
+
+    def build():
+        scenarios = (
+            OptimizationScenario.objects
+            .filter(facility=facility)
+            .prefetch_related('results__intervention')
+            .order_by('-created_at')
+        )
+        return {
+            'facility_id': facility.id,
+            'scenarios': [_scenario_json(s, s.results.all()) for s in scenarios],
+        }
+
+    return _conditional_json(request, [(facility.id, facility.revision, facility.updated_at)], build)
+
+
+@_api_login_required
+@require_GET
+def api_scenario(request, scenario_id):
+    """GET /api/v1/scenarios/<id>/ — one saved scenario and its ranked results."""
+    scenario = get_object_or_404(
+        OptimizationScenario.objects.select_related('facility'),
+        id=scenario_id,
+        facility_id__in=accessible_facility_ids(request.user),
+    )
+    facility = scenario.facility
+    return _conditional_json(
+        request,
+        [(facility.id, facility.revision, facility.updated_at)],
+        lambda: {'scenario': _scenario_json(
+            scenario, scenario.results.select_related('intervention').order_by('priority'),
+        )},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Chart data — fetched by dashboard / facility_detail / district_planning
+# after first paint, so the HTML never waits on the heaviest aggregation.
+# Each chart is cached on its own under its ETag (see _conditional_json).
+# ---------------------------------------------------------------------------
+
+CHART_CACHE_TIMEOUT = 60 * 60
+
+
+def _access_versions(user):
+    return list(_user_facilities(user).values_list('id', 'revision', 'updated_at'))
+
+
+def _shared_tco2e(user, versions):
+    """
+    _aggregate_tco2e_all(user), computed once per access set (and data
+    revision) and shared by the dashboard charts that need it, across users
+    with the same access set.
+    """
+    etag, _ = _facility_validators(versions, 'tco2e')
+    return shared_result(
+        f'carbomica:tco2e:{etag}', lambda: _aggregate_tco2e_all(user), CHART_CACHE_TIMEOUT,
+    )
+
+
+def _dashboard_sources_chart(user, versions):
+    category_tco2e, _, _, total_tco2e = _shared_tco2e(user, versions)
+    breakdown = _source_breakdown(category_tco2e, total_tco2e)
+    return {
+        'labels': [s['name'] for s in breakdown],
+        'values': [float(s['amount'] or 0) for s in breakdown],
+    }
+
+
+def _dashboard_facilities_chart(user, versions):
+    # Stored all-records totals: no aggregation needed
+    top = (
+        _user_facilities(user)
+        .filter(latest_emission__isnull=False)
+        .order_by('-emissions_tco2e', 'id')
+        .values_list('display_name', 'emissions_tco2e')[:5]
+    )
+    return {
+        'labels': [name for name, _ in top],
+        'values': [float(amount) for _, amount in top],
+    }
+
+
+def _dashboard_monthly_chart(user, versions):
+    _, _, monthly_tco2e, _ = _shared_tco2e(user, versions)
+    return {
+        'labels': [d.strftime('%b %Y') for d, _ in monthly_tco2e],
+        'values': [float(v) for _, v in monthly_tco2e],
+    }
+
+
+DASHBOARD_CHARTS = {
+    'sources': _dashboard_sources_chart,
+    'facilities': _dashboard_facilities_chart,
+    'monthly': _dashboard_monthly_chart,
+}
+
+
+@login_required
+@require_GET
+def dashboard_chart(request, chart):
+    """Plotly payload for one dashboard chart (sources / facilities / monthly)."""
+    if chart not in DASHBOARD_CHARTS:
+        raise Http404('Unknown chart')
+    versions = _access_versions(request.user)
+    return _conditional_json(
+        request, versions,
+        lambda: DASHBOARD_CHARTS[chart](request.user, versions),
+        namespace=f'dashboard-{chart}', cache_timeout=CHART_CACHE_TIMEOUT,
+    )
+
+
+def _facility_category_charts(facility):
+    """(pie, bar) payloads for the facility's latest record."""
+    latest = facility.latest_emission
+    if latest is None:
+        return {'labels': [], 'values': []}, {'labels': [], 'values': []}
+    breakdown = compute_tco2e(latest, facility.country)
+    # Pie: non-zero categories largest first; bar: every category for completeness
+    pie_items = sorted(
+        [(CATEGORY_LABELS[f], breakdown[f]) for f in EMISSION_FIELDS if breakdown[f] > 0],
+        key=lambda x: x[1], reverse=True,
+    )
+    pie = {'labels': [c[0] for c in pie_items], 'values': [float(c[1]) for c in pie_items]}
+    bar = {
+        'labels': [CATEGORY_LABELS[f] for f in EMISSION_FIELDS],
+        'values': [float(breakdown[f]) for f in EMISSION_FIELDS],
+    }
+    return pie, bar
+
+
+FACILITY_CHARTS = {
+    'categories': lambda facility: _facility_category_charts(facility)[0],
+    'bar': lambda facility: _facility_category_charts(facility)[1],
+}
+
+
+@login_required
+@require_GET
+def facility_chart(request, facility_id, chart):
+    """Plotly payload for one facility_detail chart (categories / bar)."""
+    if chart not in FACILITY_CHARTS:
+        raise Http404('Unknown chart')
+    facility = get_object_or_404(_user_facilities(request.user), id=facility_id)
+    return _conditional_json(
+        request, [(facility.id, facility.revision, facility.updated_at)],
+        lambda: FACILITY_CHARTS[chart](facility),
+        namespace=f'facility-{chart}', cache_timeout=CHART_CACHE_TIMEOUT,
+    )
+
+
+@login_required
+@require_GET
+@expensive('analysis')
+def district_chart(request):
+    """Top-10 baseline vs reduction-potential payload for district_planning."""
+    versions = _access_versions(request.user)
+
+    def build():
+        rows = _district_rows(request.user, versions)[:10]
+        return {
+            'labels': [r['name'] for r in rows],
+            'baseline': [float(r['baseline']) for r in rows],
+            'reduction': [float(r['potential_reduction']) for r in rows],
+        }
+
+    return _conditional_json(
+        request, versions, build,
+        namespace='district', cache_timeout=CHART_CACHE_TIMEOUT,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Operations
+# ---------------------------------------------------------------------------
+
+@staff_member_required
+@require_GET
+def metrics(request):
+    """
+    Per-view request, query-count and engine-stage histograms for this
+    process (appname.instrumentation), in Prometheus text format.
+    """
+    return HttpResponse(HISTOGRAMS.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_GET
+def healthz(request):
+    """Liveness: the process is up and serving. Touches nothing else."""
+    return HttpResponse('ok', content_type='text/plain')
+
+
+@require_GET
+def readyz(request):
+    """
+    Readiness: the database answers a trivial query and this worker has
+    finished its warm-up (appname.warmup). 503 until both hold; a failed
+    warm-up is retried here once its backoff has run out.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        database = 'ok'
+    except DatabaseError as exc:
+        database = f'error: {exc}'
+    if database == 'ok':
+        retry_warm_up()
+    ready = database == 'ok' and WARMUP['done']
+    response = JsonResponse({
+        'ready': ready,
+        'database': database,
+        'warmup': {
+            'done': WARMUP['done'], 'ms': WARMUP['ms'], 'error': WARMUP['error'],
+            'attempts': WARMUP['attempts'],
+        },
+    }, status=200 if ready else 503)
+    patch_cache_control(response, no_store=True)
+    return response
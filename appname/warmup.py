@@ -0,0 +1,98 @@
+"""
+Worker warm-up, run once per process before it serves traffic
+(Carbomica_app/wsgi.py and asgi.py call warm_up() right after building the
+application, which gunicorn does in each worker before accepting).
+
+A cold worker pays for the same lazy, per-process set-up on its first
+requests: importing the URLconf and every view module behind it,
+compiling each template into the cached loader, opening the first database
+connection, and touching the intervention library and factor tables
+(module-level dicts in appname.modeling that the first optimisation walks).
+warm_up() does all of it up front and records the outcome in STATE, which
+/readyz reports. A failed warm-up (say the database was not reachable yet)
+is retried by /readyz through retry_warm_up(), with a backoff that doubles
+from RETRY_START up to RETRY_MAX seconds, so a worker recovers on its own.
+"""
+import logging
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+STATE = {'done': False, 'ms': None, 'templates': 0, 'error': None, 'attempts': 0}
+_lock = threading.Lock()
+
+# Backoff between warm-up retries after a failure, in seconds
+RETRY_START = 1
+RETRY_MAX = 60
+_next_retry = 0.0
+
+
+def _templates():
+    """Names of the project's own templates (settings TEMPLATES DIRS)."""
+    names = set()
+    for directory in engines['django'].engine.dirs:
+        root = Path(directory)
+        names.update(str(path.relative_to(root)) for path in root.rglob('*.html'))
+    return sorted(names)
+
+
+def _touch_library():
+    """Walk the intervention library and factor tables once with real arithmetic."""
+    from .management.commands.sync_interventions import library_hash
+    from .modeling import ELECTRICITY_EF, EMISSION_FACTORS, INTERVENTION_LIBRARY, compute_tco2e
+
+    library_hash()
+    sample = type('Sample', (), dict.fromkeys(EMISSION_FACTORS, Decimal('1')))()
+    for country in ELECTRICITY_EF:
+        compute_tco2e(sample, country)
+    return len(INTERVENTION_LIBRARY)
+
+
+def warm_up():
+    """Warm this process once; later calls return the recorded STATE."""
+    global _next_retry
+    with _lock:
+        if STATE['done']:
+            return STATE
+        STATE['attempts'] += 1
+        started = time.perf_counter()
+        try:
+            resolver = get_resolver()
+            resolver.url_patterns          # imports every view module
+            resolver.reverse_dict          # builds the reverse lookup table
+            engine = engines['django']
+            names = _templates()
+            for name in names:
+                engine.get_template(name)
+            _touch_library()
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception as exc:  # a failed warm-up must not kill the worker
+            logger.exception('Warm-up failed')
+            STATE['error'] = f'{type(exc).__name__}: {exc}'
+            backoff = min(RETRY_START * 2 ** (STATE['attempts'] - 1), RETRY_MAX)
+            _next_retry = time.monotonic() + backoff
+            return STATE
+        finally:
+            # conn_max_age=0: requests open their own connections
+            connections.close_all()
+        STATE.update(
+            done=True, error=None, templates=len(names),
+            ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        logger.info('Warm-up finished in %s ms (%s templates)', STATE['ms'], STATE['templates'])
+        return STATE
+
+
+def retry_warm_up():
+    """Run warm_up() again if it failed and its backoff has run out; return STATE."""
+    if not STATE['done'] and STATE['error'] and time.monotonic() >= _next_retry:
+        return warm_up()
+    return STATE
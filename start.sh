@@ -1,13 +1,39 @@
 #!/bin/sh
 # start.sh — Cloud Run entrypoint
 # Runs migrations + idempotent data syncs on every cold start, then launches gunicorn.
+# Each step logs its wall time so cold-start regressions show up in the logs.
+# With nothing to do, the syncs skip themselves on unchanged library and
+# factor hashes and the backfill is a single query.
 set -e
-echo "Running database migrations..."
-python manage.py migrate --noinput
-echo "Syncing intervention library (idempotent)..."
-python manage.py sync_interventions
-echo "Backfilling facility interventions (idempotent)..."
-python manage.py backfill_facility_interventions
+
+started=$(date +%s%N)
+step() {
+    label=$1; shift
+    echo "$label..."
+    t0=$(date +%s%N)
+    "$@"
+    echo "[startup] $label took $(( ($(date +%s%N) - t0) / 1000000 )) ms"
+}
+
+step "Running database migrations" python manage.py migrate --noinput
+step "Syncing intervention library" python manage.py sync_interventions
+step "Syncing emission factors" python manage.py sync_emission_factors
+step "Backfilling facility interventions" python manage.py backfill_facility_interventions
+echo "[startup] ready to serve after $(( ($(date +%s%N) - started) / 1000000 )) ms"
+
+# SERVER_MODE=asgi serves through uvicorn workers, where home and dashboard
+# run their independent queries concurrently (appname/async_views.py).
+# Compare the two modes with `manage.py load_test` before switching.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    echo "Starting gunicorn (ASGI, uvicorn workers) on port ${PORT:-8080}..."
+    exec gunicorn Carbomica_app.asgi:application \
+        --worker-class uvicorn_worker.UvicornWorker \
+        --bind "0.0.0.0:${PORT:-8080}" \
+        --workers 2 \
+        --timeout 120 \
+        --log-level info
+fi
+
 echo "Starting gunicorn on port ${PORT:-8080}..."
 exec gunicorn Carbomica_app.wsgi:application \
     --bind "0.0.0.0:${PORT:-8080}" \